@@ -0,0 +1,208 @@
+"""
+Generates synthetic Dialogflow agents shaped like `tests/mockup-agent`, at
+configurable scales, for benchmarking the converters.
+
+Usage:
+    python benchmarks/agent_generator.py path/to/agent --scale medium
+"""
+
+import argparse
+import json
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+WORDS = (
+    "account address agent balance book cancel card change check city date "
+    "delivery email flight help hotel invoice language list menu order "
+    "password payment phone plan price product refund reset room schedule "
+    "search send service ship size status store support ticket time track "
+    "transfer update upgrade user weather week"
+).split()
+
+
+@dataclass(frozen=True)
+class AgentScale:
+    intents: int
+    phrases_per_intent: int
+    entities: int
+    entries_per_entity: int
+    languages: tuple[str, ...] = ("en",)
+    # Share of entities whose entries reference other entities
+    compound_ratio: float = 0.1
+    # Share of training phrases annotated with an entity
+    annotated_ratio: float = 0.3
+
+
+SCALES = {
+    "tiny": AgentScale(
+        intents=10, phrases_per_intent=5, entities=4, entries_per_entity=10
+    ),
+    "small": AgentScale(
+        intents=200, phrases_per_intent=20, entities=20, entries_per_entity=200
+    ),
+    "medium": AgentScale(
+        intents=1000,
+        phrases_per_intent=50,
+        entities=50,
+        entries_per_entity=2000,
+        languages=("en", "de"),
+    ),
+    "large": AgentScale(
+        intents=5000,
+        phrases_per_intent=40,
+        entities=100,
+        entries_per_entity=10000,
+        languages=("en", "de", "fr"),
+    ),
+}
+
+
+def _write_json(file_path: Path, content) -> None:
+    with file_path.open("w", encoding="utf-8") as file:
+        json.dump(content, file, indent=2, ensure_ascii=False)
+
+
+def _phrase(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def _entity_names(scale: AgentScale) -> list[str]:
+    return [f"entity{i:05d}" for i in range(scale.entities)]
+
+
+def _generate_entities(agent_dir: Path, scale: AgentScale, rng: random.Random) -> None:
+    entities_dir = agent_dir / "entities"
+    entities_dir.mkdir(parents=True, exist_ok=True)
+    entity_names = _entity_names(scale)
+    compound_count = int(len(entity_names) * scale.compound_ratio)
+
+    for i, entity_name in enumerate(entity_names):
+        is_compound = i < compound_count
+        _write_json(
+            entities_dir / f"{entity_name}.json",
+            {
+                "id": f"fake-id-{i}",
+                "name": entity_name,
+                "isOverridable": True,
+                "isEnum": is_compound,
+                "isRegexp": False,
+                "automatedExpansion": False,
+                "allowFuzzyExtraction": False,
+            },
+        )
+        for language in scale.languages:
+            entries = []
+            for j in range(scale.entries_per_entity):
+                if is_compound:
+                    other = rng.choice(entity_names[compound_count:] or entity_names)
+                    value = f"@{other}:{other} {rng.choice(WORDS)}"
+                    synonyms = [value]
+                else:
+                    value = f"{language} {_phrase(rng, 2)} {j}"
+                    # Roughly half of the values have extra synonyms
+                    synonyms = [value] + [
+                        f"{value} {rng.choice(WORDS)}"
+                        for _ in range(rng.choice((0, 0, 1, 2)))
+                    ]
+                entries.append({"value": value, "synonyms": synonyms})
+            _write_json(
+                entities_dir / f"{entity_name}_entries_{language}.json", entries
+            )
+
+
+def _generate_intents(agent_dir: Path, scale: AgentScale, rng: random.Random) -> None:
+    intents_dir = agent_dir / "intents"
+    intents_dir.mkdir(parents=True, exist_ok=True)
+    entity_names = _entity_names(scale)
+
+    for i in range(scale.intents):
+        intent_name = f"{rng.choice(WORDS)}.{rng.choice(WORDS)}{i:05d}"
+        messages = [
+            {
+                "type": "0",
+                "title": "",
+                "textToSpeech": "",
+                "lang": language,
+                "speech": [f"{language} {_phrase(rng, 6)}" for _ in range(2)],
+                "condition": "",
+            }
+            for language in scale.languages
+        ]
+        _write_json(
+            intents_dir / f"{intent_name}.json",
+            {
+                "id": f"fake-id-{i}",
+                "name": intent_name,
+                "auto": True,
+                "contexts": [],
+                "responses": [
+                    {
+                        "resetContexts": False,
+                        "action": "",
+                        "affectedContexts": [],
+                        "parameters": [],
+                        "messages": messages,
+                        "speech": [],
+                    }
+                ],
+                "priority": 500000,
+                "webhookUsed": False,
+                "fallbackIntent": False,
+                "events": [],
+            },
+        )
+        for language in scale.languages:
+            phrases = []
+            for _ in range(scale.phrases_per_intent):
+                data = [{"text": _phrase(rng, 4), "userDefined": False}]
+                if entity_names and rng.random() < scale.annotated_ratio:
+                    entity_name = rng.choice(entity_names)
+                    data.append({"text": " "})
+                    data.append(
+                        {
+                            "text": rng.choice(WORDS),
+                            "alias": entity_name,
+                            "meta": f"@{entity_name}",
+                            "userDefined": True,
+                        }
+                    )
+                phrases.append(
+                    {
+                        "id": "fake-id",
+                        "data": data,
+                        "isTemplate": False,
+                        "count": 0,
+                        "lang": language,
+                        "updated": 0,
+                    }
+                )
+            _write_json(
+                intents_dir / f"{intent_name}_usersays_{language}.json", phrases
+            )
+
+
+def generate_agent(agent_dir: Path, scale: AgentScale, seed: int = 0) -> Path:
+    """Writes a synthetic Dialogflow agent export of the given scale."""
+    rng = random.Random(seed)
+    _generate_entities(agent_dir, scale, rng)
+    _generate_intents(agent_dir, scale, rng)
+    return agent_dir
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Generates a synthetic Dialogflow agent for benchmarks."
+    )
+    parser.add_argument("path", help="Directory in which the agent is written.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scale = SCALES[args.scale]
+    generate_agent(Path(args.path), scale, args.seed)
+    print(f"Generated '{args.scale}' agent in '{args.path}': {asdict(scale)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Measures the preview latency of `dialog2rasa serve` on a generated agent:
+after a warm-up conversion, one training phrase file is edited before every
+request, as when a user edits an agent and previews the result.
+
+Usage:
+
+    python benchmarks/bench_serve.py
+    python benchmarks/bench_serve.py --intents 4000 --requests 200 --target-ms 100
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+from agent_generator import AgentScale, generate_agent
+
+from dialog2rasa.cache import AgentCache
+from dialog2rasa.server import make_server
+from dialog2rasa.utils.general import setup_logger
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+def edit_phrase(file_path: Path, rng: random.Random) -> None:
+    """Rewrites one training phrase of an intent, as an agent editor would."""
+    phrases = json.loads(file_path.read_text(encoding="utf-8"))
+    phrase = rng.choice(phrases)
+    phrase["data"][0]["text"] = f"edited {rng.randrange(10**6)}"
+    file_path.write_text(json.dumps(phrases), encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks serve latency.")
+    parser.add_argument("--intents", type=int, default=4000)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--format", choices=("json", "zip"), default="json")
+    parser.add_argument("--target-ms", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scale = AgentScale(
+        intents=args.intents,
+        phrases_per_intent=20,
+        entities=50,
+        entries_per_entity=500,
+    )
+    rng = random.Random(args.seed)
+    logger = setup_logger("dialog2rasa.benchmarks", level=logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        generate_agent(root / "agent", scale, args.seed)
+        usersays = sorted((root / "agent" / "intents").glob("*_usersays_*.json"))
+
+        server = make_server(AgentCache(), root, logger, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = (
+            f"http://127.0.0.1:{server.server_address[1]}/convert"
+            f"?agent=agent&language=en&format={args.format}"
+        )
+
+        def request() -> float:
+            start = time.perf_counter()
+            with urllib.request.urlopen(url) as response:
+                response.read()
+            return time.perf_counter() - start
+
+        cold = request()
+        latencies = []
+        for _ in range(args.requests):
+            edit_phrase(rng.choice(usersays), rng)
+            latencies.append(request())
+        server.shutdown()
+        server.server_close()
+
+    p50 = percentile(latencies, 0.5) * 1000
+    p99 = percentile(latencies, 0.99) * 1000
+    print(f"Agent with {args.intents} intents, {args.format} responses")
+    print(f"cold conversion {cold * 1000:9.1f} ms")
+    print(f"edit p50        {p50:9.1f} ms")
+    print(f"edit p99        {p99:9.1f} ms")
+    if p99 > args.target_ms:
+        print(f"\np99 latency above the {args.target_ms:.0f} ms target.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmarks the YAML emitter against the plain string concatenation the
+converters used before escaping was added, and checks that it still
+reproduces the reference output of the mockup agent.
+
+Usage:
+
+    python benchmarks/bench_yaml.py
+    python benchmarks/bench_yaml.py --items 50000 --tolerance 0.05
+"""
+
+import argparse
+import filecmp
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from agent_generator import WORDS
+
+from dialog2rasa.converters.core import convert_languages
+from dialog2rasa.utils.emitter import emit_examples_item, emit_responses
+from dialog2rasa.utils.general import setup_logger
+
+MOCKUP_AGENT = Path(__file__).parent.parent / "tests" / "mockup-agent"
+
+
+def legacy_intent(name: str, examples: list[str]) -> str:
+    lines = "".join(f"      - {example}\n" for example in examples)
+    return f"  - intent: {name}\n    examples: |\n{lines}\n"
+
+
+def legacy_responses(name: str, texts: list[str]) -> str:
+    lines = "".join(f'    - text: "{text}"\n' for text in texts)
+    return f"  {name}:\n{lines}\n"
+
+
+def emitter_intent(name: str, examples: list[str]) -> str:
+    return emit_examples_item("intent", name, examples, end="\n")
+
+
+def emitter_responses(name: str, texts: list[str]) -> str:
+    return emit_responses(name, texts, end="\n")
+
+
+def generate_items(count: int, seed: int) -> list[tuple[str, list[str]]]:
+    """Returns (name, texts) pairs shaped like intents and their phrases."""
+    rng = random.Random(seed)
+    return [
+        (
+            f"{rng.choice(WORDS)}.{rng.choice(WORDS)}_{i}",
+            [" ".join(rng.choices(WORDS, k=rng.randint(3, 10))) for _ in range(8)],
+        )
+        for i in range(count)
+    ]
+
+
+def measure(
+    emitters: dict[str, Callable[[str, list[str]], str]], items: list, runs: int
+) -> dict[str, float]:
+    """
+    Returns the items emitted per second by each emitter, best of `runs`.
+    Emitters take turns within every run, so that drifts in machine load
+    affect all of them alike.
+    """
+    best = dict.fromkeys(emitters, float("inf"))
+    for _ in range(runs):
+        for label, emit in emitters.items():
+            start = time.perf_counter()
+            "".join(emit(name, texts) for name, texts in items)
+            best[label] = min(best[label], time.perf_counter() - start)
+    return {label: len(items) / seconds for label, seconds in best.items()}
+
+
+def matches_reference() -> bool:
+    """Converts the mockup agent and compares the output to the reference."""
+    logger = setup_logger("dialog2rasa.benchmarks", level=logging.ERROR)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        convert_languages(MOCKUP_AGENT, ["en"], logger, output_root=Path(temp_dir))
+        reference_dir = MOCKUP_AGENT / "reference_output" / "en"
+        for reference_path in reference_dir.rglob("*.*"):
+            output_path = Path(temp_dir) / "en" / reference_path.relative_to(
+                reference_dir
+            )
+            if not filecmp.cmp(reference_path, output_path, shallow=False):
+                print(f"Output differs from reference: {reference_path.name}")
+                return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks the YAML emitter.")
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.0,
+        help="Relative slowdown of the emitter over plain concatenation "
+        "allowed, e.g. on a noisy machine. Defaults to none.",
+    )
+    args = parser.parse_args()
+
+    if not matches_reference():
+        sys.exit(1)
+
+    items = generate_items(args.items, args.seed)
+    results = {
+        kind: measure(
+            {"concatenation": legacy, "emitter": emitter}, items, args.runs
+        )
+        for kind, legacy, emitter in (
+            ("intents", legacy_intent, emitter_intent),
+            ("responses", legacy_responses, emitter_responses),
+        )
+    }
+
+    print(f"{'documents':<10} {'emitter':<14} {'items/s':>12} {'relative':>9}")
+    for kind, rates in results.items():
+        for name, rate in rates.items():
+            relative = rate / rates["concatenation"]
+            print(f"{kind:<10} {name:<14} {rate:>12.0f} {relative:>9.2f}")
+
+    slow = [
+        kind
+        for kind, rates in results.items()
+        if rates["emitter"] < rates["concatenation"] * (1 - args.tolerance)
+    ]
+    if slow:
+        print(f"\nEmitter slower than concatenation for: {', '.join(slow)}")
+        sys.exit(1)
+    print("\nEmitter matches the reference and keeps up with concatenation.")
+
+
+if __name__ == "__main__":
+    main()
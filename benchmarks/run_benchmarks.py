@@ -0,0 +1,218 @@
+"""
+Benchmarks every converter on synthetic Dialogflow agents and compares the
+results against a stored baseline, failing loudly on regressions.
+
+Each converter runs in a fresh process, so its peak RSS is measured in
+isolation. Usage:
+
+    python benchmarks/run_benchmarks.py --scale small
+    python benchmarks/run_benchmarks.py --scale small --update-baseline
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from agent_generator import SCALES, generate_agent
+
+from dialog2rasa.converters.core import DialogflowToRasaConverter
+from dialog2rasa.converters.manager import get_converter
+from dialog2rasa.utils.general import setup_logger
+from dialog2rasa.utils.index import AgentIndex
+from dialog2rasa.utils.io import reset_directory
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+CONVERTER_TYPES = ["intent", "utterance", "entity", "slot", "all"]
+# Timing differences below this many seconds are considered noise
+MIN_SECONDS_DELTA = 0.05
+
+
+def _peak_rss_mb() -> float:
+    """Returns the peak resident set size of the current process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure(
+    agent_dir: Path, output_root: Path, language: str, converter_type: str, jobs: int
+) -> dict:
+    """Runs one converter in the current (fresh) process and measures it."""
+    logger = setup_logger("dialog2rasa.benchmarks", level=logging.ERROR)
+
+    start = time.perf_counter()
+    index = AgentIndex(agent_dir)
+    scan_seconds = time.perf_counter() - start
+
+    if converter_type == "all":
+        converter = DialogflowToRasaConverter(
+            agent_dir, language, logger, index=index, jobs=jobs, output_root=output_root
+        )
+        files = len(index.usersays(language)) + len(index.intent_files)
+        files += len(index.entries(language))
+        start = time.perf_counter()
+        converter.convert_all()
+    else:
+        converter = get_converter(
+            converter_type,
+            agent_dir,
+            language,
+            logger,
+            index=index,
+            jobs=jobs,
+            output_root=output_root,
+        )
+        reset_directory(converter.output_dir, "data/nlu/lookup")
+        files = {
+            "intent": len(index.usersays(language)),
+            "utterance": len(index.intent_files),
+            "entity": len(index.entries(language)),
+            "slot": len(index.entries(language)),
+        }[converter_type]
+        start = time.perf_counter()
+        converter.convert()
+        # Standalone converters only fill their sections, so write them out too
+        for section in converter.produces:
+            converter.sections.assemble(
+                converter.output_dir / f"{section}.yml", [section]
+            )
+
+    seconds = time.perf_counter() - start
+    return {
+        "scan_seconds": round(scan_seconds, 4),
+        "seconds": round(seconds, 4),
+        "files": files,
+        "files_per_second": round(files / seconds, 1) if seconds else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def run_benchmarks(scale_name: str, jobs: int = 1, seed: int = 0) -> dict[str, dict]:
+    """Generates an agent of the given scale and benchmarks every converter."""
+    scale = SCALES[scale_name]
+    language = scale.languages[0]
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        agent_dir = generate_agent(Path(temp_dir) / "agent", scale, seed)
+        output_root = Path(temp_dir) / "output"
+        context = multiprocessing.get_context("spawn")
+        for converter_type in CONVERTER_TYPES:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[converter_type] = executor.submit(
+                    _measure, agent_dir, output_root, language, converter_type, jobs
+                ).result()
+    return results
+
+
+def compare_to_baseline(
+    results: dict[str, dict], baseline: dict[str, dict], tolerance: float
+) -> list[str]:
+    """Returns a description of every metric that regressed past tolerance."""
+    regressions = []
+    for converter_type, result in results.items():
+        reference = baseline.get(converter_type)
+        if reference is None:
+            continue
+        seconds, reference_seconds = result["seconds"], reference["seconds"]
+        if (
+            seconds > reference_seconds * (1 + tolerance)
+            and seconds - reference_seconds > MIN_SECONDS_DELTA
+        ):
+            regressions.append(
+                f"{converter_type}: {seconds:.3f}s vs baseline {reference_seconds:.3f}s"
+            )
+        rss, reference_rss = result["peak_rss_mb"], reference["peak_rss_mb"]
+        if rss > reference_rss * (1 + tolerance):
+            regressions.append(
+                f"{converter_type}: peak RSS {rss:.1f} MB "
+                f"vs baseline {reference_rss:.1f} MB"
+            )
+    return regressions
+
+
+def print_results(scale_name: str, results: dict[str, dict]) -> None:
+    print(f"\nScale '{scale_name}':")
+    print(
+        f"{'converter':<10} {'seconds':>9} {'files':>7} {'files/s':>10} {'RSS MB':>8}"
+    )
+    for converter_type, result in results.items():
+        print(
+            f"{converter_type:<10} {result['seconds']:>9.3f} {result['files']:>7} "
+            f"{result['files_per_second'] or 0:>10.1f} {result['peak_rss_mb']:>8.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the converters on synthetic Dialogflow agents."
+    )
+    parser.add_argument(
+        "--scale",
+        choices=SCALES,
+        action="append",
+        help="Agent scale to benchmark, can be repeated. Defaults to 'small'.",
+    )
+    parser.add_argument("--jobs", "-j", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed relative slowdown or memory growth over the baseline.",
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON file."
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the results as the new baseline instead of comparing.",
+    )
+    parser.add_argument("--output", type=Path, help="Write the results as JSON.")
+    args = parser.parse_args()
+
+    baseline = (
+        json.loads(args.baseline.read_text(encoding="utf-8"))
+        if args.baseline.exists()
+        else {}
+    )
+    all_results, regressions = {}, []
+    for scale_name in args.scale or ["small"]:
+        results = run_benchmarks(scale_name, args.jobs, args.seed)
+        all_results[scale_name] = results
+        print_results(scale_name, results)
+        if not args.update_baseline:
+            regressions += [
+                f"[{scale_name}] {regression}"
+                for regression in compare_to_baseline(
+                    results, baseline.get(scale_name, {}), args.tolerance
+                )
+            ]
+
+    if args.output:
+        args.output.write_text(json.dumps(all_results, indent=2), encoding="utf-8")
+
+    if args.update_baseline:
+        baseline.update(all_results)
+        args.baseline.write_text(
+            json.dumps(baseline, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"\nBaseline updated in '{args.baseline}'.")
+    elif regressions:
+        print("\nPERFORMANCE REGRESSIONS DETECTED:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  - {regression}", file=sys.stderr)
+        sys.exit(1)
+    else:
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from dialog2rasa.api import (
+    load_index,
+    parse_agent,
+    parse_agent_languages,
+)
+from dialog2rasa.model import (
+    AgentData,
+    Compound,
+    EntitySpan,
+    Example,
+    Intent,
+    Lookup,
+    Response,
+    Slot,
+    Synonym,
+)
+from dialog2rasa.serializers import render_agent, write_agent
+
+__all__ = [
+    "AgentData",
+    "Compound",
+    "EntitySpan",
+    "Example",
+    "Intent",
+    "Lookup",
+    "Response",
+    "Slot",
+    "Synonym",
+    "load_index",
+    "parse_agent",
+    "parse_agent_languages",
+    "render_agent",
+    "write_agent",
+]
@@ -0,0 +1,94 @@
+from pathlib import Path
+from typing import Any, Callable, Mapping, Optional, Union
+
+from dialog2rasa.converters.core import ConversionError
+from dialog2rasa.converters.entity import parse_entity
+from dialog2rasa.converters.intent import parse_intent
+from dialog2rasa.converters.utterance import parse_responses
+from dialog2rasa.model import AgentData, Slot
+from dialog2rasa.utils.index import AgentIndex
+from dialog2rasa.utils.io import AgentFile
+from dialog2rasa.utils.stats import ConversionStats
+
+# An agent folder or .zip export, its parsed JSON documents keyed by path
+# within the export, or an index of either
+AgentSource = Union[str, Path, Mapping[str, Any], AgentIndex]
+# Applies `func(data, *args)` to the parsed content of an agent file
+FileParser = Callable[..., Any]
+
+
+def load_index(
+    source: AgentSource, stats: Optional[ConversionStats] = None
+) -> AgentIndex:
+    """Returns the index of an agent, which can be reused across parses."""
+    if isinstance(source, AgentIndex):
+        return source
+    if isinstance(source, Mapping):
+        return AgentIndex(Path("."), stats=stats, documents=source)
+    return AgentIndex(Path(source), stats=stats)
+
+
+def parse_agent(
+    source: AgentSource,
+    language: str,
+    stats: Optional[ConversionStats] = None,
+    parse_file: Optional[FileParser] = None,
+) -> AgentData:
+    """
+    Parses one language of a Dialogflow agent into its intermediate
+    representation, without writing anything to disk. Every file goes
+    through `parse_file(func, file_path, *args)`, which defaults to reading
+    the file from the index and may be replaced, e.g. to cache results.
+    """
+    index = load_index(source, stats)
+    if parse_file is None:
+
+        def parse_file(func: Callable, file_path: AgentFile, *args) -> Any:
+            return func(index.read_json(file_path), *args)
+
+    if not index.has_language(language):
+        raise ConversionError(
+            f"Language code '{language}' files not found "
+            "in intents or entities directories."
+        )
+
+    agent = AgentData(language)
+    for stem, file_path in index.usersays(language).items():
+        agent.intents.append(
+            parse_file(parse_intent, file_path, index.names.intent(stem))
+        )
+    for stem, file_path in index.intent_files.items():
+        agent.responses.extend(
+            parse_file(parse_responses, file_path, index.names.intent(stem), language)
+        )
+    for stem, file_path in index.entries(language).items():
+        synonyms, lookup, compound = parse_file(
+            parse_entity, file_path, index.names.entity(stem)
+        )
+        agent.synonyms.extend(synonyms)
+        if lookup.values:
+            agent.lookups.append(lookup)
+        if compound.entries:
+            agent.compounds.append(compound)
+    entity_names = {index.names.entity(stem) for stem in index.entries(language)}
+    agent.slots = [Slot(name) for name in sorted(entity_names)]
+    return agent
+
+
+def parse_agent_languages(
+    source: AgentSource,
+    languages: list[str],
+    stats: Optional[ConversionStats] = None,
+    parse_file: Optional[FileParser] = None,
+) -> dict[str, AgentData]:
+    """
+    Parses several languages of an agent from a single index. Passing
+    `["all"]` parses every language found in the agent.
+    """
+    index = load_index(source, stats)
+    if languages == ["all"]:
+        languages = index.languages
+    return {
+        language: parse_agent(index, language, parse_file=parse_file)
+        for language in languages
+    }
@@ -0,0 +1,167 @@
+import json
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from dialog2rasa.converters.core import convert_languages
+from dialog2rasa.utils.general import setup_logger
+from dialog2rasa.utils.index import AgentIndex
+from dialog2rasa.utils.parallel import init_worker, mp_context, worker_settings
+from dialog2rasa.utils.stats import ConversionStats
+
+
+class AgentResult(NamedTuple):
+    """Outcome of converting one agent of a batch."""
+
+    agent: str
+    seconds: float
+    languages: list[str]
+    counters: dict[str, int]
+    error: Optional[str] = None
+
+
+class _AgentLoggerAdapter(logging.LoggerAdapter):
+    """Prefixes log messages with the agent they belong to."""
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['agent']}] {msg}", kwargs
+
+
+def is_agent(path: Path) -> bool:
+    """Checks if a path is a Dialogflow export, either a folder or a .zip."""
+    if path.suffix == ".zip":
+        return path.is_file()
+    return (path / "intents").is_dir() or (path / "entities").is_dir()
+
+
+def discover_agents(source: Path) -> list[Path]:
+    """
+    Returns the agents of a batch. The source is either a directory, whose
+    agent folders and .zip exports are converted, or a manifest file listing
+    one agent path per line. Relative manifest paths are resolved against the
+    manifest's folder; blank lines and lines starting with '#' are ignored.
+    """
+    if source.is_dir():
+        return sorted(path for path in source.iterdir() if is_agent(path))
+
+    agents = []
+    for line in source.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            agents.append(source.parent / line)
+    return agents
+
+
+def agent_name(agent_dir: Path) -> str:
+    """Returns the name of an agent's output folder within a batch output."""
+    return agent_dir.stem if agent_dir.suffix == ".zip" else agent_dir.name
+
+
+def convert_agent(
+    agent_dir: Path,
+    languages: list[str],
+    output_root: Optional[Path] = None,
+    verbose: bool = False,
+    **kwargs,
+) -> AgentResult:
+    """
+    Converts one agent of a batch, catching any error so that a failing
+    agent does not abort the others.
+    """
+    name = agent_name(agent_dir)
+    logger = _AgentLoggerAdapter(
+        setup_logger("dialog2rasa.batch", logging.WARNING, verbose=verbose),
+        {"agent": name},
+    )
+    if output_root is not None:
+        output_root = output_root / name
+
+    start = time.perf_counter()
+    try:
+        stats = ConversionStats()
+        index = AgentIndex(agent_dir, stats=stats)
+        if languages == ["all"]:
+            languages = index.languages
+        convert_languages(
+            agent_dir,
+            languages,
+            logger,
+            stats=stats,
+            index=index,
+            output_root=output_root,
+            **kwargs,
+        )
+    except Exception as error:
+        logger.error(f"Conversion failed: {error}")
+        seconds = time.perf_counter() - start
+        return AgentResult(name, seconds, languages, {}, str(error) or repr(error))
+    seconds = time.perf_counter() - start
+    return AgentResult(name, seconds, languages, dict(stats.counters))
+
+
+def convert_batch(
+    agents: list[Path],
+    languages: list[str],
+    workers: int = 1,
+    **kwargs,
+) -> Iterator[AgentResult]:
+    """
+    Converts several agents in one process, or in a pool of `workers`
+    processes that each convert many agents, so that interpreter startup and
+    imports are paid once per worker rather than once per agent. Results are
+    yielded in the order of `agents`.
+    """
+    if workers <= 1 or len(agents) <= 1:
+        for agent_dir in agents:
+            yield convert_agent(agent_dir, languages, **kwargs)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(agents)),
+        mp_context=mp_context(),
+        initializer=init_worker,
+        initargs=worker_settings(),
+    ) as executor:
+        futures = [
+            executor.submit(convert_agent, agent_dir, languages, **kwargs)
+            for agent_dir in agents
+        ]
+        for agent_dir, future in zip(agents, futures):
+            try:
+                yield future.result()
+            except Exception as error:
+                # e.g. a worker process killed by the system
+                name = agent_name(agent_dir)
+                yield AgentResult(name, 0.0, languages, {}, repr(error))
+
+
+def summary_table(results: list[AgentResult]) -> str:
+    """
+    Returns the per-agent timings as a human-readable table, detailing the
+    converted languages or the error of every agent.
+    """
+    width = max([len("agent")] + [len(result.agent) for result in results])
+    lines = [f"{'agent':<{width}}  {'seconds':>10}  {'status':<6}  details"]
+    for result in results:
+        status = "failed" if result.error else "ok"
+        lines.append(
+            f"{result.agent:<{width}}  {result.seconds:>10.4f}  {status:<6}  "
+            f"{result.error or ', '.join(result.languages)}"
+        )
+    failed = sum(1 for result in results if result.error)
+    lines.append("")
+    lines.append(
+        f"{len(results) - failed} of {len(results)} agent(s) converted in "
+        f"{sum(result.seconds for result in results):.4f} seconds of work."
+    )
+    return "\n".join(lines)
+
+
+def write_summary_json(results: list[AgentResult], file_path: Path) -> None:
+    """Writes the per-agent timings, counters and errors to a JSON file."""
+    with Path(file_path).open("w", encoding="utf-8") as file:
+        json.dump(
+            {"agents": [result._asdict() for result in results]}, file, indent=2
+        )
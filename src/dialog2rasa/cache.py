@@ -0,0 +1,283 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+
+from dialog2rasa.api import parse_agent_languages
+from dialog2rasa.serializers import RenderCache, render_agent
+from dialog2rasa.utils.index import AgentIndex
+from dialog2rasa.utils.io import AgentFile, read_json_file, release_archives
+from dialog2rasa.utils.lookup import DEFAULT_SHARD_SIZE
+
+# How changed agent files are detected: by modification time and size only,
+# or by their content hash when those differ, e.g. after an agent is unzipped
+INVALIDATION_MODES = ("mtime", "hash")
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+# Turns file sizes into an estimate of the memory held by their parse
+# results, which take about 1.5 times the size of their JSON source
+PARSED_SIZE_FACTOR = 2
+
+
+class CachedPart(NamedTuple):
+    """Parse result of an agent file and the version of the file it is from."""
+
+    signature: tuple[int, int]
+    digest: Optional[bytes]
+    result: Any
+
+
+class Preview(NamedTuple):
+    """Rendered Rasa files of an agent, by language then path."""
+
+    files: dict[str, dict[str, str]]
+    reparsed: int
+    reused: int
+    seconds: float
+
+
+def _signature(file_path: AgentFile) -> tuple[int, int]:
+    # Calling os.stat directly skips the overhead of Path.stat
+    file_stat = os.stat(file_path) if isinstance(file_path, Path) else file_path.stat()
+    return file_stat.st_mtime_ns, file_stat.st_size
+
+
+def _digest(file_path: AgentFile) -> bytes:
+    with file_path.open("rb") as file:
+        return hashlib.blake2b(file.read(), digest_size=16).digest()
+
+
+class CachedAgent:
+    """
+    Parse results of an agent's files, kept across conversions. Every
+    conversion only reparses and renders again the files that changed since
+    they were last parsed, and rendered files are reused as long as no file
+    changed. The agent is only scanned again when files were added, removed
+    or renamed, which changes the modification time of their folder.
+    """
+
+    def __init__(self, agent_dir: Path, invalidation: str = "mtime") -> None:
+        if invalidation not in INVALIDATION_MODES:
+            raise ValueError(
+                f"Unknown invalidation mode '{invalidation}', "
+                f"expected one of {INVALIDATION_MODES}."
+            )
+        self.agent_dir = agent_dir
+        self.invalidation = invalidation
+        self.lock = threading.Lock()
+        self.size = 0
+        self._parts: dict[tuple, CachedPart] = {}
+        self._rendered: dict[tuple, dict[str, dict[str, str]]] = {}
+        self._render_caches: dict[tuple, RenderCache] = {}
+        self._index: Optional[AgentIndex] = None
+        self._index_signature: Optional[tuple] = None
+        self._signatures: dict[AgentFile, tuple[int, int]] = {}
+
+    def convert(
+        self,
+        languages: list[str],
+        lookup_mode: str = "raw",
+        lookup_shard_size: int = DEFAULT_SHARD_SIZE,
+        changed: Optional[Iterable[AgentFile]] = None,
+    ) -> Preview:
+        """
+        Returns the rendered files of the agent in the given languages. When
+        the files that `changed` are known, e.g. from file system events,
+        only those and new files are checked for changes.
+        """
+        start = time.perf_counter()
+        with self.lock:
+            index = self._scan()
+            if languages == ["all"]:
+                languages = index.languages
+            changed = None if changed is None else set(changed)
+            signatures = {}
+            for file_path in self._agent_files(index, languages):
+                signature = None
+                if changed is not None and file_path not in changed:
+                    signature = self._signatures.get(file_path)
+                signatures[file_path] = signature or _signature(file_path)
+            render_key = (tuple(languages), lookup_mode, lookup_shard_size)
+            if signatures == self._signatures and render_key in self._rendered:
+                # Nothing changed since the last conversion
+                files = self._rendered[render_key]
+                seconds = time.perf_counter() - start
+                return Preview(files, 0, len(signatures), seconds)
+
+            parse_file, reparsed, used = self._file_parser(signatures)
+            agents = parse_agent_languages(index, languages, parse_file=parse_file)
+            self._signatures = signatures
+
+            stale = self._parts.keys() - used
+            for key in stale:
+                del self._parts[key]
+            if reparsed or stale:
+                self._rendered.clear()
+            if render_key not in self._rendered:
+                cache = self._render_caches.setdefault(render_key, RenderCache())
+                self._rendered[render_key] = {
+                    language: render_agent(
+                        agent, lookup_mode, lookup_shard_size, cache
+                    )
+                    for language, agent in agents.items()
+                }
+                cache.prune()
+            self.size = self._estimate_size()
+            files = self._rendered[render_key]
+        reused = len(signatures) - len(reparsed)
+        return Preview(files, len(reparsed), reused, time.perf_counter() - start)
+
+    @staticmethod
+    def _agent_files(index: AgentIndex, languages: list[str]) -> list[AgentFile]:
+        """Returns the files of the agent read to convert the languages."""
+        file_paths = list(index.intent_files.values())
+        for language in languages:
+            file_paths.extend(index.usersays(language).values())
+            file_paths.extend(index.entries(language).values())
+        return file_paths
+
+    def _scan(self) -> AgentIndex:
+        """Returns the index of the agent, scanned again if files changed."""
+        is_archive = self.agent_dir.is_file()
+        if is_archive:
+            signature: tuple = _signature(self.agent_dir)
+        else:
+            signature = tuple(
+                _signature(folder) if folder.is_dir() else None
+                for folder in (
+                    self.agent_dir / "intents",
+                    self.agent_dir / "entities",
+                )
+            )
+        if signature != self._index_signature:
+            if is_archive and self._index is not None:
+                # The archive was replaced, so its cached handle is stale
+                release_archives()
+            self._index = AgentIndex(self.agent_dir)
+            self._index_signature = signature
+        return self._index
+
+    def _file_parser(
+        self, signatures: dict[AgentFile, tuple[int, int]]
+    ) -> tuple[Callable, set[AgentFile], set[tuple]]:
+        """
+        Returns a `parse_file` function for the parsers of the API, which
+        reuses the results of files whose signature did not change, along
+        with the set of files it reparsed and the set of parts asked for.
+        """
+        reparsed: set[AgentFile] = set()
+        used: set[tuple] = set()
+        # Files parsed by several functions, e.g. per language, are read once
+        contents: dict[AgentFile, Any] = {}
+
+        def parse_file(func: Callable, file_path: AgentFile, *args) -> Any:
+            key = (func.__name__, file_path, args)
+            used.add(key)
+            signature = signatures[file_path]
+            part = self._parts.get(key)
+            digest = None
+            if part is not None and part.signature != signature:
+                if self.invalidation == "hash":
+                    digest = _digest(file_path)
+                    if digest == part.digest:
+                        part = self._parts[key] = part._replace(signature=signature)
+                    else:
+                        part = None
+                else:
+                    part = None
+            if part is not None:
+                return part.result
+
+            if file_path not in contents:
+                contents[file_path] = read_json_file(file_path)
+            if self.invalidation == "hash" and digest is None:
+                digest = _digest(file_path)
+            result = func(contents[file_path], *args)
+            self._parts[key] = CachedPart(signature, digest, result)
+            reparsed.add(file_path)
+            return result
+
+        return parse_file, reparsed, used
+
+    def _estimate_size(self) -> int:
+        parsed = sum(part.signature[1] for part in self._parts.values())
+        rendered = sum(
+            len(content)
+            for languages in self._rendered.values()
+            for files in languages.values()
+            for content in files.values()
+        )
+        # Rendered items are kept both on their own and joined into files
+        return parsed * PARSED_SIZE_FACTOR + 2 * rendered
+
+
+class AgentCache:
+    """
+    Least recently used cache of parsed agents, evicting agents once their
+    estimated memory exceeds `max_size` bytes. The agent being converted is
+    always kept, even if it alone exceeds the limit.
+    """
+
+    def __init__(
+        self, max_size: int = DEFAULT_CACHE_SIZE, invalidation: str = "mtime"
+    ) -> None:
+        self.max_size = max_size
+        self.invalidation = invalidation
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._agents: OrderedDict[Path, CachedAgent] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def convert(
+        self,
+        agent_dir: Path,
+        languages: list[str],
+        lookup_mode: str = "raw",
+        lookup_shard_size: int = DEFAULT_SHARD_SIZE,
+    ) -> Preview:
+        """Returns the rendered files of an agent, reusing its cached parts."""
+        agent = self._get(agent_dir)
+        preview = agent.convert(languages, lookup_mode, lookup_shard_size)
+        self._evict(agent)
+        return preview
+
+    def _get(self, agent_dir: Path) -> CachedAgent:
+        with self._lock:
+            agent = self._agents.get(agent_dir)
+            if agent is None:
+                self.misses += 1
+                agent = self._agents[agent_dir] = CachedAgent(
+                    agent_dir, self.invalidation
+                )
+            else:
+                self.hits += 1
+            self._agents.move_to_end(agent_dir)
+            return agent
+
+    def _evict(self, current: CachedAgent) -> None:
+        with self._lock:
+            while self.size > self.max_size and len(self._agents) > 1:
+                agent_dir, agent = next(iter(self._agents.items()))
+                if agent is current:
+                    break
+                del self._agents[agent_dir]
+                self.evictions += 1
+
+    @property
+    def size(self) -> int:
+        """Returns the estimated memory held by the cached agents, in bytes."""
+        return sum(agent.size for agent in self._agents.values())
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "agents": [str(agent_dir) for agent_dir in self._agents],
+                "size": self.size,
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,45 +1,633 @@
 import argparse
+import cProfile
+import gc
+import signal
+import sys
+import tracemalloc
 from pathlib import Path
+from typing import Optional
 
-from dialog2rasa.converters.core import DialogflowToRasaConverter
+from dialog2rasa.batch import (
+    convert_batch,
+    discover_agents,
+    summary_table,
+    write_summary_json,
+)
+from dialog2rasa.cache import DEFAULT_CACHE_SIZE, INVALIDATION_MODES, AgentCache
+from dialog2rasa.converters.base import default_output_root
+from dialog2rasa.converters.core import (
+    OUTPUT_LAYOUTS,
+    ConversionError,
+    convert_languages,
+)
+from dialog2rasa.server import make_server
+from dialog2rasa.utils.decoding import JSON_BACKENDS, set_json_backend
+from dialog2rasa.utils.entities import SLOT_SOURCES
 from dialog2rasa.utils.general import setup_logger
+from dialog2rasa.utils.io import DEFAULT_MEMORY_BUDGET, is_zip_archive
+from dialog2rasa.utils.lookup import DEFAULT_SHARD_SIZE, LOOKUP_MODES
+from dialog2rasa.utils.naming import SHARD_KEYS
+from dialog2rasa.utils.parallel import DEFAULT_IO_THREADS
+from dialog2rasa.utils.stats import (
+    ConversionStats,
+    peak_rss_bytes,
+    peak_traced_bytes,
+)
+from dialog2rasa.watch import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL, watch_agent
+
+
+def add_conversion_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options shared by single-agent and batch conversions."""
+    parser.add_argument(
+        "--incremental",
+        "-i",
+        action="store_true",
+        help="Only re-parse intent and entity files that changed since the "
+        "last run, reusing cached results recorded in a manifest file next "
+        "to the output directory.",
+    )
+    parser.add_argument(
+        "--stream-entries",
+        action="store_true",
+        help="Parse entity entry files entry by entry, writing each entry "
+        "straight to its output file, so memory use stays constant for very "
+        "large entities. Entry files are then converted serially and are not "
+        "cached by --incremental.",
+    )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Map entity entry files into memory instead of reading them "
+        "through a buffer. Only used with --stream-entries.",
+    )
+    parser.add_argument(
+        "--optimize-lookups",
+        choices=LOOKUP_MODES,
+        default="raw",
+        help="How lookup tables are written. 'raw' (default) keeps every "
+        "entry as is; 'dedupe' normalizes whitespace, removes duplicates and "
+        "sorts the entries; 'regex' further compiles them into compact, "
+        "prefix-factored Rasa regexes (lookup/[ENTITY].yml), which are much "
+        "faster to featurize for large tables.",
+    )
+    parser.add_argument(
+        "--regex-shard-size",
+        type=positive_int,
+        default=DEFAULT_SHARD_SIZE,
+        help="Maximum number of entries compiled into one regex with "
+        f"--optimize-lookups regex. Defaults to {DEFAULT_SHARD_SIZE}.",
+    )
+    parser.add_argument(
+        "--max-examples-per-intent",
+        type=positive_int,
+        default=None,
+        help="Keep at most this many training phrases per intent, sampled "
+        "uniformly and reproducibly (see --sample-seed), in their original "
+        "order. Applied after --dedupe.",
+    )
+    parser.add_argument(
+        "--output-layout",
+        choices=OUTPUT_LAYOUTS,
+        default="single",
+        help="'single' (default) writes all intents and synonyms to "
+        "data/nlu/nlu.yml, and all responses and slots to domain.yml. "
+        "'sharded' writes the intents to data/nlu/intents/[SHARD].yml, the "
+        "synonyms to data/nlu/synonyms.yml, and the domain to "
+        "domain/responses/[SHARD].yml and domain/slots.yml, writing shards "
+        "concurrently (see --io-threads).",
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=SHARD_KEYS,
+        default="intent",
+        help="How intents are grouped into shards with --output-layout "
+        "sharded: one file per 'intent' (default), or per 'prefix' of their "
+        "names up to the first dot, e.g. chitchat.yml for 'chitchat.*'.",
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Drop training phrases of an intent that only differ from an "
+        "earlier one by case, whitespace or entity annotations.",
+    )
+    parser.add_argument(
+        "--sample-seed",
+        type=int,
+        default=0,
+        help="Seed of the sampling of --max-examples-per-intent, so that the "
+        "same phrases are kept from one run to the next. Defaults to 0.",
+    )
+    parser.add_argument(
+        "--slots-from",
+        choices=SLOT_SOURCES,
+        default="all",
+        help="Entities written as slots to the domain: 'all' entities of the "
+        "agent (default), or only those 'used' in training phrase annotations, "
+        "including system entities.",
+    )
+    parser.add_argument(
+        "--read-ahead",
+        type=non_negative_int,
+        default=0,
+        metavar="DEPTH",
+        help="Read up to DEPTH intent and entity files ahead of their "
+        "conversion in background threads, and write entity files from a "
+        "background thread, so that slow storage (e.g. NFS) and conversion "
+        "overlap. Defaults to 0 (files are read when converted). Not used "
+        "with --jobs, whose workers read their own files.",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=positive_int,
+        default=DEFAULT_IO_THREADS,
+        help="Number of threads reading files ahead with --read-ahead, and "
+        f"writing shards with --output-layout sharded. Defaults to "
+        f"{DEFAULT_IO_THREADS}.",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=positive_int,
+        default=None,
+        metavar="MB",
+        help="Memory, in MB, that the output sections of each language may "
+        "hold before the largest ones are spilled to temporary files next to "
+        "the output. The peak memory use is reported when given. Defaults "
+        f"to {DEFAULT_MEMORY_BUDGET // (1024 * 1024)}.",
+    )
+    parser.add_argument(
+        "--fsync",
+        action="store_true",
+        help="Flush every changed output file to disk before the output "
+        "folder is swapped into place, so that a crash cannot leave empty "
+        "files behind. Slower, especially on network file systems.",
+    )
+    add_backend_arguments(parser)
+
+
+def add_backend_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the options selecting the JSON library."""
+    parser.add_argument(
+        "--json-backend",
+        choices=JSON_BACKENDS,
+        default="auto",
+        help="Library used to decode the agent's JSON files. Defaults to "
+        "'auto', which prefers msgspec, then orjson, when installed, and "
+        "falls back to the standard library.",
+    )
+
+
+def positive_int(value: str) -> int:
+    """Parses an argument that must be a positive integer."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer: {value}")
+    return number
+
+
+def non_negative_int(value: str) -> int:
+    """Parses an argument that must be zero or a positive integer."""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"expected a non-negative integer: {value}")
+    return number
+
+
+def positive_float(value: str) -> float:
+    """Parses an argument that must be a positive, finite number."""
+    number = float(value)
+    if not 0 < number < float("inf"):
+        raise argparse.ArgumentTypeError(f"expected a positive number: {value}")
+    return number
+
+
+def megabytes(value: Optional[int]) -> Optional[int]:
+    """Converts an optional size in MB to bytes."""
+    return value * 1024 * 1024 if value is not None else None
+
+
+def unsupported_watch_options(args: argparse.Namespace) -> list[str]:
+    """
+    Returns the options set that reconversions cannot honor. They render the
+    single-file layout from cached parse results, which are neither sampled,
+    streamed nor spilled, and only the initial conversion writes reports.
+    """
+    options = {
+        "--dedupe": args.dedupe,
+        "--max-examples-per-intent": args.max_examples_per_intent is not None,
+        "--output-layout sharded": args.output_layout != "single",
+        "--slots-from used": args.slots_from != "all",
+        "--stream-entries": args.stream_entries,
+        "--memory-budget": args.memory_budget is not None,
+        "--stats-json": args.stats_json is not None,
+        "--entity-report": args.entity_report is not None,
+        "--profile": args.profile is not None,
+    }
+    return [option for option, is_set in options.items() if is_set]
+
+
+def parse_languages(languages: str) -> list[str]:
+    """Splits comma-separated language codes."""
+    return [language.strip() for language in languages.split(",")]
 
 
 def main() -> None:
+    if sys.argv[1:2] == ["batch"]:
+        batch_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["serve"]:
+        serve_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description="Transforms a Dialogflow agent into Rasa format. "
         "The result is saved in /output/[LANGUAGE_CODE], where [LANGUAGE_CODE] "
         "is replaced with the actual language code (e.g., 'en', 'de'), inside "
-        "the Dialogflow agent's directory."
+        "the Dialogflow agent's directory unless another output is given. "
+        "Run 'dialog2rasa batch --help' to convert many agents at once, or "
+        "'dialog2rasa serve --help' to convert agents on request."
     )
     parser.add_argument(
         "--path",
         "-p",
         required=True,
-        help="Path to the Dialogflow agent's extracted/unzipped folder.",
+        help="Path to the Dialogflow agent's extracted/unzipped folder or to "
+        "its .zip export, which is read directly without extracting it.",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        default=None,
+        help="Directory in which the [LANGUAGE_CODE] output folder is created. "
+        "Defaults to 'output' inside the agent's folder (for .zip exports, a "
+        "folder named after the archive, next to it).",
     )
     parser.add_argument(
         "--language",
         "-l",
         default="de",
         help="Language code (e.g., 'en' for English) of the Dialogflow agent. "
+        "Several codes can be given comma-separated (e.g., 'en,de,fr'), or "
+        "'all' to convert every language found in the agent. "
         "Defaults to 'de' (German).",
     )
+    parser.add_argument(
+        "--parallel-languages",
+        action="store_true",
+        help="Write the output of several languages concurrently.",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=positive_int,
+        default=1,
+        help="Number of worker processes used to convert intent and entity "
+        "files in parallel. Defaults to 1 (serial conversion).",
+    )
+    add_conversion_arguments(parser)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After converting, keep watching the agent's intents and "
+        "entities folders (or its .zip export) and convert again whenever "
+        "files change, only parsing the changed files and only writing the "
+        "output files whose content changed. Uses inotify when "
+        "inotify_simple is installed, and polling otherwise. Options that "
+        "reconversions cannot honor, e.g. sampling, a sharded layout or "
+        "reports, are rejected.",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=positive_float,
+        default=DEFAULT_DEBOUNCE,
+        help="Seconds without further changes after which a burst of "
+        "changes, e.g. from unzipping an export, is converted at once. "
+        f"Only used with --watch. Defaults to {DEFAULT_DEBOUNCE}.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=positive_float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="Seconds between two checks for changes with --watch. Defaults "
+        f"to {DEFAULT_POLL_INTERVAL}.",
+    )
     parser.add_argument(
         "--verbose",
         "-v",
         action="store_true",
-        help="Increase output verbosity for debugging purposes.",
+        help="Increase output verbosity for debugging purposes, including a "
+        "summary table of stage timings and counters.",
+    )
+    parser.add_argument(
+        "--stats-json",
+        default=None,
+        help="Path of a JSON report with stage timings and counters "
+        "(files, bytes, intents, examples, synonyms, lookup entries, etc.).",
+    )
+    parser.add_argument(
+        "--entity-report",
+        default=None,
+        metavar="PATH",
+        help="Path of a JSON report cross-checking, per language, the entities "
+        "annotated in training phrases with the agent's entities: unknown "
+        "entities, unused entities, system entity usage and annotation counts.",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        help="Path of a .prof file in which a cProfile of the run is dumped.",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Trace Python allocations with tracemalloc and report their "
+        "peak, which, unlike the peak RSS, excludes the interpreter and "
+        "libraries, so containers can be sized exactly. Worker processes of "
+        "--jobs are not traced. Slows the conversion down.",
     )
 
     args = parser.parse_args()
+    unsupported = unsupported_watch_options(args) if args.watch else []
+    if unsupported:
+        parser.error(f"--watch cannot be combined with {', '.join(unsupported)}.")
 
     logger = setup_logger(verbose=args.verbose)
 
-    converter = DialogflowToRasaConverter(
-        agent_dir=Path(args.path), language=args.language, logger=logger
+    try:
+        set_json_backend(args.json_backend)
+    except ValueError as error:
+        parser.error(str(error))
+
+    stats = ConversionStats()
+    conversion_kwargs = dict(
+        agent_dir=Path(args.path),
+        languages=parse_languages(args.language),
+        logger=logger,
+        parallel=args.parallel_languages,
+        stats=stats,
+        jobs=args.jobs,
+        incremental=args.incremental,
+        stream_entries=args.stream_entries,
+        use_mmap=args.mmap,
+        lookup_mode=args.optimize_lookups,
+        lookup_shard_size=args.regex_shard_size,
+        max_examples_per_intent=args.max_examples_per_intent,
+        dedupe_examples=args.dedupe,
+        sample_seed=args.sample_seed,
+        read_ahead_depth=args.read_ahead,
+        io_threads=args.io_threads,
+        output_layout=args.output_layout,
+        shard_by=args.shard_by,
+        fsync=args.fsync,
+        memory_budget=megabytes(args.memory_budget),
+        slots_from=args.slots_from,
+        entity_report=Path(args.entity_report) if args.entity_report else None,
+        output_root=Path(args.output) if args.output else None,
+    )
+
+    if args.trace_memory:
+        tracemalloc.start()
+    try:
+        if args.profile:
+            profiler = cProfile.Profile()
+            profiler.runcall(convert_languages, **conversion_kwargs)
+            profiler.dump_stats(args.profile)
+            logger.info(f"Profile saved to '{args.profile}'.")
+        else:
+            convert_languages(**conversion_kwargs)
+    except ConversionError as error:
+        logger.error(str(error))
+        sys.exit(1)
+
+    peak_rss = peak_rss_bytes()
+    if peak_rss is not None:
+        stats.incr("peak_rss_bytes", peak_rss)
+        if args.memory_budget is not None:
+            logger.info(f"Peak memory use (RSS): {peak_rss / 1024**2:.1f} MB.")
+    peak_traced = peak_traced_bytes()
+    if peak_traced is not None:
+        tracemalloc.stop()
+        stats.incr("peak_traced_bytes", peak_traced)
+        logger.info(f"Peak memory use (tracemalloc): {peak_traced / 1024**2:.1f} MB.")
+
+    if args.stats_json:
+        stats.write_json(Path(args.stats_json))
+        logger.info(f"Statistics saved to '{args.stats_json}'.")
+    if args.verbose:
+        logger.info(f"Conversion statistics:\n{stats.summary_table()}")
+
+    if args.watch:
+        agent_dir = Path(args.path)
+        output_root = conversion_kwargs["output_root"] or default_output_root(
+            agent_dir, is_zip_archive(agent_dir)
+        )
+        try:
+            watch_agent(
+                agent_dir,
+                conversion_kwargs["languages"],
+                output_root,
+                logger,
+                lookup_mode=args.optimize_lookups,
+                lookup_shard_size=args.regex_shard_size,
+                debounce=args.debounce,
+                poll_interval=args.poll_interval,
+                fsync=args.fsync,
+            )
+        except KeyboardInterrupt:
+            pass
+
+
+def batch_main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="dialog2rasa batch",
+        description="Converts many Dialogflow agents in a single process. "
+        "A failing agent is reported without stopping the others, and a "
+        "summary with per-agent timings is printed at the end.",
+    )
+    parser.add_argument(
+        "source",
+        help="Directory holding the agents (extracted folders or .zip "
+        "exports), or a manifest file listing one agent path per line.",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        default=None,
+        help="Directory in which an output folder named after each agent is "
+        "created. Defaults to 'output' inside each agent's folder.",
+    )
+    parser.add_argument(
+        "--language",
+        "-l",
+        default="all",
+        help="Language codes to convert, comma-separated. Defaults to 'all', "
+        "which converts every language found in each agent.",
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=positive_int,
+        default=1,
+        help="Number of worker processes converting agents concurrently. "
+        "Defaults to 1 (agents are converted one after another).",
+    )
+    add_conversion_arguments(parser)
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="Log the progress of every agent, not only warnings and errors.",
+    )
+    parser.add_argument(
+        "--summary-json",
+        default=None,
+        help="Path of a JSON report with the timings, counters and errors of "
+        "every agent.",
+    )
+
+    args = parser.parse_args(argv)
+
+    logger = setup_logger(verbose=args.verbose)
+
+    try:
+        set_json_backend(args.json_backend)
+    except ValueError as error:
+        parser.error(str(error))
+
+    source = Path(args.source)
+    if not source.exists():
+        parser.error(f"'{source}' does not exist.")
+    agents = discover_agents(source)
+    if not agents:
+        parser.error(f"No Dialogflow agents found in '{source}'.")
+    logger.info(f"Converting {len(agents)} agent(s)...")
+
+    results = list(
+        convert_batch(
+            agents,
+            parse_languages(args.language),
+            workers=args.workers,
+            output_root=Path(args.output) if args.output else None,
+            verbose=args.verbose,
+            incremental=args.incremental,
+            stream_entries=args.stream_entries,
+            use_mmap=args.mmap,
+            lookup_mode=args.optimize_lookups,
+            lookup_shard_size=args.regex_shard_size,
+            max_examples_per_intent=args.max_examples_per_intent,
+            dedupe_examples=args.dedupe,
+            sample_seed=args.sample_seed,
+            read_ahead_depth=args.read_ahead,
+            io_threads=args.io_threads,
+            output_layout=args.output_layout,
+            shard_by=args.shard_by,
+            fsync=args.fsync,
+            memory_budget=megabytes(args.memory_budget),
+            slots_from=args.slots_from,
+        )
+    )
+
+    logger.info(f"Batch summary:\n{summary_table(results)}")
+    if args.summary_json:
+        write_summary_json(results, Path(args.summary_json))
+        logger.info(f"Summary saved to '{args.summary_json}'.")
+    if any(result.error for result in results):
+        sys.exit(1)
+
+
+def serve_main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="dialog2rasa serve",
+        description="Serves conversions of Dialogflow agents over HTTP, "
+        "keeping parsed agents in memory between requests so that only the "
+        "files changed since the last request are parsed again. "
+        "GET /convert?agent=PATH&language=en&format=json|zip returns the Rasa "
+        "files of the agent at PATH, relative to the root; GET /stats "
+        "describes the agent cache.",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address the server listens on. Defaults to '127.0.0.1'.",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8000,
+        help="Port the server listens on. Defaults to 8000.",
+    )
+    parser.add_argument(
+        "--socket",
+        default=None,
+        help="Path of a Unix socket to listen on instead of a host and port.",
+    )
+    parser.add_argument(
+        "--root",
+        default=".",
+        help="Directory holding the agents, outside of which no agent is "
+        "served. Defaults to the current directory.",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+        help="Estimated memory, in MB, beyond which the least recently "
+        f"converted agents are evicted. Defaults to "
+        f"{DEFAULT_CACHE_SIZE // (1024 * 1024)}.",
+    )
+    parser.add_argument(
+        "--invalidate",
+        choices=INVALIDATION_MODES,
+        default="mtime",
+        help="How changed agent files are detected. 'mtime' (default) "
+        "reparses files whose modification time or size changed; 'hash' "
+        "then also compares their content, so that rewritten but identical "
+        "files, e.g. from unzipping an export again, are not reparsed.",
+    )
+    add_backend_arguments(parser)
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="Log every request.",
+    )
+
+    args = parser.parse_args(argv)
+
+    logger = setup_logger(verbose=args.verbose)
+
+    try:
+        set_json_backend(args.json_backend)
+    except ValueError as error:
+        parser.error(str(error))
+
+    root = Path(args.root)
+    if not root.is_dir():
+        parser.error(f"'{root}' is not a directory.")
+    socket_path = Path(args.socket) if args.socket else None
+    server = make_server(
+        AgentCache(megabytes(args.cache_size), args.invalidate),
+        root,
+        logger,
+        host=args.host,
+        port=args.port,
+        socket_path=socket_path,
     )
-    converter.convert_all()
+    address = socket_path or f"http://{args.host}:{server.server_address[1]}"
+    logger.info(f"Serving agents in '{root}' on {address}.")
+    # Stopping the server, e.g. from a process manager, still cleans it up
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    # Objects alive at startup live as long as the server, so the garbage
+    # collector is spared from traversing them. Cached agents are not frozen,
+    # since evicting them must free their memory.
+    gc.freeze()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and socket_path.exists():
+            socket_path.unlink()
 
 
 if __name__ == "__main__":
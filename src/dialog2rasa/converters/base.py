@@ -1,6 +1,22 @@
 import logging
 from abc import abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+
+from dialog2rasa.utils.index import AgentIndex
+from dialog2rasa.utils.io import AgentFile, OutputSections
+from dialog2rasa.utils.manifest import ConversionManifest
+from dialog2rasa.utils.naming import shard_name
+from dialog2rasa.utils.parallel import DEFAULT_IO_THREADS, map_json_files
+from dialog2rasa.utils.stats import ConversionStats
+
+
+def default_output_root(agent_dir: Path, is_archive: bool) -> Path:
+    """Returns the folder in which the output of an agent is written by default."""
+    # Zip exports write next to the archive, as if it had been extracted
+    agent_root = agent_dir.with_suffix("") if is_archive else agent_dir
+    return agent_root / "output"
 
 
 class BaseConverter:
@@ -8,22 +24,165 @@ class BaseConverter:
     Base converter to simplify initialization. Main functions are:
     1) Manipulate the strings from Dialogflow export files and;
     2) Export the output files following the RASA YAML-format.
+
+    Converters declare the output sections they produce and consume, so that
+    independent converters can be scheduled concurrently.
     """
 
-    def __init__(self, agent_dir: Path, language: str, logger: logging.Logger) -> None:
+    produces: tuple[str, ...] = ()
+    consumes: tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        agent_dir: Path,
+        language: str,
+        logger: logging.Logger,
+        index: Optional[AgentIndex] = None,
+        jobs: int = 1,
+        manifest: Optional[ConversionManifest] = None,
+        output_root: Optional[Path] = None,
+        stats: Optional[ConversionStats] = None,
+        sections: Optional[OutputSections] = None,
+        output_dir: Optional[Path] = None,
+        read_ahead_depth: int = 0,
+        io_threads: int = DEFAULT_IO_THREADS,
+        output_layout: str = "single",
+        shard_by: str = "intent",
+        pool: Optional[ProcessPoolExecutor] = None,
+    ) -> None:
         self.agent_dir = agent_dir
         self.language = language
         self.logger = logger
-        self.initialize_paths()
+        self.stats = stats if stats is not None else ConversionStats()
+        self.index = (
+            index if index is not None else AgentIndex(agent_dir, stats=self.stats)
+        )
+        self.jobs = jobs
+        # Worker processes shared by the converters of a run, when jobs > 1
+        self.pool = pool
+        self.read_ahead_depth = read_ahead_depth
+        self.io_threads = io_threads
+        self.output_layout = output_layout
+        self.shard_by = shard_by
+        self.manifest = manifest
+        self.output_root = output_root
+        self.sections = sections if sections is not None else OutputSections()
+        self.initialize_paths(output_dir)
 
-    def initialize_paths(self) -> None:
-        self.output_dir = self.agent_dir / "output" / self.language
+    def initialize_paths(self, output_dir: Optional[Path] = None) -> None:
+        """
+        Sets the output paths of the language, within `output_dir` when given,
+        e.g. a staging folder, or within the output root otherwise.
+        """
+        if self.output_root is None:
+            self.output_root = default_output_root(
+                self.agent_dir, self.index.is_archive
+            )
+        self.output_dir = output_dir or self.output_root / self.language
         self.domain_file_path = self.output_dir / "domain.yml"
         self.nlu_folder_dir = self.output_dir / "data" / "nlu"
         self.nlu_output_path = self.nlu_folder_dir / "nlu.yml"
         self.lookup_dir = self.nlu_folder_dir / "lookup"
-        self.intents_dir = self.agent_dir / "intents"
-        self.entities_dir = self.agent_dir / "entities"
+        # Paths of the sharded layout
+        self.intents_dir = self.nlu_folder_dir / "intents"
+        self.synonyms_path = self.nlu_folder_dir / "synonyms.yml"
+        self.domain_dir = self.output_dir / "domain"
+        self.manifest_path = self.output_root / f"{self.language}.manifest.json"
+
+    def _map_json_files(
+        self,
+        func: Callable,
+        tasks: Iterable[tuple[AgentFile, Sequence[Any]]],
+        shared: bool = False,
+    ) -> Iterator[Any]:
+        """
+        Applies `func(data, *args)` to every (file path, args) task in order,
+        spreading the work over `jobs` processes when more than one is set,
+        or reading files ahead in threads in read-ahead mode.
+        In incremental mode, unchanged files reuse their cached results.
+        Results of `shared` (language-independent) functions are computed once
+        per index and reused by the converters of every other language, then
+        dropped once every language consumed them.
+        """
+        if not shared or self.index.shared_languages < 2:
+            return self._convert_json_files(func, tasks)
+        if self.manifest is not None:
+            # Manifests share their records, which already avoids rework, so
+            # results are streamed while other languages wait for the lock
+            return self._holding_shared_lock(self._convert_json_files(func, tasks))
+
+        # Holding the lock lets concurrent languages wait for a single pass
+        with self.index.shared_lock:
+            tasks = list(tasks)
+            results = self.index.shared_results
+            keys = [(func.__name__, file_path) for file_path, _ in tasks]
+            pending = [task for key, task in zip(keys, tasks) if key not in results]
+            for (file_path, _), result in zip(
+                pending, self._convert_json_files(func, pending)
+            ):
+                results[(func.__name__, file_path)] = [
+                    result,
+                    self.index.shared_languages,
+                ]
+            consumed = []
+            for key in keys:
+                entry = results[key]
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del results[key]
+                consumed.append(entry[0])
+            return iter(consumed)
+
+    def _holding_shared_lock(self, results: Iterator[Any]) -> Iterator[Any]:
+        with self.index.shared_lock:
+            yield from results
+
+    def _convert_json_files(
+        self, func: Callable, tasks: Iterable[tuple[AgentFile, Sequence[Any]]]
+    ) -> Iterator[Any]:
+        if self.manifest is not None:
+            # Changed files are hashed from the bytes read to convert them
+            map_files, read_json = (
+                self.manifest.map_json_files,
+                self.index.read_hashed_json,
+            )
+        else:
+            map_files, read_json = map_json_files, self.index.read_json
+        return map_files(
+            func,
+            tasks,
+            read_json,
+            self.jobs,
+            self.stats,
+            self.read_ahead_depth,
+            self.io_threads,
+            pool=self.pool,
+        )
+
+    def _write_shards(
+        self, folder: Path, header: str, items: Iterable[tuple[str, str]]
+    ) -> None:
+        """
+        Writes the (intent name, content) items of the sharded layout into
+        one file per shard of intents within `folder`, each file starting
+        with `header`. Shards are collected as output sections, so they are
+        spilled to disk like any section, and written concurrently by
+        `io_threads` threads.
+        """
+        shards: dict[Path, str] = {}
+        for intent_name, content in items:
+            if content:
+                file_path = folder / f"{shard_name(intent_name, self.shard_by)}.yml"
+                section_name = shards.setdefault(file_path, f"shard:{file_path}")
+                self.sections.write(section_name, [content])
+        with ThreadPoolExecutor(max_workers=max(1, self.io_threads)) as executor:
+            for future in [
+                executor.submit(
+                    self.sections.assemble, file_path, [name], self.stats, header
+                )
+                for file_path, name in shards.items()
+            ]:
+                future.result()
 
     @abstractmethod
     def convert(self) -> None:
@@ -1,61 +1,320 @@
+import json
 import logging
-import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Optional
 
 from dialog2rasa.converters.base import BaseConverter
 from dialog2rasa.converters.manager import get_converter
-from dialog2rasa.utils.io import reset_directory
+from dialog2rasa.utils.entities import EntityIndex
+from dialog2rasa.utils.formatting import NLU_FILE_HEADER
+from dialog2rasa.utils.index import AgentIndex
+from dialog2rasa.utils.io import (
+    DEFAULT_MEMORY_BUDGET,
+    OutputSections,
+    StagedDirectory,
+    write_to_file,
+)
+from dialog2rasa.utils.lookup import DEFAULT_SHARD_SIZE
+from dialog2rasa.utils.manifest import ConversionManifest
+from dialog2rasa.utils.parallel import make_process_pool
+from dialog2rasa.utils.scheduler import DependencyScheduler
+from dialog2rasa.utils.stats import ConversionStats
+
+# Sections assembled, in order, into each output file shared by converters
+NLU_SECTIONS = ("nlu.intents", "nlu.synonyms")
+DOMAIN_SECTIONS = ("domain.responses", "domain.slots")
+# 'single' writes all intents and synonyms to `nlu.yml`, and all responses
+# and slots to `domain.yml`; 'sharded' splits them into folders of files
+OUTPUT_LAYOUTS = ("single", "sharded")
+
+
+class ConversionError(Exception):
+    """Raised when an agent cannot be converted, e.g. a language is missing."""
 
 
 class DialogflowToRasaConverter(BaseConverter):
     """Converts Dialogflow agent files (.zip export) to Rasa format."""
 
-    def __init__(self, agent_dir: Path, language: str, logger: logging.Logger) -> None:
+    def __init__(
+        self,
+        agent_dir: Path,
+        language: str,
+        logger: logging.Logger,
+        incremental: bool = False,
+        stream_entries: bool = False,
+        use_mmap: bool = False,
+        lookup_mode: str = "raw",
+        lookup_shard_size: int = DEFAULT_SHARD_SIZE,
+        max_examples_per_intent: Optional[int] = None,
+        dedupe_examples: bool = False,
+        sample_seed: int = 0,
+        fsync: bool = False,
+        memory_budget: Optional[int] = None,
+        slots_from: str = "all",
+        **kwargs,
+    ) -> None:
         """Initializes converter settings."""
-        super().__init__(agent_dir, language, logger)
+        super().__init__(agent_dir, language, logger, **kwargs)
+        self.incremental = incremental
+        self.fsync = fsync
+        self.memory_budget = memory_budget
+        self.entity_index = EntityIndex(
+            self.index.names.entity(stem)
+            for stem in {*self.index.entity_files, *self.index.entries(language)}
+        )
+        # Options only understood by the intent, entity and slot converters
+        self.converter_options = {
+            "intent": {
+                "max_examples": max_examples_per_intent,
+                "dedupe": dedupe_examples,
+                "seed": sample_seed,
+                "entity_index": self.entity_index,
+            },
+            "entity": {
+                "stream_entries": stream_entries,
+                "use_mmap": use_mmap,
+                "lookup_mode": lookup_mode,
+                "lookup_shard_size": lookup_shard_size,
+            },
+            "slot": {"slots_from": slots_from, "entity_index": self.entity_index},
+        }
         if not self._language_files_exist:
-            self.logger.error(
+            raise ConversionError(
                 f"Language code '{self.language}' files not found "
                 "in intents or entities directories. Please check if "
                 "the language was correctly input."
             )
-            sys.exit(1)
 
     @property
     def _language_files_exist(self) -> bool:
         """Checks if language-specific files exist in the agent directories."""
-        language_files_exist = any(
-            file.name.endswith(f"_{self.language}.json")
-            for file in self.intents_dir.glob("*.json")
-        ) and any(
-            file.name.endswith(f"_entries_{self.language}.json")
-            for file in self.entities_dir.glob("*.json")
-        )
-        return language_files_exist
+        return self.index.has_language(self.language)
 
     def _initialize_converters(self) -> None:
         """Initializes all required converters."""
         converter_types = ["intent", "utterance", "entity", "slot"]
         self.converters: dict[str, BaseConverter] = {}
         for converter_type in converter_types:
+            options = self.converter_options.get(converter_type, {})
             self.converters[converter_type] = get_converter(
-                converter_type, self.agent_dir, self.language, self.logger
+                converter_type,
+                self.agent_dir,
+                self.language,
+                self.logger,
+                index=self.index,
+                jobs=self.jobs,
+                pool=self.pool,
+                read_ahead_depth=self.read_ahead_depth,
+                io_threads=self.io_threads,
+                output_layout=self.output_layout,
+                shard_by=self.shard_by,
+                manifest=self.manifest,
+                output_root=self.output_root,
+                stats=self.stats,
+                sections=self.sections,
+                output_dir=self.output_dir,
+                **options,
             )
 
     def convert_all(self) -> None:
-        """Converts all Dialogflow files to Rasa format."""
+        """
+        Converts all Dialogflow files to Rasa format. The output is written
+        to a staging folder, which only replaces the previous output once
+        the conversion is complete.
+        """
         self.logger.debug("Starting conversion...")
 
-        self.logger.warning(f"Clearing all contents from '{self.output_dir}'...")
-        reset_directory(self.output_dir, "data/nlu/lookup")
-        self.logger.debug("Output directory cleared.")
+        staging = StagedDirectory(self.output_dir, fsync=self.fsync)
+        self.logger.debug(f"Writing the output to '{staging.path}'...")
+        staging.prepare("data/nlu/lookup")
+        # Spilled sections go next to the output, not to a RAM-backed /tmp
+        self.sections = OutputSections(
+            self.memory_budget or DEFAULT_MEMORY_BUDGET, staging.path
+        )
 
-        self._initialize_converters()
+        if self.incremental:
+            self.manifest = ConversionManifest(
+                self.manifest_path,
+                self.agent_dir,
+                shared_records=self.index.shared_records,
+            )
 
-        for _, converter in self.converters.items():
-            converter.convert()
+        # Converters share one pool of workers, unless the run provides one
+        owns_pool = self.jobs > 1 and self.pool is None
+        if owns_pool:
+            self.pool = make_process_pool(self.jobs)
+        self.initialize_paths(staging.path)
+        try:
+            self._initialize_converters()
+            self._schedule_conversion().run()
+        except BaseException:
+            staging.discard()
+            raise
+        finally:
+            self.initialize_paths()
+            if owns_pool:
+                self.pool.shutdown()
+                self.pool = None
+        changed, unchanged = staging.commit(self.stats)
+        if self.memory_budget is not None:
+            self._report_sections_memory()
+        self._report_entities()
+        self.logger.debug(
+            f"{changed} output file(s) changed, {unchanged} left unchanged."
+        )
+
+        if self.manifest is not None:
+            self.manifest.save()
+            self.logger.info(
+                f"Incremental conversion reused {self.manifest.reused} "
+                f"and converted {self.manifest.converted} file(s)."
+            )
 
         self.logger.info(
             "Conversion completed. "
             f"The output files can be found in '{self.output_dir}'."
         )
+
+    def _report_entities(self) -> None:
+        unknown = self.entity_index.unknown
+        self.stats.incr("unknown_entities", len(unknown))
+        self.stats.incr("unused_entities", len(self.entity_index.unused))
+        if unknown:
+            self.logger.warning(
+                f"Training phrases of '{self.language}' annotate entities "
+                f"missing from the agent: {', '.join(sorted(unknown))}."
+            )
+
+    def _report_sections_memory(self) -> None:
+        peak_mb = self.sections.peak_size / 1024**2
+        spilled_mb = self.sections.spilled_size / 1024**2
+        self.stats.incr("sections_peak_bytes", self.sections.peak_size)
+        self.stats.incr("sections_spilled_bytes", self.sections.spilled_size)
+        self.logger.info(
+            f"Output sections of '{self.language}' peaked at {peak_mb:.1f} MB "
+            f"in memory, {spilled_mb:.1f} MB spilled to disk."
+        )
+
+    def _schedule_conversion(self) -> DependencyScheduler:
+        """
+        Schedules every converter, and the assembly of the files they share,
+        by the sections they produce and consume. Converters only depend on
+        the index, so they all run concurrently; each shared file is written
+        as soon as all of its sections are complete.
+        """
+        scheduler = DependencyScheduler()
+        for converter_type, converter in self.converters.items():
+            scheduler.add(
+                converter_type,
+                partial(self._run_converter, converter_type, converter),
+                produces=converter.produces,
+                consumes=converter.consumes,
+            )
+        if self.output_layout == "sharded":
+            # Intents and responses are written to their shards directly
+            shared_files = [
+                (self.synonyms_path, ("nlu.synonyms",), NLU_FILE_HEADER),
+                (self.domain_dir / "slots.yml", ("domain.slots",), ""),
+            ]
+        else:
+            shared_files = [
+                (self.nlu_output_path, NLU_SECTIONS, ""),
+                (self.domain_file_path, DOMAIN_SECTIONS, ""),
+            ]
+        for file_path, section_names, header in shared_files:
+            scheduler.add(
+                f"assemble.{file_path.name}",
+                partial(self._assemble_file, file_path, section_names, header),
+                consumes=section_names,
+            )
+        return scheduler
+
+    def _run_converter(self, converter_type: str, converter: BaseConverter) -> None:
+        with self.stats.timer(f"convert.{converter_type}"):
+            converter.convert()
+
+    def _assemble_file(
+        self, file_path: Path, section_names: tuple[str, ...], header: str
+    ) -> None:
+        if all(self.sections.is_empty(name) for name in section_names):
+            # e.g. an agent without synonyms, whose synonyms file is skipped
+            return
+        self.sections.assemble(file_path, section_names, self.stats, header)
+        self.logger.debug(f"The file '{file_path}' has been created.")
+
+
+def convert_languages(
+    agent_dir: Path,
+    languages: list[str],
+    logger: logging.Logger,
+    parallel: bool = False,
+    stats: Optional[ConversionStats] = None,
+    index: Optional[AgentIndex] = None,
+    entity_report: Optional[Path] = None,
+    jobs: int = 1,
+    **kwargs,
+) -> ConversionStats:
+    """
+    Converts a Dialogflow agent to Rasa format for several languages in one run.
+    All languages share a single agent index, so each file is listed and
+    parsed once, unless an `index` is given. Passing `["all"]` converts every
+    language found in the agent.
+    With `parallel`, the language output trees are written concurrently.
+    With more than one of `jobs`, all languages share one pool of workers.
+    With `entity_report`, the entities annotated in the training phrases of
+    every language are cross-checked with the agent's into a JSON report.
+    Returns the statistics collected over all languages.
+    """
+    stats = stats if stats is not None else ConversionStats()
+    index = index if index is not None else AgentIndex(agent_dir, stats=stats)
+    if languages == ["all"]:
+        languages = index.languages
+        logger.debug(f"Languages found in agent: {', '.join(languages)}.")
+
+    index.shared_languages = len(languages)
+
+    # Workers are started lazily, on the first file converted in the pool
+    pool = make_process_pool(jobs) if jobs > 1 else None
+    try:
+        # Every language is validated before any output gets written
+        converters = [
+            DialogflowToRasaConverter(
+                agent_dir,
+                language,
+                logger,
+                index=index,
+                stats=stats,
+                jobs=jobs,
+                pool=pool,
+                **kwargs,
+            )
+            for language in languages
+        ]
+        if parallel and len(converters) > 1:
+            with ThreadPoolExecutor(max_workers=len(converters)) as executor:
+                for future in [
+                    executor.submit(converter.convert_all) for converter in converters
+                ]:
+                    future.result()
+        else:
+            for converter in converters:
+                converter.convert_all()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        # Left over by languages whose conversion failed
+        index.shared_results.clear()
+
+    if entity_report is not None:
+        report = {
+            "languages": {
+                converter.language: converter.entity_index.to_dict()
+                for converter in converters
+            }
+        }
+        write_to_file(entity_report, json.dumps(report, indent=2) + "\n")
+        logger.info(f"The entity report has been written to '{entity_report}'.")
+
+    return stats
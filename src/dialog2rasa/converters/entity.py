@@ -1,95 +1,266 @@
 import logging
 from pathlib import Path
+from typing import Iterator, Union
 
 from dialog2rasa.converters.base import BaseConverter
-from dialog2rasa.utils.formatting import (
-    format_compounds_for_rasa,
-    format_lookup_for_rasa,
-    format_synonyms_for_rasa,
-    initialize_compound_file_header,
+from dialog2rasa.model import Compound, Lookup, Synonym
+from dialog2rasa.serializers import (
+    render_compound,
+    render_lookup_values,
+    render_synonym,
 )
-from dialog2rasa.utils.general import camel_to_snake
-from dialog2rasa.utils.io import read_json_file, write_dict_files
+from dialog2rasa.utils.formatting import initialize_compound_file_header
+from dialog2rasa.utils.io import (
+    BackgroundWriter,
+    FragmentWriter,
+    iter_json_array,
+    write_to_file,
+)
+from dialog2rasa.utils.lookup import DEFAULT_SHARD_SIZE, optimize_lookup
+
+COMPOUND = "compound"
+SYNONYM = "synonym"
+LOOKUP = "lookup"
 
 
 class EntityConverter(BaseConverter):
-    def __init__(self, agent_dir: Path, language: str, logger: logging.Logger) -> None:
-        super().__init__(agent_dir, language, logger)
+    produces = ("nlu.synonyms",)
+
+    def __init__(
+        self,
+        agent_dir: Path,
+        language: str,
+        logger: logging.Logger,
+        stream_entries: bool = False,
+        use_mmap: bool = False,
+        lookup_mode: str = "raw",
+        lookup_shard_size: int = DEFAULT_SHARD_SIZE,
+        **kwargs,
+    ) -> None:
+        super().__init__(agent_dir, language, logger, **kwargs)
+        self.stream_entries = stream_entries
+        self.use_mmap = use_mmap
+        self.lookup_mode = lookup_mode
+        self.lookup_shard_size = lookup_shard_size
+        # Sizes of the lookup tables before and after their optimization
+        self.lookup_report = {
+            "entries_before": 0,
+            "entries_after": 0,
+            "bytes_before": 0,
+            "bytes_after": 0,
+        }
 
     def convert(self) -> None:
-        """Processes and converts Dialogflow entities to Rasa format."""
-        entity_contents = self._gather_entity_data()
-        for entity_dict in entity_contents:
-            write_dict_files(entity_dict)
+        """
+        Processes and converts Dialogflow entities to Rasa format. Synonyms go
+        to the synonyms section of `nlu.yml`, while lookup tables and compound
+        entities are written to their own files.
+        """
+        if self.stream_entries:
+            self._stream_entity_data()
+        else:
+            self._write_entity_data()
 
         self.logger.debug(
             f"The entity files have been created in dir '{self.nlu_folder_dir}'."
         )
+        if self.lookup_mode != "raw":
+            report = self.lookup_report
+            self.logger.info(
+                f"Lookup tables optimized ({self.lookup_mode}): "
+                f"{report['entries_before']} -> {report['entries_after']} "
+                f"entries, {report['bytes_before']} -> {report['bytes_after']} bytes."
+            )
 
-    def _gather_entity_data(
-        self,
-    ) -> tuple[dict[Path, str], dict[Path, str], dict[Path, str]]:
+    def _fragment_writer(self) -> Union[FragmentWriter, BackgroundWriter]:
+        writer = FragmentWriter(mode="w", stats=self.stats)
+        if self.read_ahead_depth > 0:
+            # Files are written while the next entries are converted
+            return BackgroundWriter(writer, self.read_ahead_depth)
+        return writer
+
+    def _write_entity_data(self) -> None:
+        with self._fragment_writer() as writer:
+            for file_path, fragment in self._gather_entity_data():
+                if file_path == self.nlu_output_path:
+                    self.sections.write("nlu.synonyms", [fragment])
+                else:
+                    writer.write(file_path, fragment)
+
+    def _gather_entity_data(self) -> Iterator[tuple[Path, str]]:
         """
-        Gathers entity data of the three different kinds below:
+        Yields entity data of the three different kinds below, paired with
+        the path of the file it belongs to:
 
         1) Compound entities: stored in __compound__{entity_name}.yml for user
         review, since not they are not Rasa-compatible;
         2) Entities with more than one synonym are stored under synonyms in nlu.yaml;
         3) Entities with one  one value are stored in lookup tables;
         """
-        self.synonym_content, self.lookup_content, self.compound_content = {}, {}, {}
+        entity_files = self.index.entries(self.language)
+        entity_names = [self.index.names.entity(stem) for stem in entity_files]
+        tasks = (
+            (entity_file, (entity_name,))
+            for entity_name, entity_file in zip(entity_names, entity_files.values())
+        )
+        results = self._map_json_files(convert_entity_entries, tasks)
 
-        for entity_file in self.entities_dir.glob(f"*_entries_{self.language}.json"):
-            entity_name = camel_to_snake(entity_file.stem).replace(
-                f"_entries_{self.language}", ""
-            )
-            entries = read_json_file(entity_file)
+        for entity_name, (synonyms, lookup, compound) in zip(entity_names, results):
+            self._count_entity_records(synonyms, lookup, compound)
+            if synonyms:
+                yield self.nlu_output_path, synonyms
+            if lookup:
+                yield self._optimize_lookup(entity_name, lookup)
+            if compound:
+                self.logger.warning(
+                    "Manual adaptation needed for compound "
+                    f"entity '{entity_name}' in Rasa. "
+                    f"See file: '__compound__{entity_name}.yml'."
+                )
+                yield self.nlu_folder_dir / f"__compound__{entity_name}.yml", compound
 
-            for entry in entries:
-                if any("@" in syn for syn in entry["synonyms"]):
-                    self._create_compound_entity_records(entry, entity_name)
-                elif len(entry["synonyms"]) > 1:
-                    self._create_synonym_entity_records(entry)
-                else:
-                    self._create_lookup_entity_records(entry, entity_name)
+    def _stream_entity_data(self) -> None:
+        """
+        Converts entity files entry by entry, writing every entry straight to
+        its target file as it is parsed, so memory use stays constant however
+        large an entity is. Synonyms are written to a file that backs the
+        synonyms section of `nlu.yml`. Files are converted serially and
+        without the manifest, whose cache would hold their whole output.
+        """
+        synonyms_path = self.nlu_folder_dir / ".synonyms.part"
+        lookup_tables: dict[str, Path] = {}
+        with self._fragment_writer() as writer:
+            for stem, entity_file in self.index.entries(self.language).items():
+                entity_name = self.index.names.entity(stem)
+                lookup_path = self.lookup_dir / f"{entity_name}.txt"
+                compound_path = self.nlu_folder_dir / f"__compound__{entity_name}.yml"
+                has_compounds = False
+                self.stats.incr("entities")
 
-        return self.synonym_content, self.lookup_content, self.compound_content
+                for entry in iter_json_array(
+                    entity_file, self.use_mmap, stats=self.stats
+                ):
+                    kind = classify_entry(entry)
+                    if kind == COMPOUND:
+                        if not has_compounds:
+                            has_compounds = True
+                            self.stats.incr("compound_entities")
+                            self.logger.warning(
+                                "Manual adaptation needed for compound "
+                                f"entity '{entity_name}' in Rasa. "
+                                f"See file: '__compound__{entity_name}.yml'."
+                            )
+                            writer.write(
+                                compound_path, initialize_compound_file_header()
+                            )
+                        writer.write(
+                            compound_path, render_synonym(parse_synonym(entry))
+                        )
+                        self.stats.incr("compound_entries")
+                    elif kind == SYNONYM:
+                        writer.write(
+                            synonyms_path, render_synonym(parse_synonym(entry))
+                        )
+                        self.stats.incr("synonyms")
+                    else:
+                        lookup = render_lookup_values(parse_lookup_values(entry))
+                        writer.write(lookup_path, lookup)
+                        lookup_tables[entity_name] = lookup_path
+                        self.stats.incr("lookup_entries", lookup.count("\n"))
 
-    def _create_compound_entity_records(self, entry: dict, entity_name: str) -> None:
-        compound_file_path = self.nlu_folder_dir / f"__compound__{entity_name}.yml"
-        if compound_file_path not in self.compound_content:
-            self.compound_content[compound_file_path] = (
-                initialize_compound_file_header()
-            )
-            self.logger.warning(
-                "Manual adaptation needed for compound "
-                f"entity '{entity_name}' in Rasa. "
-                f"See file: '__compound__{entity_name}.yml'."
-            )
-        self._append_to_file_content(
-            self.compound_content,
-            compound_file_path,
-            format_compounds_for_rasa(entry),
-        )
+        if synonyms_path.exists():
+            self.sections.attach_file("nlu.synonyms", synonyms_path)
 
-    def _create_synonym_entity_records(self, entry: dict) -> None:
-        self._append_to_file_content(
-            self.synonym_content,
-            self.nlu_output_path,
-            format_synonyms_for_rasa(entry),
-        )
+        if self.lookup_mode != "raw":
+            # Optimizing a table needs all of its entries at once
+            for entity_name, lookup_path in lookup_tables.items():
+                lookup = lookup_path.read_text(encoding="utf-8")
+                lookup_path.unlink()
+                file_path, lookup = self._optimize_lookup(entity_name, lookup)
+                write_to_file(file_path, lookup, stats=self.stats)
 
-    def _create_lookup_entity_records(self, entry: dict, entity_name: str) -> None:
-        lookup_file_path = self.lookup_dir / f"{entity_name}.txt"
-        self._append_to_file_content(
-            self.lookup_content,
-            lookup_file_path,
-            format_lookup_for_rasa(entry),
+    def _optimize_lookup(self, entity_name: str, lookup: str) -> tuple[Path, str]:
+        """
+        Returns the path and content of a lookup table, deduplicated or
+        compiled into regexes depending on the lookup mode.
+        """
+        table = optimize_lookup(
+            entity_name, lookup, self.lookup_mode, self.lookup_shard_size
         )
+        if self.lookup_mode != "raw":
+            sizes = {
+                "entries_before": lookup.count("\n"),
+                "entries_after": table.entries,
+                "bytes_before": len(lookup.encode("utf-8")),
+                "bytes_after": len(table.content.encode("utf-8")),
+            }
+            for name, value in sizes.items():
+                self.lookup_report[name] += value
+                self.stats.incr(f"lookup_{name}", value)
+        return self.lookup_dir / table.file_name, table.content
+
+    def _count_entity_records(self, synonyms: str, lookup: str, compound: str) -> None:
+        self.stats.incr("entities")
+        self.stats.incr("synonyms", synonyms.count("  - synonym: "))
+        # Lookup tables hold one entry per line
+        self.stats.incr("lookup_entries", lookup.count("\n"))
+        if compound:
+            self.stats.incr("compound_entities")
+            self.stats.incr("compound_entries", compound.count("  - synonym: "))
+
+
+def convert_entity_entries(entries: list, entity_name: str) -> tuple[str, str, str]:
+    """
+    Splits the entries of one entity file into synonym, lookup and compound
+    content, each already converted into Rasa format.
+    """
+    synonyms, lookup, compound = parse_entity(entries, entity_name)
+    return (
+        "".join(map(render_synonym, synonyms)),
+        render_lookup_values(lookup.values),
+        render_compound(compound) if compound.entries else "",
+    )
+
+
+def parse_entity(
+    entries: list, entity_name: str
+) -> tuple[list[Synonym], Lookup, Compound]:
+    """
+    Splits the entries of one entity file into synonyms, a lookup table and
+    compound entries, either of which may be empty.
+    """
+    synonyms = []
+    lookup = Lookup(entity_name)
+    compound = Compound(entity_name)
+    for entry in entries:
+        kind = classify_entry(entry)
+        if kind == COMPOUND:
+            compound.entries.append(parse_synonym(entry))
+        elif kind == SYNONYM:
+            synonyms.append(parse_synonym(entry))
+        else:
+            lookup.values.extend(parse_lookup_values(entry))
+    return synonyms, lookup, compound
+
+
+def parse_synonym(entry: dict) -> Synonym:
+    """Parses a synonym or compound entry of an entity."""
+    return Synonym(entry["value"], entry["synonyms"])
+
+
+def parse_lookup_values(entry: dict) -> list[str]:
+    """Parses the lookup table values of an entry of an entity."""
+    # Entries without synonyms are kept as blank lines
+    return entry["synonyms"] or [""]
+
 
-    def _append_to_file_content(
-        self, content_dict: dict, file_path: Path, new_content: str
-    ):
-        if file_path not in content_dict:
-            content_dict[file_path] = ""
-        content_dict[file_path] += new_content
+def classify_entry(entry: dict) -> str:
+    """
+    Returns whether an entity entry is a compound entity, a synonym or a
+    lookup table value.
+    """
+    if any("@" in syn for syn in entry["synonyms"]):
+        return COMPOUND
+    if len(entry["synonyms"]) > 1:
+        return SYNONYM
+    return LOOKUP
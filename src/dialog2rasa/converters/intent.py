@@ -1,48 +1,170 @@
 import logging
+from collections import Counter
 from pathlib import Path
+from typing import Iterator, Optional
 
 from dialog2rasa.converters.base import BaseConverter
-from dialog2rasa.utils.general import camel_to_snake
-from dialog2rasa.utils.io import read_json_file, write_to_file
+from dialog2rasa.model import EntitySpan, Example, Intent
+from dialog2rasa.serializers import render_intent
+from dialog2rasa.utils.entities import EntityIndex
+from dialog2rasa.utils.formatting import NLU_FILE_HEADER
+from dialog2rasa.utils.naming import entity_reference_to_name
+from dialog2rasa.utils.sampling import normalize_text, sample_examples
 
 
 class IntentConverter(BaseConverter):
-    def __init__(self, agent_dir: Path, language: str, logger: logging.Logger) -> None:
-        super().__init__(agent_dir, language, logger)
+    produces = ("nlu.intents",)
+
+    def __init__(
+        self,
+        agent_dir: Path,
+        language: str,
+        logger: logging.Logger,
+        max_examples: Optional[int] = None,
+        dedupe: bool = False,
+        seed: int = 0,
+        entity_index: Optional[EntityIndex] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(agent_dir, language, logger, **kwargs)
+        self.max_examples = max_examples
+        self.dedupe = dedupe
+        self.seed = seed
+        self.entity_index = entity_index
+        # Numbers of duplicated and sampled out examples, per intent
+        self.drop_report: dict[str, tuple[int, int]] = {}
 
     def convert(self) -> None:
-        """Converts Dialogflow intents to Rasa NLU format."""
-        converted_intents = self._gather_intent_data()
-        write_to_file(self.nlu_output_path, converted_intents)
-        self.logger.debug(f"The file '{self.nlu_output_path}' has been created.")
-
-    def _gather_intent_data(self) -> str:
-        """Gathers intent data and converts it into Rasa format."""
-        converted_intents = 'version: "3.1"\n\nnlu:\n'
-        intent_file_stem = f"_usersays_{self.language}"
-
-        for file in sorted(self.intents_dir.glob(f"*{intent_file_stem}.json")):
-            intent_name = camel_to_snake(file.stem.split(intent_file_stem)[0])
-            data = read_json_file(file)
-            examples = self._gather_example_data(data)
-            converted_intents += (
-                f"  - intent: {intent_name}\n    examples: |\n{examples}\n"
+        """
+        Converts Dialogflow intents to the intents section of Rasa NLU, or to
+        their own files in the sharded layout.
+        """
+        if self.output_layout == "sharded":
+            self._write_shards(
+                self.intents_dir, NLU_FILE_HEADER, self._convert_intents()
+            )
+            self.logger.debug(f"The intents have been written to '{self.intents_dir}'.")
+        else:
+            self.sections.write("nlu.intents", self._gather_intent_data())
+            self.logger.debug("The intents of 'nlu.yml' have been converted.")
+        if self.drop_report:
+            self.logger.info(
+                f"Examples dropped from {len(self.drop_report)} intent(s):\n"
+                f"{drop_report_table(self.drop_report)}"
             )
 
-        return converted_intents
-
-    def _gather_example_data(self, data: dict) -> str:
-        """Gathers example data and converts it into Rasa format."""
-        examples = ""
-        for d in data:
-            text = "".join(
-                (
-                    f'[{fragment["text"]}]'
-                    f'({fragment["meta"].replace("@", "").replace(".", "_")})'
-                    if "meta" in fragment
-                    else fragment["text"]
-                )
-                for fragment in d["data"]
+    def _gather_intent_data(self) -> Iterator[str]:
+        """Yields intent data converted into Rasa format."""
+        yield NLU_FILE_HEADER
+        for _, intent in self._convert_intents():
+            yield intent
+
+    def _convert_intents(self) -> Iterator[tuple[str, str]]:
+        """Yields every intent name and its examples in Rasa format."""
+        intent_names = [
+            self.index.names.intent(intent_stem)
+            for intent_stem in self.index.usersays(self.language)
+        ]
+        tasks = (
+            (file, (intent_name, self.max_examples, self.dedupe, self.seed))
+            for intent_name, file in zip(
+                intent_names, self.index.usersays(self.language).values()
             )
-            examples += f"      - {text.strip()}\n"
-        return examples
+        )
+        for intent_name, (intent, examples, duplicates, sampled_out, references) in zip(
+            intent_names, self._map_json_files(convert_intent_examples, tasks)
+        ):
+            self.stats.incr("intents")
+            self.stats.incr("examples", examples)
+            if self.entity_index is not None:
+                self.entity_index.add_references(references)
+            if duplicates or sampled_out:
+                self.drop_report[intent_name] = (duplicates, sampled_out)
+                self.stats.incr("examples_duplicated", duplicates)
+                self.stats.incr("examples_sampled_out", sampled_out)
+            yield intent_name, intent
+
+
+def convert_intent_examples(
+    data: list,
+    intent_name: str,
+    max_examples: Optional[int] = None,
+    dedupe: bool = False,
+    seed: int = 0,
+) -> tuple[str, int, int, int, dict[str, int]]:
+    """
+    Converts the training phrases of one intent file into Rasa format, with
+    duplicated phrases removed and at most `max_examples` phrases sampled
+    when asked to. Returns the intent along with the numbers of phrases
+    emitted, dropped as duplicates and dropped by sampling, and the number
+    of annotations of every entity reference found in its phrases.
+    """
+    references: Counter[str] = Counter()
+    intent = parse_intent(data, intent_name, references)
+    duplicates = sampled_out = 0
+    if dedupe or max_examples is not None:
+        # Phrases only differing by case, spacing or annotations are duplicates
+        keys = (normalize_text(example.text) for example in intent.examples)
+        intent.examples, duplicates, sampled_out = sample_examples(
+            zip(keys, intent.examples), max_examples, dedupe, f"{seed}:{intent_name}"
+        )
+    return (
+        render_intent(intent),
+        len(intent.examples),
+        duplicates,
+        sampled_out,
+        dict(references),
+    )
+
+
+def parse_intent(
+    data: list, intent_name: str, references: Optional[Counter[str]] = None
+) -> Intent:
+    """
+    Parses the training phrases of one intent file, counting the annotations
+    of every entity reference into `references` when given.
+    """
+    return Intent(intent_name, [parse_example(phrase, references) for phrase in data])
+
+
+def parse_example(phrase: dict, references: Optional[Counter[str]] = None) -> Example:
+    """
+    Parses one training phrase into its text and entity spans. Surrounding
+    whitespace is stripped, but never from within an entity. The entity
+    references annotated are counted into `references` when given.
+    """
+    texts = []
+    spans = []
+    position = 0
+    for fragment in phrase["data"]:
+        text = fragment["text"]
+        if "meta" in fragment:
+            reference = fragment["meta"]
+            entity = entity_reference_to_name(reference)
+            spans.append(EntitySpan(position, position + len(text), entity))
+            if references is not None:
+                references[reference] += 1
+        texts.append(text)
+        position += len(text)
+
+    text = "".join(texts)
+    start = len(text) - len(text.lstrip())
+    end = len(text.rstrip())
+    if spans:
+        start = min(start, spans[0].start)
+        end = max(end, spans[-1].end)
+    for span in spans:
+        span.start -= start
+        span.end -= start
+    return Example(text[start:end], tuple(spans))
+
+
+def drop_report_table(drop_report: dict[str, tuple[int, int]]) -> str:
+    """Returns the examples dropped per intent as a human-readable table."""
+    width = max(len("intent"), *(len(name) for name in drop_report))
+    lines = [f"{'intent':<{width}}  {'duplicates':>10}  {'sampled out':>11}"]
+    lines += [
+        f"{name:<{width}}  {duplicates:>10}  {sampled_out:>11}"
+        for name, (duplicates, sampled_out) in drop_report.items()
+    ]
+    return "\n".join(lines)
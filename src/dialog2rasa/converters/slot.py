@@ -1,49 +1,53 @@
 import logging
 from pathlib import Path
+from typing import Optional
 
 from dialog2rasa.converters.base import BaseConverter
-from dialog2rasa.utils.io import write_to_file
+from dialog2rasa.model import Slot
+from dialog2rasa.serializers import render_slots
+from dialog2rasa.utils.entities import EntityIndex
 
 
 class SlotConverter(BaseConverter):
-    def __init__(self, agent_dir: Path, language: str, logger: logging.Logger) -> None:
-        super().__init__(agent_dir, language, logger)
+    produces = ("domain.slots",)
+
+    def __init__(
+        self,
+        agent_dir: Path,
+        language: str,
+        logger: logging.Logger,
+        slots_from: str = "all",
+        entity_index: Optional[EntityIndex] = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(agent_dir, language, logger, **kwargs)
+        self.slots_from = slots_from
+        self.entity_index = entity_index
+        if slots_from == "used":
+            if entity_index is None:
+                raise ValueError("Slots from used entities need an entity index.")
+            # Annotations are only all counted once the intents are converted
+            self.consumes = ("nlu.intents",)
 
     def convert(self) -> None:
-        """Appends Dialogflow entities as slots to domain.yaml."""
+        """Converts Dialogflow entities to the slots section of the domain."""
         slot_entities_content = self._gather_slot_data()
         if slot_entities_content:
-            write_to_file(self.domain_file_path, slot_entities_content, "a")
+            self.sections.write("domain.slots", [slot_entities_content])
             self.logger.warning(
                 "Entities have been added as slots to the domain file. "
                 "Please review slot types and mappings."
             )
 
     def _gather_slot_data(self) -> str:
-        """Returns entities as slots for appending to the Rasa domain file."""
-        if not self.domain_file_path.exists():
-            self.logger.error(f"Domain file {self.domain_file_path} not found.")
-            return ""
-
-        entity_names = sorted(
-            set(
-                [
-                    x.stem.split("_entries")[0]
-                    for x in self.entities_dir.glob(f"*_entries_{self.language}.json")
-                ]
+        """Returns entities as slots for the Rasa domain file."""
+        if self.slots_from == "used":
+            # Unknown entities are reported instead, as they cannot be filled
+            return render_slots(
+                Slot(name)
+                for name in self.entity_index.used
+                if name not in self.entity_index.unknown
             )
-        )
-        entities_str = "\n  - ".join(entity_names)
-        slots_str = "\n".join(
-            f"  {entity_name}:\n    type: text\n    "
-            "influence_conversation: false\n    mappings:\n    "
-            f"- type: from_entity\n      entity: {entity_name}\n"
-            for entity_name in entity_names
-        )
-
-        return (
-            "# TODO: Review assumption of Dialogflow "
-            "entities as slots and entities. "
-            "Confirm the types and mappings.\nentities:"
-            f"\n  - {entities_str}\n\nslots:\n{slots_str}\n"
-        )
+        entity_stems = self.index.entries(self.language)
+        entity_names = sorted({self.index.names.entity(stem) for stem in entity_stems})
+        return render_slots(Slot(name) for name in entity_names)
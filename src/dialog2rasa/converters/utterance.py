@@ -1,43 +1,96 @@
 import logging
+import sys
 from pathlib import Path
+from typing import Iterator
 
 from dialog2rasa.converters.base import BaseConverter
-from dialog2rasa.utils.general import camel_to_snake
-from dialog2rasa.utils.io import read_json_file, write_to_file
+from dialog2rasa.model import Response
+from dialog2rasa.serializers import render_response
 
 
 class UtteranceConverter(BaseConverter):
-    def __init__(self, agent_dir: Path, language: str, logger: logging.Logger) -> None:
-        super().__init__(agent_dir, language, logger)
+    produces = ("domain.responses",)
+
+    def __init__(
+        self,
+        agent_dir: Path,
+        language: str,
+        logger: logging.Logger,
+        **kwargs,
+    ) -> None:
+        super().__init__(agent_dir, language, logger, **kwargs)
 
     def convert(self) -> None:
-        """Converts Dialogflow utterances to Rasa domain format."""
-        responses_folder_path = self.agent_dir / "intents"
-        converted_responses = self._gather_response_data(responses_folder_path)
-        write_to_file(self.domain_file_path, converted_responses)
-        self.logger.debug(f"The file '{self.domain_file_path}' has been created.")
-
-    def _gather_response_data(self, responses_folder_path: Path) -> str:
-        """Gathers response data and converts it into Rasa format."""
-        converted_responses = "responses:\n"
-        for file in sorted(responses_folder_path.iterdir()):
-            if not file.name.endswith(f"usersays_{self.language}.json"):
-                intent_name = camel_to_snake(file.stem)
-                data = read_json_file(file)
-                for response in data.get("responses", []):
-                    converted_responses += self._gather_utterance_data(
-                        intent_name, response
-                    )
-        return converted_responses
-
-    def _gather_utterance_data(self, intent_name: str, response: dict) -> str:
-        """Gathers utterance data and converts it into Rasa format."""
-        converted_utter = ""
+        """
+        Converts Dialogflow utterances to the responses section of the domain,
+        or to their own files in the sharded layout.
+        """
+        if self.output_layout == "sharded":
+            responses_dir = self.domain_dir / "responses"
+            self._write_shards(responses_dir, "responses:\n", self._convert_responses())
+            self.logger.debug(f"The responses have been written to '{responses_dir}'.")
+        else:
+            self.sections.write("domain.responses", self._gather_response_data())
+            self.logger.debug("The responses of 'domain.yml' have been converted.")
+
+    def _gather_response_data(self) -> Iterator[str]:
+        """Yields response data converted into Rasa format."""
+        yield "responses:\n"
+        for _, utterances in self._convert_responses():
+            yield utterances
+
+    def _convert_responses(self) -> Iterator[tuple[str, str]]:
+        """Yields every intent name and its responses in Rasa format."""
+        intent_names = [
+            self.index.names.intent(intent_stem)
+            for intent_stem in self.index.intent_files
+        ]
+        tasks = (
+            (file, (intent_name,))
+            for intent_name, file in zip(
+                intent_names, self.index.intent_files.values()
+            )
+        )
+        # Intent files hold the responses of all languages, so they are
+        # converted once and shared with the converters of other languages
+        for intent_name, responses in zip(
+            intent_names,
+            self._map_json_files(convert_intent_responses, tasks, shared=True),
+        ):
+            utterances = responses.get(self.language, "")
+            self.stats.incr("responses", utterances.count("  utter_"))
+            yield intent_name, utterances
+
+
+def convert_intent_responses(data: dict, intent_name: str) -> dict[str, str]:
+    """
+    Converts the responses of one intent file into Rasa format, split by
+    language.
+    """
+    return {
+        language: "".join(map(render_response, responses))
+        for language, responses in parse_intent_responses(data, intent_name).items()
+    }
+
+
+def parse_intent_responses(data: dict, intent_name: str) -> dict[str, list[Response]]:
+    """
+    Parses the responses of one intent file, splitting them by language in a
+    single pass over its messages.
+    """
+    name = sys.intern(f"utter_{intent_name}")
+    responses: dict[str, list[Response]] = {}
+    for response in data.get("responses", []):
         for message in response.get("messages", []):
-            if message.get("lang") == self.language:
-                if "speech" in message:
-                    converted_utter += f"  utter_{intent_name}:\n"
-                    for s in message["speech"]:
-                        converted_utter += f'    - text: "{s}"\n'
-                    converted_utter += "\n"
-        return converted_utter
+            language = message.get("lang")
+            if language is not None and "speech" in message:
+                speech = message["speech"]
+                # Single-variant responses may hold a string rather than a list
+                texts = [speech] if isinstance(speech, str) else list(speech)
+                responses.setdefault(language, []).append(Response(name, texts))
+    return responses
+
+
+def parse_responses(data: dict, intent_name: str, language: str) -> list[Response]:
+    """Parses the responses of one intent file in the given language."""
+    return parse_intent_responses(data, intent_name).get(language, [])
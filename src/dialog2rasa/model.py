@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class EntitySpan:
+    """Entity annotated in an example, as character offsets into its text."""
+
+    start: int
+    end: int
+    entity: str
+
+
+@dataclass(slots=True)
+class Example:
+    """Training phrase of an intent, with its annotated entities in order."""
+
+    text: str
+    entities: tuple[EntitySpan, ...] = ()
+
+    def annotated(self) -> str:
+        """
+        Returns the text with its entities annotated Rasa-style.
+
+        >>> Example("call Ann", (EntitySpan(5, 8, "name"),)).annotated()
+        'call [Ann](name)'
+        """
+        parts = []
+        position = 0
+        for span in self.entities:
+            parts.append(self.text[position : span.start])
+            parts.append(f"[{self.text[span.start : span.end]}]({span.entity})")
+            position = span.end
+        parts.append(self.text[position:])
+        return "".join(parts)
+
+
+@dataclass(slots=True)
+class Intent:
+    """Intent and its training phrases."""
+
+    name: str
+    examples: list[Example] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Response:
+    """Response of an intent, one text per variant."""
+
+    name: str
+    texts: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Synonym:
+    """Value of an entity and the synonyms it is mapped from."""
+
+    value: str
+    synonyms: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Lookup:
+    """Lookup table of an entity, one value per line."""
+
+    entity: str
+    values: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Compound:
+    """
+    Entity whose entries reference other entities, which Rasa does not
+    support, kept as synonyms for manual review.
+    """
+
+    entity: str
+    entries: list[Synonym] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Slot:
+    """Text slot filled from the entity of the same name."""
+
+    name: str
+
+
+@dataclass(slots=True)
+class AgentData:
+    """
+    Intermediate representation of one language of a Dialogflow agent, from
+    which the Rasa files are rendered. Names are interned, since the same
+    intent and entity names recur across the whole agent.
+    """
+
+    language: str
+    intents: list[Intent] = field(default_factory=list)
+    responses: list[Response] = field(default_factory=list)
+    synonyms: list[Synonym] = field(default_factory=list)
+    lookups: list[Lookup] = field(default_factory=list)
+    compounds: list[Compound] = field(default_factory=list)
+    slots: list[Slot] = field(default_factory=list)
@@ -0,0 +1,171 @@
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from dialog2rasa.model import (
+    AgentData,
+    Compound,
+    Intent,
+    Lookup,
+    Response,
+    Slot,
+    Synonym,
+)
+from dialog2rasa.utils.emitter import emit_examples_item, emit_responses
+from dialog2rasa.utils.formatting import (
+    NLU_FILE_HEADER,
+    format_slots_for_rasa,
+    initialize_compound_file_header,
+)
+from dialog2rasa.utils.io import write_to_file
+from dialog2rasa.utils.lookup import (
+    DEFAULT_SHARD_SIZE,
+    LookupTable,
+    optimize_lookup,
+)
+from dialog2rasa.utils.stats import ConversionStats
+
+NLU_PATH = "data/nlu/nlu.yml"
+DOMAIN_PATH = "domain.yml"
+LOOKUP_DIR = "data/nlu/lookup"
+
+
+class RenderCache:
+    """
+    Rendered items of agents, reused for as long as the very same item
+    objects are rendered again, e.g. the unchanged intents of an agent whose
+    parse results are cached while one of its intents is edited.
+    """
+
+    def __init__(self) -> None:
+        # Items and their rendering by id, per rendering function and arguments
+        self._items: dict[tuple, dict[int, tuple[Any, Any]]] = {}
+        self._used: dict[tuple, set[int]] = {}
+
+    def render_all(self, func: Callable, items: Iterable[Any], *args) -> list[Any]:
+        """Returns `func(item, *args)` for every item, computed once per item."""
+        items = list(items)
+        cache = self._items.setdefault((func, args), {})
+        self._used.setdefault((func, args), set()).update(map(id, items))
+        results = []
+        for item in items:
+            cached = cache.get(id(item))
+            # Identifiers are only unique among live objects, hence the check
+            if cached is None or cached[0] is not item:
+                cached = cache[id(item)] = (item, func(item, *args))
+            results.append(cached[1])
+        return results
+
+    def prune(self) -> None:
+        """
+        Forgets the items not rendered since the last pruning, once they
+        make up most of the cache, so that pruning costs little on average.
+        """
+        for key, cache in self._items.items():
+            used = self._used.get(key, set())
+            if len(cache) > 2 * len(used):
+                self._items[key] = {
+                    item_id: cache[item_id] for item_id in used if item_id in cache
+                }
+        self._used = {}
+
+
+def _render_all(
+    cache: Optional[RenderCache], func: Callable, items: Iterable[Any], *args
+) -> list[Any]:
+    if cache is None:
+        return [func(item, *args) for item in items]
+    return cache.render_all(func, items, *args)
+
+
+def render_intent(intent: Intent) -> str:
+    examples = (example.annotated() for example in intent.examples)
+    return emit_examples_item("intent", intent.name, examples, end="\n")
+
+
+def render_synonym(synonym: Synonym) -> str:
+    return emit_examples_item("synonym", synonym.value, synonym.synonyms, end="\n")
+
+
+def render_response(response: Response) -> str:
+    return emit_responses(response.name, response.texts, end="\n")
+
+
+def render_compound(compound: Compound) -> str:
+    return initialize_compound_file_header() + "".join(
+        render_synonym(entry) for entry in compound.entries
+    )
+
+
+def render_lookup_values(values: Iterable[str]) -> str:
+    return "".join(f"{value}\n" for value in values)
+
+
+def render_lookup(lookup: Lookup, lookup_mode: str, shard_size: int) -> LookupTable:
+    content = render_lookup_values(lookup.values)
+    return optimize_lookup(lookup.entity, content, lookup_mode, shard_size)
+
+
+def render_slots(slots: Iterable[Slot]) -> str:
+    return format_slots_for_rasa([slot.name for slot in slots])
+
+
+def render_nlu(agent: AgentData, cache: Optional[RenderCache] = None) -> str:
+    """Returns the intents and synonyms of `nlu.yml`."""
+    items = [NLU_FILE_HEADER]
+    items.extend(_render_all(cache, render_intent, agent.intents))
+    items.extend(_render_all(cache, render_synonym, agent.synonyms))
+    return "".join(items)
+
+
+def render_domain(agent: AgentData, cache: Optional[RenderCache] = None) -> str:
+    """Returns the responses, entities and slots of `domain.yml`."""
+    items = ["responses:\n"]
+    items.extend(_render_all(cache, render_response, agent.responses))
+    items.append(render_slots(agent.slots))
+    return "".join(items)
+
+
+def render_agent(
+    agent: AgentData,
+    lookup_mode: str = "raw",
+    lookup_shard_size: int = DEFAULT_SHARD_SIZE,
+    cache: Optional[RenderCache] = None,
+) -> dict[str, str]:
+    """
+    Renders an agent into the content of its Rasa files, keyed by path
+    within the language's output folder, exactly as the converters write
+    them to disk. A `cache` reuses the rendering of items rendered before.
+    """
+    files = {NLU_PATH: render_nlu(agent, cache)}
+    for table in _render_all(
+        cache, render_lookup, agent.lookups, lookup_mode, lookup_shard_size
+    ):
+        files[f"{LOOKUP_DIR}/{table.file_name}"] = table.content
+    for compound, content in zip(
+        agent.compounds, _render_all(cache, render_compound, agent.compounds)
+    ):
+        files[f"data/nlu/__compound__{compound.entity}.yml"] = content
+    files[DOMAIN_PATH] = render_domain(agent, cache)
+    return files
+
+
+def write_agent(
+    agent: AgentData,
+    output_dir: Path,
+    lookup_mode: str = "raw",
+    lookup_shard_size: int = DEFAULT_SHARD_SIZE,
+    stats: Optional[ConversionStats] = None,
+) -> list[Path]:
+    """
+    Writes the Rasa files of an agent into a language's output folder,
+    overwriting existing files, and returns their paths.
+    """
+    paths = []
+    for relative_path, content in render_agent(
+        agent, lookup_mode, lookup_shard_size
+    ).items():
+        file_path = Path(output_dir) / relative_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        write_to_file(file_path, content, stats=stats)
+        paths.append(file_path)
+    return paths
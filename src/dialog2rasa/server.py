@@ -0,0 +1,182 @@
+import io
+import logging
+import os
+import socketserver
+import stat
+import zipfile
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+from dialog2rasa.batch import is_agent
+from dialog2rasa.cache import AgentCache
+from dialog2rasa.converters.core import ConversionError
+from dialog2rasa.utils.decoding import encode_json
+from dialog2rasa.utils.lookup import DEFAULT_SHARD_SIZE, LOOKUP_MODES
+
+RESPONSE_FORMATS = ("json", "zip")
+
+
+def zip_preview(files: dict[str, dict[str, str]]) -> bytes:
+    """Returns the rendered files as a zip archive, one folder per language."""
+    buffer = io.BytesIO()
+    # Previews are short-lived, so speed matters more than compression
+    with zipfile.ZipFile(
+        buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=1
+    ) as archive:
+        for language, language_files in files.items():
+            for relative_path, content in language_files.items():
+                archive.writestr(f"{language}/{relative_path}", content)
+    return buffer.getvalue()
+
+
+class PreviewRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves `GET /convert?agent=PATH`, converting the agent at PATH (relative
+    to the server's root) and returning its Rasa files as JSON or as a zip
+    archive, and `GET /stats`, describing the agent cache.
+
+    Query parameters of `/convert`: `agent`, `language` (comma-separated,
+    defaults to 'all'), `format` ('json' or 'zip'), `lookup_mode` and
+    `regex_shard_size`.
+    """
+
+    server_version = "dialog2rasa"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            self._send_json(HTTPStatus.OK, self.server.cache.to_dict())
+        elif url.path == "/convert":
+            query = parse_qs(url.query)
+            self._convert({name: values[-1] for name, values in query.items()})
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path '{url.path}'.")
+
+    def _convert(self, query: dict[str, str]) -> None:
+        try:
+            agent_dir = self._agent_dir(query.get("agent", ""))
+            languages = query.get("language", "all").split(",")
+            languages = [language.strip() for language in languages]
+            response_format = query.get("format", "json")
+            lookup_mode = query.get("lookup_mode", "raw")
+            shard_size = int(query.get("regex_shard_size", DEFAULT_SHARD_SIZE))
+            if response_format not in RESPONSE_FORMATS:
+                raise ValueError(f"Unknown format, expected {RESPONSE_FORMATS}.")
+            if lookup_mode not in LOOKUP_MODES:
+                raise ValueError(f"Unknown lookup mode, expected {LOOKUP_MODES}.")
+            if shard_size < 1:
+                raise ValueError("The regex shard size must be positive.")
+        except ValueError as error:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(error))
+            return
+
+        try:
+            preview = self.server.cache.convert(
+                agent_dir, languages, lookup_mode, shard_size
+            )
+        except ConversionError as error:
+            self._send_error(HTTPStatus.NOT_FOUND, str(error))
+            return
+        except Exception as error:
+            self.server.logger.exception(f"Conversion of '{agent_dir}' failed.")
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(error))
+            return
+
+        self.server.logger.debug(
+            f"Converted '{agent_dir}' in {preview.seconds * 1000:.1f} ms "
+            f"({preview.reparsed} file(s) reparsed, {preview.reused} reused)."
+        )
+        headers = {
+            "X-Reparsed": str(preview.reparsed),
+            "X-Reused": str(preview.reused),
+            "X-Seconds": f"{preview.seconds:.6f}",
+        }
+        if response_format == "zip":
+            body = zip_preview(preview.files)
+            self._send(HTTPStatus.OK, body, "application/zip", headers)
+        else:
+            self._send_json(
+                HTTPStatus.OK,
+                {
+                    "agent": query["agent"],
+                    "languages": preview.files,
+                    "reparsed": preview.reparsed,
+                    "reused": preview.reused,
+                    "seconds": preview.seconds,
+                },
+                headers,
+            )
+
+    def _agent_dir(self, agent: str) -> Path:
+        """Returns the path of an agent, which must lie within the root."""
+        if not agent:
+            raise ValueError("Missing 'agent' parameter.")
+        root = self.server.root
+        agent_dir = (root / agent).resolve()
+        if not agent_dir.is_relative_to(root):
+            raise ValueError(f"Agent '{agent}' is outside of the served root.")
+        if not is_agent(agent_dir):
+            raise ValueError(f"'{agent}' is not a Dialogflow agent export.")
+        return agent_dir
+
+    def _send_json(
+        self, status: HTTPStatus, content: Any, headers: Optional[dict] = None
+    ) -> None:
+        body = encode_json(content)
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        self._send_json(status, {"error": message})
+
+    def _send(
+        self,
+        status: HTTPStatus,
+        body: bytes,
+        content_type: str,
+        headers: Optional[dict] = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Unix socket clients have no address to log
+        self.server.logger.debug(format % args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(
+    cache: AgentCache,
+    root: Path,
+    logger: logging.Logger,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    socket_path: Optional[Path] = None,
+) -> socketserver.BaseServer:
+    """
+    Returns a threaded HTTP server converting the agents within `root`,
+    listening on a Unix socket if `socket_path` is given, or on host and
+    port otherwise.
+    """
+    if socket_path is not None:
+        if socket_path.exists() and stat.S_ISSOCK(socket_path.stat().st_mode):
+            # Left behind by a server that did not shut down cleanly
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(str(socket_path), PreviewRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), PreviewRequestHandler)
+    server.cache = cache
+    server.root = root.resolve()
+    server.logger = logger
+    return server
@@ -0,0 +1,143 @@
+import json
+import os
+from typing import Any, Callable, Optional, TypedDict, Union
+
+try:
+    import msgspec
+
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Environment variable holding the selected backend, so that worker
+# processes started without forking decode with the same backend
+JSON_BACKEND_ENV = "DIALOG2RASA_JSON_BACKEND"
+JSON_BACKENDS = ("auto", "msgspec", "orjson", "json")
+
+
+# Schemas of the Dialogflow files, limited to the fields the converters read.
+# Typed decoders skip every other field instead of building objects for them.
+class Fragment(TypedDict, total=False):
+    text: str
+    meta: str
+
+
+class Example(TypedDict):
+    data: list[Fragment]
+
+
+class Message(TypedDict, total=False):
+    lang: str
+    speech: Union[str, list[str]]
+
+
+class Response(TypedDict, total=False):
+    messages: list[Message]
+
+
+class Intent(TypedDict, total=False):
+    responses: list[Response]
+
+
+class Entry(TypedDict):
+    value: str
+    synonyms: list[str]
+
+
+SCHEMAS: dict[str, Any] = {
+    "usersays": list[Example],
+    "intent": Intent,
+    "entries": list[Entry],
+}
+
+
+def available_json_backends() -> list[str]:
+    """Returns the concrete JSON backends that can be used in this environment."""
+    backends = ["json"]
+    if ORJSON_AVAILABLE:
+        backends.insert(0, "orjson")
+    if MSGSPEC_AVAILABLE:
+        backends.insert(0, "msgspec")
+    return backends
+
+
+def set_json_backend(name: str) -> None:
+    """Selects the JSON backend used to decode agent files."""
+    if name not in JSON_BACKENDS:
+        raise ValueError(
+            f"Unknown JSON backend '{name}', expected one of {JSON_BACKENDS}."
+        )
+    if name != "auto" and name not in available_json_backends():
+        raise ValueError(f"JSON backend '{name}' is not installed.")
+    os.environ[JSON_BACKEND_ENV] = name
+    _decoders.clear()
+
+
+def get_json_backend() -> str:
+    """Returns the concrete JSON backend currently in use."""
+    name = os.environ.get(JSON_BACKEND_ENV, "auto")
+    if name == "auto" or name not in available_json_backends():
+        return available_json_backends()[0]
+    return name
+
+
+# Decoders are built once per backend and schema kind
+_decoders: dict[tuple[str, Optional[str]], Callable[[bytes], Any]] = {}
+
+
+def _get_decoder(kind: Optional[str]) -> Callable[[bytes], Any]:
+    backend = get_json_backend()
+    key = (backend, kind)
+    if key not in _decoders:
+        if backend == "msgspec":
+            schema = SCHEMAS.get(kind, Any)
+            _decoders[key] = msgspec.json.Decoder(schema).decode
+        elif backend == "orjson":
+            _decoders[key] = orjson.loads
+        else:
+            _decoders[key] = json.loads
+    return _decoders[key]
+
+
+def decode_json(content: bytes, kind: Optional[str] = None) -> Any:
+    """
+    Decodes JSON content with the selected backend. Given the `kind` of agent
+    file ('usersays', 'intent' or 'entries'), typed backends only decode the
+    fields the converters read, falling back to a full decode for files that
+    do not match the expected schema.
+    """
+    try:
+        return _get_decoder(kind)(content)
+    except Exception as error:
+        if MSGSPEC_AVAILABLE and isinstance(error, msgspec.ValidationError):
+            return _get_decoder(None)(content)
+        raise
+
+
+def encode_json(content: Any) -> bytes:
+    """Encodes content into UTF-8 JSON with the selected backend."""
+    backend = get_json_backend()
+    if backend == "msgspec":
+        return msgspec.json.encode(content)
+    if backend == "orjson":
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+
+def schema_kind(file_name: str, dir_name: str) -> Optional[str]:
+    """Returns the schema kind of an agent file from its name and folder."""
+    stem = file_name.rsplit(".", 1)[0]
+    if "_usersays_" in stem:
+        return "usersays"
+    if "_entries_" in stem:
+        return "entries"
+    if dir_name == "intents":
+        return "intent"
+    return None
@@ -0,0 +1,151 @@
+import re
+from functools import lru_cache
+from typing import Iterable
+
+from dialog2rasa.utils.naming import NAME_CACHE_SIZE
+
+# Plain scalars resolved to something other than a string by YAML 1.2 (the
+# version Rasa reads), which must be quoted to stay strings
+NON_STRING_SCALAR = re.compile(
+    r"^(?:~|null|Null|NULL|true|True|TRUE|false|False|FALSE"
+    r"|[-+]?(?:\.[0-9]+|[0-9][0-9_]*(?:\.[0-9_]*)?)(?:[eE][-+]?[0-9]+)?"
+    r"|0o[0-7]+|0x[0-9a-fA-F]+|[-+]?\.(?:inf|Inf|INF)|\.(?:nan|NaN|NAN))$"
+)
+# Characters that cannot start a plain scalar
+INDICATORS = frozenset("-?:,[]{}#&*!|>'\"%@`")
+# Characters to escape in double-quoted scalars: ASCII ones are detected on
+# the UTF-8 bytes, where multi-byte sequences never hold ASCII bytes
+ESCAPED_BYTES = bytes(range(0x20)) + b'"\\\x7f'
+# Maps the bytes to escape to 0x80 and the others to themselves, so that
+# translating bytes that need no escapes changes nothing
+ESCAPED_BYTES_TABLE = bytes(
+    0x80 if byte in ESCAPED_BYTES else byte for byte in range(256)
+)
+ESCAPED_NON_ASCII = re.compile("[\x80-\x9f\u2028\u2029\ufeff]")
+DOUBLE_QUOTED_ESCAPES = {
+    **{code: f"\\x{code:02x}" for code in range(0x20)},
+    **{code: f"\\x{code:02x}" for code in range(0x7F, 0xA0)},
+    **{ord(char): f"\\u{ord(char):04x}" for char in "\u2028\u2029\ufeff"},
+    ord("\\"): "\\\\",
+    ord('"'): '\\"',
+    ord("\n"): "\\n",
+    ord("\t"): "\\t",
+    ord("\r"): "\\r",
+}
+# Joins the double-quoted texts of the responses of an utterance
+RESPONSES_SEPARATOR = '"\n    - text: "'
+
+
+# Names are scalars emitted over and over, e.g. entity names in slots
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def scalar(value: str) -> str:
+    """
+    Returns a string as a YAML scalar, left plain when that is unambiguous
+    and double-quoted otherwise.
+
+    >>> scalar("chitchat.start"), scalar("@sys.any:name"), scalar("true")
+    ('chitchat.start', '"@sys.any:name"', '"true"')
+    """
+    if (
+        not value
+        or value[0] in INDICATORS
+        or value[0].isspace()
+        or value[-1].isspace()
+        or value[-1] == ":"
+        or ": " in value
+        or " #" in value
+        or not value.isprintable()
+        or NON_STRING_SCALAR.match(value)
+    ):
+        return double_quoted(value)
+    return value
+
+
+def double_quoted(value: str) -> str:
+    """
+    Returns a string as a double-quoted YAML scalar.
+
+    >>> print(double_quoted('Say "hi"\\nthen go'))
+    "Say \\"hi\\"\\nthen go"
+    """
+    if _needs_escapes(value):
+        value = value.translate(DOUBLE_QUOTED_ESCAPES)
+    return f'"{value}"'
+
+
+def _needs_escapes(value: str) -> bool:
+    return _escaped_chars(value) > 0
+
+
+def _escaped_chars(value: str) -> int:
+    """Returns how many characters of a string must be escaped, at least."""
+    # Deleting bytes is several times faster than a regex over every character
+    encoded = value.encode("utf-8", "surrogatepass")
+    count = len(encoded) - len(encoded.translate(None, ESCAPED_BYTES))
+    if not value.isascii() and ESCAPED_NON_ASCII.search(value):
+        # Only whether any is found matters here
+        count += 1
+    return count
+
+
+def block_line(value: str) -> str:
+    """Returns a string as a single line of a literal block scalar."""
+    if "\n" in value or "\r" in value:
+        return " ".join(value.splitlines())
+    return value
+
+
+def emit_examples_item(
+    key: str, name: str, examples: Iterable[str], end: str = ""
+) -> str:
+    """
+    Returns an NLU item (intent, synonym, regex...) with its examples in a
+    literal block, e.g. `  - intent: greet\\n    examples: |\\n      - hi\\n`,
+    followed by `end`, e.g. the blank line separating items.
+    """
+    if not isinstance(examples, list):
+        examples = list(examples)
+    if not examples:
+        return f"  - {key}: {scalar(name)}\n    examples: |\n{end}"
+    lines = "\n      - ".join(examples)
+    # Joined examples hold one line break less than examples, unless some
+    # example spans several lines
+    if lines.count("\n") != len(examples) - 1 or "\r" in lines:
+        lines = "\n      - ".join(block_line(example) for example in examples)
+    return f"  - {key}: {scalar(name)}\n    examples: |\n      - {lines}\n{end}"
+
+
+def emit_responses(name: str, texts: Iterable[str], end: str = "") -> str:
+    """Returns the domain responses of an utterance, followed by `end`."""
+    if not isinstance(texts, list):
+        texts = list(texts)
+    if not texts:
+        return f"  {scalar(name)}:\n{end}"
+    # Checked inline, as this runs once per utterance: translating bytes that
+    # change nothing returns the very same object, without copying them
+    joined = "".join(texts)
+    try:
+        encoded = joined.encode()
+        escaped = encoded.translate(ESCAPED_BYTES_TABLE) is not encoded
+    except UnicodeEncodeError:
+        # Lone surrogates, left as they are by the escapes
+        escaped = True
+    if escaped or (not joined.isascii() and ESCAPED_NON_ASCII.search(joined)):
+        texts = [text.translate(DOUBLE_QUOTED_ESCAPES) for text in texts]
+    lines = RESPONSES_SEPARATOR.join(texts)
+    return f'  {scalar(name)}:\n    - text: "{lines}"\n{end}'
+
+
+def emit_list(values: Iterable[str]) -> str:
+    """Returns an indented YAML sequence of strings."""
+    return "".join(f"  - {scalar(value)}\n" for value in values)
+
+
+def emit_text_slot(entity_name: str) -> str:
+    """Returns a text slot filled from the entity of the same name."""
+    name = scalar(entity_name)
+    return (
+        f"  {name}:\n    type: text\n    influence_conversation: false\n"
+        f"    mappings:\n    - type: from_entity\n      entity: {name}\n"
+    )
+
@@ -0,0 +1,59 @@
+import threading
+from collections import Counter
+from typing import Any, Iterable, Mapping
+
+from dialog2rasa.utils.naming import entity_reference_to_name
+
+# Prefix of the references to Dialogflow's built-in entities, e.g. '@sys.date'
+SYSTEM_ENTITY_PREFIX = "@sys."
+# Entities written as slots to the domain: all entities of the agent, or only
+# those annotated in training phrases
+SLOT_SOURCES = ("all", "used")
+
+
+class EntityIndex:
+    """
+    Entities of one language of an agent, by Rasa name, and the entity
+    annotations of its training phrases, counted while the phrases are
+    parsed for conversion. Every annotation is checked against the entities
+    of the agent with a set lookup, so references to entities that do not
+    exist are found without another pass over the phrases.
+    """
+
+    def __init__(self, entity_names: Iterable[str]) -> None:
+        self.entities = set(entity_names)
+        self.annotations: Counter[str] = Counter()
+        self.system: Counter[str] = Counter()
+        self.unknown: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def add_references(self, references: Mapping[str, int]) -> None:
+        """Counts annotations, given by Dialogflow reference (e.g. '@sys.date')."""
+        with self._lock:
+            for reference, count in references.items():
+                name = entity_reference_to_name(reference)
+                self.annotations[name] += count
+                if reference.startswith(SYSTEM_ENTITY_PREFIX):
+                    self.system[name] += count
+                elif name not in self.entities:
+                    self.unknown[name] += count
+
+    @property
+    def used(self) -> list[str]:
+        """Returns the names of the entities annotated at least once."""
+        return sorted(self.annotations)
+
+    @property
+    def unused(self) -> list[str]:
+        """Returns the names of the agent's entities never annotated."""
+        return sorted(self.entities - self.annotations.keys())
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the cross-check of entities and annotations as a report."""
+        with self._lock:
+            return {
+                "unknown_entities": dict(sorted(self.unknown.items())),
+                "unused_entities": self.unused,
+                "system_entities": dict(sorted(self.system.items())),
+                "annotations": dict(sorted(self.annotations.items())),
+            }
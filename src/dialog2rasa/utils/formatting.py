@@ -1,4 +1,7 @@
 # Entity formatting utils
+from dialog2rasa.utils.emitter import emit_examples_item, emit_list, emit_text_slot
+
+NLU_FILE_HEADER = 'version: "3.1"\n\nnlu:\n'
 
 
 def initialize_compound_file_header() -> str:
@@ -8,23 +11,19 @@ def initialize_compound_file_header() -> str:
     return header_content
 
 
-def format_synonyms_for_rasa(entry: dict) -> str:
-    """Returns Rasa format string for Dialogflow synonyms."""
-    synonym = entry["value"]
-    examples = "\n".join(f"      - {syn}" for syn in entry["synonyms"])
-    return f"  - synonym: {synonym}\n    examples: |\n{examples}\n\n"
-
-
-def format_lookup_for_rasa(entry: dict) -> str:
-    """Returns Rasa format string for Dialogflow lookup tables."""
-    return "\n".join(entry["synonyms"]) + "\n"
+def format_regex_for_rasa(regex_name: str, patterns: list[str]) -> str:
+    """Returns Rasa format string for a named set of regular expressions."""
+    return 'version: "3.1"\n\nnlu:\n' + emit_examples_item(
+        "regex", regex_name, patterns
+    )
 
 
-def format_compounds_for_rasa(entry: dict) -> str:
-    """
-    Returns Rasa format string for pseudo-compound entities from Dialogflow.
-    No need to check for new files here, handled in convert method.
-    """
-    synonym = entry["value"]
-    examples = "\n".join(f"      - {syn}" for syn in entry["synonyms"])
-    return f"  - synonym: {synonym}\n    examples: |\n{examples}\n\n"
+def format_slots_for_rasa(entity_names: list[str]) -> str:
+    """Returns the entities and slots of the Rasa domain file."""
+    slots_str = "\n".join(emit_text_slot(name) for name in entity_names)
+    return (
+        "# TODO: Review assumption of Dialogflow "
+        "entities as slots and entities. "
+        "Confirm the types and mappings.\nentities:\n"
+        f"{emit_list(entity_names)}\nslots:\n{slots_str}\n"
+    )
@@ -1,5 +1,7 @@
 import logging
-import re
+
+# Kept importable from here for backwards compatibility
+from dialog2rasa.utils.naming import camel_to_snake  # noqa: F401
 
 try:
     import colorama
@@ -63,13 +65,3 @@ def setup_logger(
         ch.setFormatter(formatter)
         logger.addHandler(ch)
     return logger
-
-
-def camel_to_snake(s: str) -> str:
-    """Converts input string from CamelCase to snake_case."""
-    return (
-        re.sub(r"(?<!^)(?=[A-Z])", "_", s)  # insert underscores before capital letters
-        .replace(" ", "_")  # fix non non-standard CamelCase inputs
-        .replace("__", "_")  # fix double underscores (from previous replace)
-        .lower()  # lowercase for true snake_case
-    )
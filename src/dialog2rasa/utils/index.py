@@ -0,0 +1,207 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+from dialog2rasa.utils.io import (
+    AgentFile,
+    ZipMember,
+    is_zip_archive,
+    list_zip_members,
+    read_hashed_json_file,
+    read_json_file,
+)
+from dialog2rasa.utils.naming import NameTable
+from dialog2rasa.utils.stats import ConversionStats
+
+USERSAYS_PATTERN = re.compile(r"^(?P<name>.+)_usersays_(?P<language>[^_]+)$")
+ENTRIES_PATTERN = re.compile(r"^(?P<name>.+)_entries_(?P<language>[^_]+)$")
+# Matches agent files inside an archive, which may nest the agent in a folder
+ZIP_MEMBER_PATTERN = re.compile(
+    r"^(?P<root>(?:.*/)?)(?P<kind>intents|entities)/[^/]+\.json$"
+)
+
+
+class AgentIndex:
+    """
+    Single-pass index of a Dialogflow agent export, either an extracted folder
+    or the `.zip` archive itself. The `intents` and `entities` directories are
+    scanned once and their files grouped by kind and language. Parsed JSON
+    contents are loaded lazily and cached, so converters sharing the index
+    never list or parse the same file twice.
+
+    Agents already parsed in memory are indexed from their `documents`, the
+    parsed JSON content keyed by path within the export, e.g.
+    'intents/greet_usersays_en.json'. Their files are never read from disk,
+    so they cannot be converted by several worker processes.
+    """
+
+    def __init__(
+        self,
+        agent_dir: Path,
+        cache_size: int = 1024,
+        stats: Optional[ConversionStats] = None,
+        documents: Optional[Mapping[str, Any]] = None,
+    ) -> None:
+        self.agent_dir = agent_dir
+        self.stats = stats if stats is not None else ConversionStats()
+        self.is_archive = documents is None and is_zip_archive(agent_dir)
+        self.cache_size = cache_size
+        self._cache: OrderedDict[AgentFile, Any] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # Language-independent conversion results, shared by the languages
+        # converted from the index, each with the number of languages yet to
+        # consume it, so that it is dropped once all of them did
+        self.shared_languages = 1
+        self.shared_results: dict[tuple[str, AgentFile], list] = {}
+        self.shared_records: dict[str, dict] = {}
+        self.shared_lock = threading.Lock()
+
+        # Intent metadata and entity definitions, keyed by file stem
+        self.intent_files: dict[str, AgentFile] = {}
+        self.entity_files: dict[str, AgentFile] = {}
+        # Training phrases and entity entries, keyed by language then name
+        self.usersays_files: dict[str, dict[str, AgentFile]] = {}
+        self.entries_files: dict[str, dict[str, AgentFile]] = {}
+
+        self._documents: Optional[dict[Path, Any]] = None
+        with self.stats.timer("scan"):
+            if documents is not None:
+                intent_paths, entity_paths = self._list_documents(documents)
+            elif self.is_archive:
+                intent_paths, entity_paths = self._list_zip_json_files(agent_dir)
+            else:
+                intent_paths = self._list_json_files(agent_dir / "intents")
+                entity_paths = self._list_json_files(agent_dir / "entities")
+            self._scan(intent_paths, entity_paths)
+
+    def _scan(
+        self, intent_paths: list[AgentFile], entity_paths: list[AgentFile]
+    ) -> None:
+        """Classifies every listed JSON file of the agent by kind and language."""
+        for path in intent_paths:
+            match = USERSAYS_PATTERN.match(path.stem)
+            if match:
+                self.usersays_files.setdefault(match["language"], {})[
+                    match["name"]
+                ] = path
+            else:
+                self.intent_files[path.stem] = path
+
+        for path in entity_paths:
+            match = ENTRIES_PATTERN.match(path.stem)
+            if match:
+                self.entries_files.setdefault(match["language"], {})[
+                    match["name"]
+                ] = path
+            else:
+                self.entity_files[path.stem] = path
+
+    @staticmethod
+    def _list_json_files(dir_path: Path) -> list[Path]:
+        """Returns the JSON files of a directory sorted by name."""
+        if not dir_path.is_dir():
+            return []
+        with os.scandir(dir_path) as entries:
+            # Sorting strings is much faster than sorting paths
+            file_paths = sorted(
+                entry.path
+                for entry in entries
+                if entry.name.endswith(".json") and entry.is_file()
+            )
+        return [Path(file_path) for file_path in file_paths]
+
+    def _list_documents(
+        self, documents: Mapping[str, Any]
+    ) -> tuple[list[Path], list[Path]]:
+        """Returns the intent and entity paths of in-memory documents."""
+        self._documents = {}
+        paths: dict[str, list[Path]] = {"intents": [], "entities": []}
+        for name in sorted(documents):
+            match = ZIP_MEMBER_PATTERN.match(name)
+            if match:
+                path = Path(name)
+                self._documents[path] = documents[name]
+                paths[match["kind"]].append(path)
+        return paths["intents"], paths["entities"]
+
+    @staticmethod
+    def _list_zip_json_files(
+        archive_path: Path,
+    ) -> tuple[list[ZipMember], list[ZipMember]]:
+        """Returns the intent and entity JSON members of a zip export."""
+        members: dict[str, list[ZipMember]] = {"intents": [], "entities": []}
+        agent_root = None
+        for member_name in sorted(list_zip_members(archive_path)):
+            match = ZIP_MEMBER_PATTERN.match(member_name)
+            # Skip resource forks that macOS adds when compressing folders
+            if not match or member_name.startswith("__MACOSX/"):
+                continue
+            # Only the first agent root found is indexed
+            if agent_root is None:
+                agent_root = match["root"]
+            if match["root"] == agent_root:
+                members[match["kind"]].append(
+                    ZipMember(archive_path, member_name, agent_root)
+                )
+        return members["intents"], members["entities"]
+
+    @cached_property
+    def names(self) -> NameTable:
+        """Returns the canonical Rasa names of all intents and entities."""
+        intent_names = set(self.intent_files)
+        entity_names = set(self.entity_files)
+        for language in self.languages:
+            intent_names.update(self.usersays(language))
+            entity_names.update(self.entries(language))
+        return NameTable(intent_names, entity_names)
+
+    @property
+    def languages(self) -> list[str]:
+        """Returns language codes found in usersays or entries file suffixes."""
+        return sorted(set(self.usersays_files) | set(self.entries_files))
+
+    def usersays(self, language: str) -> dict[str, AgentFile]:
+        """Returns training phrase files of a language, sorted by intent name."""
+        return self.usersays_files.get(language, {})
+
+    def entries(self, language: str) -> dict[str, AgentFile]:
+        """Returns entity entry files of a language, sorted by entity name."""
+        return self.entries_files.get(language, {})
+
+    def has_language(self, language: str) -> bool:
+        """Checks if both intents and entities have files for the language."""
+        return bool(self.usersays(language)) and bool(self.entries(language))
+
+    def read_json(self, file_path: AgentFile) -> Any:
+        """Returns parsed JSON content of a file, reusing cached results."""
+        if self._documents is not None:
+            return self._documents[file_path]
+        with self._cache_lock:
+            if file_path in self._cache:
+                self._cache.move_to_end(file_path)
+                return self._cache[file_path]
+
+        data = read_json_file(file_path, self.stats)
+        self._cache_data(file_path, data)
+        return data
+
+    def read_hashed_json(self, file_path: AgentFile) -> tuple[Any, Optional[str]]:
+        """
+        Returns parsed JSON content of a file along with the SHA-256 digest of
+        its bytes, hashed as they are read. The file is always read, since its
+        digest is not cached, but its content is cached for other readers.
+        """
+        data, digest = read_hashed_json_file(file_path, self.stats)
+        self._cache_data(file_path, data)
+        return data, digest
+
+    def _cache_data(self, file_path: AgentFile, data: Any) -> None:
+        with self._cache_lock:
+            self._cache[file_path] = data
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
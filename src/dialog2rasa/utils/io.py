@@ -1,6 +1,33 @@
+import codecs
+import hashlib
+import io
+import itertools
 import json
+import mmap
+import os
+import queue
 import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, NamedTuple, Optional, Union
+
+from dialog2rasa.utils.decoding import decode_json, schema_kind
+from dialog2rasa.utils.stats import ConversionStats
+
+# Size of the write buffer kept per open file before it gets flushed to disk
+DEFAULT_BUFFER_SIZE = 64 * 1024
+# Size of the chunks in which JSON array files are read when streamed
+STREAM_CHUNK_SIZE = 1024 * 1024
+# Bytes of output sections held in memory, unless another budget is given,
+# beyond which the largest sections are spilled to disk
+DEFAULT_MEMORY_BUDGET = 128 * 1024 * 1024
+# Characters that may follow an item of a JSON array
+VALUE_TERMINATORS = frozenset(",] \t\r\n")
 
 
 def reset_directory(dir_path: Path, deepest_subdir: str) -> None:
@@ -13,19 +40,852 @@ def reset_directory(dir_path: Path, deepest_subdir: str) -> None:
     (dir_path / deepest_subdir).mkdir(parents=True, exist_ok=True)
 
 
-def read_json_file(file_path: Path) -> dict:
-    """Reads and returns JSON data from a file."""
-    with Path(file_path).open("r", encoding="utf-8") as file:
-        return json.load(file)
+def _file_digest(file_path: Path) -> str:
+    digest = hashlib.blake2b()
+    with file_path.open("rb") as file:
+        for chunk in iter(lambda: file.read(DEFAULT_BUFFER_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync(path: Path) -> None:
+    # Directories are synced too, so that renames within them are durable
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Digests of the files written into staging folders, by absolute path, so that
+# staged files are compared with the previous output without being read back.
+# Appends keep updating the digest of their file; files whose content is not
+# fully known, e.g. appended to before being tracked, map to None.
+_staged_digests: dict[str, Optional[Any]] = {}
+_staging_roots: set[str] = set()
+_staged_digests_lock = threading.Lock()
+
+
+def _track_write(file_path: Path, mode: str) -> Optional[Any]:
+    """
+    Returns the digest to update with the content written to a file of a
+    staging folder, or None for other files and files of unknown content.
+    """
+    key = os.path.abspath(file_path)
+    with _staged_digests_lock:
+        if not any(key.startswith(root) for root in _staging_roots):
+            return None
+        if "a" in mode:
+            if key in _staged_digests:
+                return _staged_digests[key]
+            if os.path.exists(key):
+                _staged_digests[key] = None
+                return None
+        digest = _staged_digests[key] = hashlib.blake2b()
+        return digest
+
+
+def _untrack_staging(staging_path: Path) -> dict[str, Optional[str]]:
+    """Stops tracking the writes to a staging folder, returning their digests."""
+    root = os.path.join(os.path.abspath(staging_path), "")
+    with _staged_digests_lock:
+        _staging_roots.discard(root)
+        keys = [key for key in _staged_digests if key.startswith(root)]
+        digests = {key: _staged_digests.pop(key) for key in keys}
+    return {
+        key: digest.hexdigest() if digest is not None else None
+        for key, digest in digests.items()
+    }
+
+
+class StagedDirectory:
+    """
+    Output folder written in a staging folder next to it, then swapped into
+    place with renames once complete, so that readers never see a partial
+    tree, even if the conversion is cancelled. Files whose content did not
+    change keep their modification time, so that caches keyed on it stay
+    valid. The digests of the committed files are recorded next to the
+    target, so that the next commit needs not read them back.
+    """
+
+    def __init__(self, target: Path, fsync: bool = False) -> None:
+        self.target = target
+        self.fsync = fsync
+        self.path = target.with_name(f".{target.name}.staging")
+        self._previous = target.with_name(f".{target.name}.previous")
+        self._digests_path = target.with_name(f".{target.name}.digests.json")
+        # Files carried over from the target, known to be unchanged
+        self._kept: set[Path] = set()
+
+    def prepare(self, deepest_subdir: str) -> Path:
+        """Creates an empty staging folder and returns its path."""
+        if self._previous.exists():
+            if not self.target.exists():
+                # A swap was interrupted between its two renames
+                os.replace(self._previous, self.target)
+            else:
+                shutil.rmtree(self._previous)
+        _untrack_staging(self.path)
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        (self.path / deepest_subdir).mkdir(parents=True, exist_ok=True)
+        self._kept.clear()
+        with _staged_digests_lock:
+            _staging_roots.add(os.path.join(os.path.abspath(self.path), ""))
+        return self.path
+
+    def keep(self, relative_path: str) -> bool:
+        """
+        Carries a file of the target over into the staging folder unchanged,
+        as a hard link when the file system allows it, so that its content
+        is neither written nor compared again. Returns whether the target
+        had the file.
+        """
+        target_path = self.target / relative_path
+        staged_path = self.path / relative_path
+        staged_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(target_path, staged_path)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            # E.g. file systems without hard links
+            shutil.copy2(target_path, staged_path)
+        self._kept.add(staged_path)
+        return True
+
+    def discard(self) -> None:
+        """Deletes the staging folder, leaving the target untouched."""
+        _untrack_staging(self.path)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def commit(self, stats: Optional[ConversionStats] = None) -> tuple[int, int]:
+        """
+        Replaces the target with the staging folder. Returns the number of
+        files that changed and of files left unchanged.
+
+        The digests computed while the staged files were written are
+        compared with those recorded by the previous commit, so neither tree
+        is read back; only files written by other means, or changed since
+        the previous commit, are hashed from disk.
+
+        No portable call exchanges two folders, so the swap takes two
+        renames: the target is moved aside, then the staging folder takes
+        its place. In between, readers may briefly find no target, though
+        never a partial one, and `prepare` completes a swap interrupted
+        there.
+        """
+        written = _untrack_staging(self.path)
+        recorded = self._read_digests()
+        digests = {}
+        changed = unchanged = 0
+        folders = []
+        for dir_path, _, file_names in os.walk(self.path):
+            folders.append(Path(dir_path))
+            for file_name in file_names:
+                staged_path = Path(dir_path) / file_name
+                relative_path = staged_path.relative_to(self.path).as_posix()
+                is_changed, record = self._compare(
+                    staged_path,
+                    relative_path,
+                    written.get(os.path.abspath(staged_path)),
+                    recorded.get(relative_path),
+                )
+                if is_changed:
+                    if self.fsync:
+                        _fsync(staged_path)
+                    changed += 1
+                else:
+                    unchanged += 1
+                if record is not None:
+                    digests[relative_path] = record
+        if self.fsync:
+            for folder in folders:
+                _fsync(folder)
+
+        if self.target.exists():
+            os.replace(self.target, self._previous)
+        os.replace(self.path, self.target)
+        if self.fsync:
+            _fsync(self.target.parent)
+        shutil.rmtree(self._previous, ignore_errors=True)
+        # Written last, as records not matching the files are simply ignored
+        self._digests_path.write_text(json.dumps(digests), encoding="utf-8")
+
+        if stats is not None:
+            stats.incr("files_changed", changed)
+            stats.incr("files_unchanged", unchanged)
+        return changed, unchanged
+
+    def _compare(
+        self,
+        staged_path: Path,
+        relative_path: str,
+        digest: Optional[str],
+        record: Optional[list],
+    ) -> tuple[bool, Optional[list]]:
+        """
+        Returns whether a staged file differs from the target's, given the
+        digest of its content when known and the record of the target's
+        file, along with the record of the staged file. Unchanged files get
+        the modification time of the target's.
+        """
+        staged_stat = staged_path.stat()
+        target_stat = _stat_or_none(self.target / relative_path)
+        target_digest = None
+        if target_stat is not None and record is not None:
+            if record[:2] == [target_stat.st_size, target_stat.st_mtime_ns]:
+                target_digest = record[2]
+
+        if staged_path in self._kept:
+            is_changed = False
+            digest = target_digest
+        elif target_stat is None or target_stat.st_size != staged_stat.st_size:
+            is_changed = True
+        else:
+            digest = digest or _file_digest(staged_path)
+            target_digest = target_digest or _file_digest(
+                self.target / relative_path
+            )
+            is_changed = digest != target_digest
+            if not is_changed:
+                os.utime(
+                    staged_path,
+                    ns=(target_stat.st_atime_ns, target_stat.st_mtime_ns),
+                )
+                staged_stat = target_stat
+        if digest is None:
+            return is_changed, None
+        return is_changed, [staged_stat.st_size, staged_stat.st_mtime_ns, digest]
+
+    def _read_digests(self) -> dict[str, list]:
+        """Returns the size, modification time and digest of committed files."""
+        try:
+            return json.loads(self._digests_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+
+def _stat_or_none(file_path: Path) -> Optional[os.stat_result]:
+    try:
+        return os.stat(file_path)
+    except FileNotFoundError:
+        return None
+
+
+class MemberStat(NamedTuple):
+    """Subset of `os.stat_result` fields available for zip archive members."""
+
+    st_size: int
+    st_mtime_ns: int
+
 
+@lru_cache(maxsize=8)
+def _open_archive(archive_path: Path, pid: int) -> zipfile.ZipFile:
+    """
+    Returns an open archive, reused across reads. Handles are cached per
+    process, since forked workers must not share the parent's file offset.
+    """
+    return zipfile.ZipFile(archive_path)
+
+
+def release_archives() -> None:
+    """Drops the cached archive handles, e.g. after an archive was replaced."""
+    _open_archive.cache_clear()
+
+
+class ZipMember:
+    """
+    Picklable reference to a file inside a zip archive, exposing the subset of
+    the `Path` interface used by the converters. Its content is read straight
+    from the archive, without extracting it to disk.
+    """
+
+    def __init__(self, archive_path: Path, member_name: str, root: str = "") -> None:
+        self.archive_path = archive_path
+        self.member_name = member_name
+        self.relative_path = member_name[len(root) :]
+
+    @property
+    def name(self) -> str:
+        return self.member_name.rsplit("/", 1)[-1]
+
+    @property
+    def stem(self) -> str:
+        return self.name.rsplit(".", 1)[0]
+
+    @property
+    def parent_name(self) -> str:
+        parts = self.member_name.rsplit("/", 2)
+        return parts[-2] if len(parts) > 1 else ""
+
+    def open(self, mode: str = "rb") -> IO[bytes]:
+        """Opens the member as a binary stream."""
+        if mode not in ("r", "rb"):
+            raise ValueError(f"Zip archive members are read-only, got mode '{mode}'.")
+        return _open_archive(self.archive_path, os.getpid()).open(self.member_name)
+
+    def stat(self) -> MemberStat:
+        info = _open_archive(self.archive_path, os.getpid()).getinfo(self.member_name)
+        mtime = datetime(*info.date_time).timestamp()
+        return MemberStat(info.file_size, int(mtime * 1e9))
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ZipMember) and (
+            self.archive_path,
+            self.member_name,
+        ) == (other.archive_path, other.member_name)
+
+    def __hash__(self) -> int:
+        return hash((self.archive_path, self.member_name))
+
+    def __lt__(self, other: "ZipMember") -> bool:
+        return self.member_name < other.member_name
+
+    def __repr__(self) -> str:
+        return f"ZipMember('{self.archive_path}', '{self.member_name}')"
+
+
+# Agent files are either regular files or members of a zip export
+AgentFile = Union[Path, ZipMember]
+
+
+def is_zip_archive(path: Path) -> bool:
+    """Checks if the path points to a zip archive rather than a folder."""
+    return path.is_file() and zipfile.is_zipfile(path)
+
+
+def list_zip_members(archive_path: Path) -> list[str]:
+    """Returns the names of all file members of a zip archive."""
+    archive = _open_archive(archive_path, os.getpid())
+    return [info.filename for info in archive.infolist() if not info.is_dir()]
+
+
+def relative_file_path(file_path: AgentFile, agent_dir: Path) -> str:
+    """Returns the POSIX path of an agent file relative to the agent root."""
+    if isinstance(file_path, ZipMember):
+        return file_path.relative_path
+    return file_path.relative_to(agent_dir).as_posix()
+
+
+def read_json_file(
+    file_path: AgentFile, stats: Optional[ConversionStats] = None
+) -> dict:
+    """
+    Reads and returns JSON data from a file or zip archive member, decoded
+    with the selected JSON backend and the schema matching the file's kind.
+    """
+    return read_hashed_json_file(file_path, stats, hashed=False)[0]
+
+
+def read_hashed_json_file(
+    file_path: AgentFile, stats: Optional[ConversionStats] = None, hashed: bool = True
+) -> tuple[Any, Optional[str]]:
+    """
+    Same as `read_json_file`, but also returns the SHA-256 hex digest of the
+    bytes read, so that files are not read again only to be hashed.
+    """
+    start = time.perf_counter()
+    if isinstance(file_path, ZipMember):
+        with file_path.open() as file:
+            content = file.read()
+        kind = schema_kind(file_path.name, file_path.parent_name)
+    else:
+        file_path = Path(file_path)
+        content = file_path.read_bytes()
+        kind = schema_kind(file_path.name, file_path.parent.name)
+    digest = hashlib.sha256(content).hexdigest() if hashed else None
+    data = decode_json(content, kind)
 
-def write_to_file(file_path: Path, content: str, mode: str = "w") -> None:
+    if stats is not None:
+        stats.add_time("read", time.perf_counter() - start)
+        stats.incr("files_read")
+        stats.incr("bytes_read", len(content))
+    return data, digest
+
+
+class _JsonArrayStream:
+    """
+    Decodes the items of a JSON array from a binary stream, holding only the
+    current chunk of text in memory. Items are decoded with the standard
+    library, since the faster backends cannot decode partial documents.
+    """
+
+    def __init__(self, source: IO[bytes], chunk_size: int) -> None:
+        self.source = source
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        # Exports may start with a byte order mark
+        self.text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def _fill(self) -> None:
+        """Drops consumed text and appends the next chunk to the buffer."""
+        chunk = self.source.read(self.chunk_size)
+        self.bytes_read += len(chunk)
+        self.eof = not chunk
+        text = self.text_decoder.decode(chunk, final=self.eof)
+        self.buffer = self.buffer[self.pos :] + text
+        self.pos = 0
+
+    def next_char(self) -> str:
+        """Consumes and returns the next non-whitespace character, if any."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                self.pos += 1
+                return self.buffer[self.pos - 1]
+            if self.eof:
+                return ""
+            self._fill()
+
+    def peek_char(self) -> str:
+        """Returns the next non-whitespace character without consuming it."""
+        char = self.next_char()
+        if char:
+            self.pos -= 1
+        return char
+
+    def next_value(self) -> Any:
+        """Decodes the next value, reading more chunks until it is complete."""
+        # The decoder does not skip leading whitespace itself
+        self.peek_char()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # Values such as numbers may continue in the next chunk, so a
+                # value only ends at a separator or at the end of the file
+                if self.eof or self.buffer[end : end + 1] in VALUE_TERMINATORS:
+                    self.pos = end
+                    return value
+            self._fill()
+
+    def items(self) -> Iterator[Any]:
+        if self.next_char() != "[":
+            raise ValueError("Expected a JSON array.")
+        if self.peek_char() == "]":
+            self.next_char()
+        else:
+            while True:
+                yield self.next_value()
+                separator = self.next_char()
+                if separator == "]":
+                    break
+                if separator != ",":
+                    raise ValueError(f"Expected ',' or ']', got '{separator}'.")
+        if self.next_char():
+            raise ValueError("Unexpected content after the JSON array.")
+
+
+def _open_stream(file_path: AgentFile, use_mmap: bool) -> IO[bytes]:
+    """Opens a file as a binary stream, mapped into memory if requested."""
+    if isinstance(file_path, ZipMember):
+        # Compressed members cannot be mapped, they are streamed instead
+        return file_path.open()
+    file = Path(file_path).open("rb")
+    if not use_mmap or os.fstat(file.fileno()).st_size == 0:
+        return file
+    with file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mapped, "madvise"):
+        mapped.madvise(mmap.MADV_SEQUENTIAL)
+    return mapped
+
+
+def iter_json_array(
+    file_path: AgentFile,
+    use_mmap: bool = False,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    stats: Optional[ConversionStats] = None,
+) -> Iterator[Any]:
+    """
+    Yields the items of a JSON array file one by one, so memory use does not
+    grow with the size of the file. With `use_mmap`, regular files are mapped
+    into memory rather than read through a buffer.
+
+    >>> import tempfile
+    >>> with tempfile.TemporaryDirectory() as temp_dir:
+    ...     file_path = Path(temp_dir) / "entries.json"
+    ...     _ = file_path.write_text('[{"value": "a"}, {"value": "b"}]')
+    ...     list(iter_json_array(file_path, chunk_size=4))
+    [{'value': 'a'}, {'value': 'b'}]
+    """
+    start = time.perf_counter()
+    read_seconds = 0.0
+    with _open_stream(file_path, use_mmap) as source:
+        stream = _JsonArrayStream(source, chunk_size)
+        items = stream.items()
+        while True:
+            try:
+                item = next(items)
+            except StopIteration:
+                break
+            finally:
+                read_seconds += time.perf_counter() - start
+            yield item
+            start = time.perf_counter()
+
+    if stats is not None:
+        stats.add_time("read", read_seconds)
+        stats.incr("files_read")
+        stats.incr("bytes_read", stream.bytes_read)
+
+
+def _file_size(file_path: Path) -> int:
+    return file_path.stat().st_size if file_path.exists() else 0
+
+
+def _record_write(
+    stats: Optional[ConversionStats], file_path: Path, initial_size: int
+) -> None:
+    if stats is not None:
+        stats.incr("files_written")
+        stats.incr("bytes_written", _file_size(file_path) - initial_size)
+
+
+def write_to_file(
+    file_path: Path,
+    content: str,
+    mode: str = "w",
+    stats: Optional[ConversionStats] = None,
+) -> None:
     """Writes given content to a file."""
-    with Path(file_path).open(mode, encoding="utf-8") as file:
-        file.write(content)
+    write_fragments(file_path, [content], mode, stats=stats)
+
+
+def write_fragments(
+    file_path: Path,
+    fragments: Iterable[str],
+    mode: str = "w",
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    stats: Optional[ConversionStats] = None,
+) -> None:
+    """
+    Streams fragments into a file through a buffered writer, so the file
+    content is flushed incrementally instead of being held in memory.
+    """
+    file_path = Path(file_path)
+    initial_size = _file_size(file_path) if "a" in mode else 0
+    digest = _track_write(file_path, mode)
+    # Only time spent writing counts, not producing the fragments
+    write_seconds = 0.0
+    start = time.perf_counter()
+    with file_path.open(mode, encoding="utf-8", buffering=buffer_size) as file:
+        write_seconds += time.perf_counter() - start
+        for fragment in fragments:
+            start = time.perf_counter()
+            file.write(fragment)
+            if digest is not None:
+                digest.update(fragment.encode("utf-8"))
+            write_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+    write_seconds += time.perf_counter() - start
+
+    if stats is not None:
+        stats.add_time("write", write_seconds)
+        _record_write(stats, file_path, initial_size)
+
+
+class FragmentWriter:
+    """
+    Routes fragments to several files through buffered writers. Files are
+    opened lazily and the least recently used one is closed once
+    `max_open_files` is reached; files are reopened in append mode, so no
+    content is lost when a file is revisited.
+    """
+
+    def __init__(
+        self,
+        mode: str = "a",
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        max_open_files: int = 32,
+        stats: Optional[ConversionStats] = None,
+    ) -> None:
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.max_open_files = max_open_files
+        self.stats = stats
+        self._open_files: dict[Path, IO[str]] = {}
+        # Digests of the files written into a staging folder
+        self._digests: dict[Path, Optional[Any]] = {}
+        # Sizes of the files when first opened, to measure bytes written
+        self._initial_sizes: dict[Path, int] = {}
+
+    def write(self, file_path: Path, fragment: str) -> None:
+        """Writes a fragment to the given file."""
+        start = time.perf_counter()
+        self._get_file(file_path).write(fragment)
+        digest = self._digests[file_path]
+        if digest is not None:
+            digest.update(fragment.encode("utf-8"))
+        if self.stats is not None:
+            self.stats.add_time("write", time.perf_counter() - start)
+
+    def write_all(self, routed_fragments: Iterable[tuple[Path, str]]) -> None:
+        """Writes every (file path, fragment) pair to its file."""
+        for file_path, fragment in routed_fragments:
+            self.write(file_path, fragment)
+
+    def close(self) -> None:
+        """Flushes and closes all open files."""
+        start = time.perf_counter()
+        for file in self._open_files.values():
+            file.close()
+        self._open_files.clear()
+
+        if self.stats is not None:
+            self.stats.add_time("write", time.perf_counter() - start)
+            for file_path, initial_size in self._initial_sizes.items():
+                _record_write(self.stats, file_path, initial_size)
+        self._initial_sizes.clear()
+        self._digests.clear()
+
+    def _get_file(self, file_path: Path) -> IO[str]:
+        file = self._open_files.pop(file_path, None)
+        if file is None:
+            if len(self._open_files) >= self.max_open_files:
+                # Dicts keep insertion order, so the first file is the stalest
+                stale_path = next(iter(self._open_files))
+                self._open_files.pop(stale_path).close()
+            if file_path in self._initial_sizes:
+                mode = "a"
+            else:
+                mode = self.mode
+                self._initial_sizes[file_path] = (
+                    _file_size(Path(file_path)) if "a" in mode else 0
+                )
+            self._digests[file_path] = _track_write(file_path, mode)
+            file = Path(file_path).open(
+                mode, encoding="utf-8", buffering=self.buffer_size
+            )
+        # Re-insert to mark the file as most recently used
+        self._open_files[file_path] = file
+        return file
+
+    def __enter__(self) -> "FragmentWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class BackgroundWriter:
+    """
+    Routes fragments to a `FragmentWriter` running in a background thread,
+    through a queue of at most `depth` fragments, so that producing
+    fragments overlaps with slow writes, e.g. on network file systems.
+    Errors of the writer are raised by the next write or by `close()`.
+    """
+
+    def __init__(self, writer: FragmentWriter, depth: int) -> None:
+        self.writer = writer
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(
+            target=self._run, name="background-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, file_path: Path, fragment: str) -> None:
+        """Queues a fragment to be written to the given file."""
+        if self._error is not None:
+            raise self._error
+        self._queue.put((file_path, fragment))
+
+    def _run(self) -> None:
+        while (item := self._queue.get()) is not None:
+            # After an error, fragments are still taken so writes never block
+            if self._error is None:
+                try:
+                    self.writer.write(*item)
+                except BaseException as error:
+                    self._error = error
+
+    def close(self) -> None:
+        """Waits for the queued fragments to be written, then closes files."""
+        self._queue.put(None)
+        self._thread.join()
+        self.writer.close()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _encoded_size(text: str) -> int:
+    """Returns the size of a text encoded in UTF-8, without encoding ASCII."""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+class OutputSections:
+    """
+    In-memory sections of output files shared by several converters, e.g. the
+    intents and synonyms of `nlu.yml`. Converters fill their own sections
+    independently, and each file is then assembled from its sections, in
+    order, with a single write instead of being reopened to append content.
+    Sections too large to keep in memory can be backed by a file instead.
+
+    With a `memory_budget` (in bytes, as encoded in the output files, and
+    `DEFAULT_MEMORY_BUDGET` unless given; None disables it), the largest
+    sections are spilled to temporary files in `spill_dir` whenever the
+    sections held in memory exceed it; spilled sections keep being written to
+    their file, which is copied sequentially into the output file when it is
+    assembled.
+    """
+
+    def __init__(
+        self,
+        memory_budget: Optional[int] = DEFAULT_MEMORY_BUDGET,
+        spill_dir: Optional[Path] = None,
+    ) -> None:
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        # Bytes held in memory, at most ever held, and spilled to disk
+        self.size = 0
+        self.peak_size = 0
+        self.spilled_size = 0
+        self._buffers: dict[str, io.StringIO] = {}
+        self._sizes: dict[str, int] = {}
+        self._spill_files: dict[str, IO[str]] = {}
+        self._files: dict[str, Path] = {}
+        self._lock = threading.Lock()
+
+    def _buffer(self, name: str) -> io.StringIO:
+        with self._lock:
+            if name not in self._buffers:
+                self._buffers[name] = io.StringIO()
+            return self._buffers[name]
+
+    def write(self, name: str, fragments: Iterable[str]) -> None:
+        """Appends fragments to the named section."""
+        if self.memory_budget is None:
+            buffer = self._buffer(name)
+            for fragment in fragments:
+                buffer.write(fragment)
+            return
+
+        for fragment in fragments:
+            size = _encoded_size(fragment)
+            # Sections may be spilled by any thread, so every write is locked
+            with self._lock:
+                spill_file = self._spill_files.get(name)
+                if spill_file is not None:
+                    spill_file.write(fragment)
+                    self.spilled_size += size
+                    continue
+                self._buffers.setdefault(name, io.StringIO()).write(fragment)
+                self._sizes[name] = self._sizes.get(name, 0) + size
+                self.size += size
+                self.peak_size = max(self.peak_size, self.size)
+                if self.size > self.memory_budget:
+                    self._spill()
+
+    def _spill(self) -> None:
+        """Moves the largest sections to disk until memory fits the budget."""
+        while self.size > self.memory_budget and self._sizes:
+            name = max(self._sizes, key=self._sizes.__getitem__)
+            buffer = self._buffers.pop(name)
+            spill_file = tempfile.NamedTemporaryFile(
+                "w",
+                encoding="utf-8",
+                buffering=DEFAULT_BUFFER_SIZE,
+                dir=self.spill_dir,
+                prefix=".spill-",
+                suffix=".part",
+                delete=False,
+            )
+            buffer.seek(0)
+            shutil.copyfileobj(buffer, spill_file, DEFAULT_BUFFER_SIZE)
+            size = self._sizes.pop(name)
+            self.size -= size
+            self.spilled_size += size
+            self._spill_files[name] = spill_file
+
+    def attach_file(self, name: str, file_path: Path) -> None:
+        """
+        Appends the content of a file to the named section. The file is read
+        in chunks when the section is assembled, then deleted.
+        """
+        with self._lock:
+            self._files[name] = file_path
+
+    def _section_files(self, name: str) -> list[Path]:
+        """Returns the files holding the content of a section, in order."""
+        file_paths = []
+        spill_file = self._spill_files.get(name)
+        if spill_file is not None:
+            spill_file.flush()
+            file_paths.append(Path(spill_file.name))
+        if name in self._files:
+            file_paths.append(self._files[name])
+        return file_paths
+
+    def _iter_section(self, name: str) -> Iterator[str]:
+        # Read in chunks rather than copied whole with `getvalue()`
+        buffer = self._buffers.get(name)
+        if buffer is not None:
+            buffer.seek(0)
+            yield from iter(lambda: buffer.read(DEFAULT_BUFFER_SIZE), "")
+        for file_path in self._section_files(name):
+            with file_path.open("r", encoding="utf-8") as file:
+                yield from iter(lambda: file.read(DEFAULT_BUFFER_SIZE), "")
+
+    def is_empty(self, name: str) -> bool:
+        """Returns whether nothing was written to a section."""
+        buffer = self._buffers.get(name)
+        has_content = buffer is not None and buffer.seek(0, io.SEEK_END) > 0
+        return not has_content and not self._section_files(name)
 
+    def value(self, name: str) -> str:
+        """Returns the in-memory content of a section, empty if nothing was written."""
+        buffer = self._buffers.get(name)
+        return buffer.getvalue() if buffer is not None else ""
 
-def write_dict_files(content_dict: dict) -> None:
-    """Writes given content to corresponding files."""
-    for file_path, content in content_dict.items():
-        write_to_file(file_path, content, mode="a")
+    def assemble(
+        self,
+        file_path: Path,
+        section_names: Iterable[str],
+        stats: Optional[ConversionStats] = None,
+        header: str = "",
+    ) -> None:
+        """
+        Writes a file from the given sections, after an optional header,
+        and releases their memory and files.
+        """
+        section_names = list(section_names)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        write_fragments(
+            file_path,
+            itertools.chain(
+                [header],
+                (
+                    fragment
+                    for name in section_names
+                    for fragment in self._iter_section(name)
+                ),
+            ),
+            stats=stats,
+        )
+        for name in section_names:
+            with self._lock:
+                self._buffers.pop(name, None)
+                self.size -= self._sizes.pop(name, 0)
+                section_files = self._section_files(name)
+                spill_file = self._spill_files.pop(name, None)
+                self._files.pop(name, None)
+            if spill_file is not None:
+                spill_file.close()
+            for section_file in section_files:
+                section_file.unlink()
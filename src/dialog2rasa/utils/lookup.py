@@ -0,0 +1,129 @@
+import re
+from typing import Iterable, NamedTuple
+
+from dialog2rasa.utils.formatting import format_regex_for_rasa
+
+# How lookup tables are written: as is, deduplicated, or as a factored regex
+LOOKUP_MODES = ("raw", "dedupe", "regex")
+# Maximum number of entries compiled into a single regex pattern
+DEFAULT_SHARD_SIZE = 10000
+# Entries longer than this are not factored, to bound the trie's recursion
+MAX_TRIE_DEPTH = 256
+
+_END = ""
+
+
+class LookupTable(NamedTuple):
+    """File name, content and number of entries of a lookup table."""
+
+    file_name: str
+    content: str
+    entries: int
+
+
+def normalize_entries(lines: Iterable[str]) -> list[str]:
+    """
+    Returns the sorted, deduplicated entries of a lookup table, with
+    surrounding whitespace stripped and inner whitespace collapsed.
+
+    >>> normalize_entries(["ok", " uhum ", "", "new  york", "ok"])
+    ['new york', 'ok', 'uhum']
+    """
+    return sorted({" ".join(line.split()) for line in lines} - {""})
+
+
+def trie_regex(entries: Iterable[str]) -> str:
+    """
+    Returns a regex matching exactly the given entries, factored through a
+    prefix trie so that shared prefixes are only matched once.
+
+    >>> trie_regex(["foobar", "foobaz", "foo", "bar"])
+    '(?:bar|foo(?:ba[rz])?)'
+    """
+    trie: dict = {}
+    long_entries = []
+    for entry in entries:
+        if len(entry) > MAX_TRIE_DEPTH:
+            long_entries.append(re.escape(entry))
+            continue
+        node = trie
+        for char in entry:
+            node = node.setdefault(char, {})
+        node[_END] = True
+
+    pattern = _node_pattern(trie)
+    alternatives = ([pattern] if pattern else []) + long_entries
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return f"(?:{'|'.join(alternatives)})"
+
+
+def _node_pattern(node: dict) -> str:
+    """Returns the pattern of the suffixes below a trie node."""
+    alternatives = []
+    single_chars = []
+    for char in sorted(key for key in node if key != _END):
+        child = node[char]
+        if len(child) == 1 and _END in child:
+            single_chars.append(re.escape(char))
+        else:
+            alternatives.append(re.escape(char) + _node_pattern(child))
+
+    only_chars = not alternatives
+    if len(single_chars) == 1:
+        alternatives.append(single_chars[0])
+    elif single_chars:
+        alternatives.append(f"[{''.join(single_chars)}]")
+
+    if not alternatives:
+        return ""
+    if len(alternatives) == 1:
+        pattern = alternatives[0]
+    else:
+        pattern = f"(?:{'|'.join(alternatives)})"
+    if _END in node:
+        # Entries may end here, so the suffixes are optional
+        if only_chars or len(alternatives) > 1:
+            pattern += "?"
+        else:
+            pattern = f"(?:{pattern})?"
+    return pattern
+
+
+def lookup_regex_patterns(entries: list[str], shard_size: int) -> list[str]:
+    """
+    Returns word-bounded regex patterns matching the entries, each covering
+    at most `shard_size` of them, so that no single pattern grows unbounded.
+    """
+    if shard_size < 1:
+        raise ValueError(f"Regex shard size must be positive, got {shard_size}.")
+    return [
+        rf"\b{trie_regex(entries[start : start + shard_size])}\b"
+        for start in range(0, len(entries), shard_size)
+    ]
+
+
+def optimize_lookup(
+    entity_name: str,
+    content: str,
+    mode: str,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> LookupTable:
+    """
+    Returns the optimized lookup table of an entity, given its raw content
+    (one entry per line). In 'dedupe' mode the entries are
+    normalized, deduplicated and sorted; in 'regex' mode they are further
+    compiled into sharded, factored Rasa regexes.
+    """
+    if mode not in LOOKUP_MODES:
+        raise ValueError(f"Unknown lookup mode '{mode}', expected {LOOKUP_MODES}.")
+    if mode == "raw":
+        return LookupTable(f"{entity_name}.txt", content, content.count("\n"))
+
+    entries = normalize_entries(content.splitlines())
+    if mode == "dedupe":
+        content = "".join(f"{entry}\n" for entry in entries)
+        return LookupTable(f"{entity_name}.txt", content, len(entries))
+    patterns = lookup_regex_patterns(entries, shard_size)
+    content = format_regex_for_rasa(entity_name, patterns)
+    return LookupTable(f"{entity_name}.yml", content, len(entries))
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Union
+
+from dialog2rasa.utils.io import AgentFile, MemberStat, relative_file_path
+from dialog2rasa.utils.parallel import DEFAULT_IO_THREADS, map_json_files
+from dialog2rasa.utils.stats import ConversionStats
+
+# Bump whenever converter output changes, so stale manifests get discarded
+MANIFEST_VERSION = 6
+
+FileStat = Union[os.stat_result, MemberStat]
+# Marks files without reusable results, as cached fragments may be None
+_MISSING = object()
+
+
+def hash_file(file_path: AgentFile) -> str:
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with file_path.open("rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """
+    Records, for every converted source file, its size, mtime, content hash
+    and the output fragments it produced. On the next run, files whose size
+    and mtime (or, failing that, content hash) are unchanged reuse their
+    cached fragments instead of being parsed and converted again. Records can
+    be shared between the manifests of several languages converted in the
+    same run, so language-independent files are only checked once.
+    """
+
+    def __init__(
+        self,
+        manifest_path: Path,
+        agent_dir: Path,
+        shared_records: Optional[dict[str, dict]] = None,
+    ) -> None:
+        self.manifest_path = manifest_path
+        self.agent_dir = agent_dir
+        self.previous_records = self._load()
+        self.shared_records = shared_records if shared_records is not None else {}
+        self.records: dict[str, dict] = {}
+        self.reused = 0
+        self.converted = 0
+        # Converters of the same language may run in concurrent threads
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict[str, dict]:
+        """Returns records of the previous run, or none if unusable."""
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with self.manifest_path.open("r", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        return manifest.get("files", {})
+
+    def save(self) -> None:
+        """Writes the manifest next to the output, replacing it atomically."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with temp_path.open("w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "files": self.records,
+                },
+                file,
+            )
+        os.replace(temp_path, self.manifest_path)
+
+    def map_json_files(
+        self,
+        func: Callable,
+        tasks: Iterable[tuple[AgentFile, Sequence[Any]]],
+        read_hashed_json: Callable[[AgentFile], tuple[Any, Optional[str]]],
+        jobs: int = 1,
+        stats: Optional[ConversionStats] = None,
+        read_ahead_depth: int = 0,
+        io_threads: int = DEFAULT_IO_THREADS,
+        pool: Optional[ProcessPoolExecutor] = None,
+    ) -> Iterator[Any]:
+        """
+        Same as `utils.parallel.map_json_files`, but only changed or new
+        files are converted; the others yield their cached fragments. Tasks
+        are checked as the conversion pulls them, so results are still
+        yielded as they are converted, and changed files are hashed from the
+        bytes read to convert them.
+        """
+        # Checked tasks not yielded yet: cached fragments, or the record
+        # details of a task pending conversion
+        checked: deque[tuple[bool, Any]] = deque()
+
+        def check_tasks() -> Iterator[tuple[AgentFile, list]]:
+            for file_path, args in tasks:
+                args = list(args)
+                relative_path = relative_file_path(file_path, self.agent_dir)
+                key = f"{func.__name__}:{relative_path}"
+                fragments = self._reuse(key, file_path, args)
+                if fragments is not _MISSING:
+                    checked.append((True, fragments))
+                    continue
+                checked.append((False, (key, file_path.stat(), args)))
+                yield file_path, args
+
+        converted = map_json_files(
+            func,
+            check_tasks(),
+            read_hashed_json,
+            jobs,
+            stats,
+            read_ahead_depth,
+            io_threads,
+            hashed=True,
+            pool=pool,
+        )
+        for fragments, content_hash in converted:
+            # Tasks checked before the converted one were all reused
+            while checked[0][0]:
+                yield checked.popleft()[1]
+            key, stat, args = checked.popleft()[1]
+            self._store(key, stat, content_hash, args, fragments)
+            self._count(converted=1)
+            yield fragments
+        while checked:
+            yield checked.popleft()[1]
+
+    def _reuse(self, key: str, file_path: AgentFile, args: list) -> Any:
+        """
+        Returns the cached fragments of an unchanged file, recording them for
+        the next run, or `_MISSING` when the file must be converted.
+        """
+        shared_record = self.shared_records.get(key)
+        if shared_record is not None and shared_record["args"] == args:
+            self.records[key] = shared_record
+            self._count(reused=1)
+            return shared_record["fragments"]
+
+        record = self.previous_records.get(key)
+        if record is None or record["args"] != args:
+            return _MISSING
+        stat = file_path.stat()
+        if record["size"] != stat.st_size:
+            return _MISSING
+        # Files touched without being changed are recognized by their content
+        touched = record["mtime"] != stat.st_mtime_ns
+        if touched and hash_file(file_path) != record["hash"]:
+            return _MISSING
+        self._store(key, stat, record["hash"], args, record["fragments"])
+        self._count(reused=1)
+        return record["fragments"]
+
+    def _count(self, reused: int = 0, converted: int = 0) -> None:
+        with self._lock:
+            self.reused += reused
+            self.converted += converted
+
+    def _store(
+        self,
+        key: str,
+        stat: FileStat,
+        content_hash: str,
+        args: list,
+        fragments: Any,
+    ) -> None:
+        self.records[key] = self.shared_records[key] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": content_hash,
+            "args": args,
+            "fragments": fragments,
+        }
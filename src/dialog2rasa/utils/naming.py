@@ -0,0 +1,65 @@
+import re
+import sys
+from functools import lru_cache
+
+# Maximum number of distinct names memoized by each normalization function
+NAME_CACHE_SIZE = 65536
+
+CAMEL_CASE_BOUNDARY = re.compile(r"(?<!^)(?=[A-Z])")
+# How intents are grouped into the files of the sharded output layout
+SHARD_KEYS = ("intent", "prefix")
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def camel_to_snake(s: str) -> str:
+    """Converts input string from CamelCase to snake_case."""
+    return sys.intern(
+        CAMEL_CASE_BOUNDARY.sub("_", s)  # insert underscores before capital letters
+        .replace(" ", "_")  # fix non non-standard CamelCase inputs
+        .replace("__", "_")  # fix double underscores (from previous replace)
+        .lower()  # lowercase for true snake_case
+    )
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def entity_reference_to_name(reference: str) -> str:
+    """
+    Converts a Dialogflow entity reference from a training phrase annotation
+    (e.g. '@sys.date' or '@fullName') into its Rasa entity name.
+    """
+    return camel_to_snake(reference.replace("@", "").replace(".", "_"))
+
+
+def shard_name(intent_name: str, shard_by: str = "intent") -> str:
+    """
+    Returns the name of the output file an intent goes to in the sharded
+    layout: the intent itself, or the prefix of its name up to the first
+    dot, e.g. 'chitchat' for every 'chitchat.*' intent.
+
+    >>> shard_name("chitchat.greet", "prefix")
+    'chitchat'
+    """
+    if shard_by == "prefix":
+        return intent_name.split(".", 1)[0]
+    return intent_name
+
+
+class NameTable:
+    """
+    Canonical Rasa names of an agent's intents and entities, computed once per
+    agent, so that every output refers to a Dialogflow name in the same way.
+    """
+
+    def __init__(self, intent_names: set[str], entity_names: set[str]) -> None:
+        self.intents = {name: camel_to_snake(name) for name in sorted(intent_names)}
+        self.entities = {name: camel_to_snake(name) for name in sorted(entity_names)}
+
+    def intent(self, name: str) -> str:
+        """Returns the Rasa name of a Dialogflow intent."""
+        rasa_name = self.intents.get(name)
+        return rasa_name if rasa_name is not None else camel_to_snake(name)
+
+    def entity(self, name: str) -> str:
+        """Returns the Rasa name of a Dialogflow entity, also used for its slot."""
+        rasa_name = self.entities.get(name)
+        return rasa_name if rasa_name is not None else camel_to_snake(name)
@@ -0,0 +1,166 @@
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.context import BaseContext
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+
+from dialog2rasa.utils.decoding import get_json_backend, set_json_backend
+from dialog2rasa.utils.io import AgentFile, read_hashed_json_file, read_json_file
+from dialog2rasa.utils.stats import ConversionStats
+
+# Number of chunks handed to each worker, to balance load against IPC overhead
+CHUNKS_PER_WORKER = 4
+# Threads reading files ahead; reads mostly wait on storage, not on the CPU
+DEFAULT_IO_THREADS = 4
+
+
+def mp_context() -> Optional[BaseContext]:
+    """
+    Returns the context worker processes are started with. Converters may run
+    in threads, and forking a multi-threaded process can deadlock the child,
+    so workers are started from a fork server where the platform offers one.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return None
+
+
+def make_process_pool(jobs: int) -> ProcessPoolExecutor:
+    """
+    Returns a pool of `jobs` worker processes, shared by every converter of
+    a run so that converters scheduled concurrently do not each start their
+    own workers.
+    """
+    return ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=mp_context(),
+        initializer=init_worker,
+        initargs=worker_settings(),
+    )
+
+
+def worker_settings() -> tuple[str]:
+    """Returns the JSON backend selected in this process."""
+    return (get_json_backend(),)
+
+
+def init_worker(json_backend: str) -> None:
+    """
+    Selects the parent's backend in a worker process, which does not inherit
+    a backend selected after it was started.
+    """
+    set_json_backend(json_backend)
+
+
+def _read_and_apply(task: tuple[Callable, AgentFile, Sequence[Any], bool]) -> Any:
+    """
+    Reads a JSON file inside a worker process and applies the function,
+    returning the result, paired with the file's digest when `hashed`, with
+    the worker's statistics for the parent.
+    """
+    func, file_path, args, hashed = task
+    stats = ConversionStats()
+    data, digest = read_hashed_json_file(file_path, stats, hashed)
+    with stats.timer("transform"):
+        result = func(data, *args)
+    if hashed:
+        result = (result, digest)
+    report = stats.to_dict()
+    return result, {"timings": report["timings"], "counters": report["counters"]}
+
+
+def read_ahead(
+    read: Callable[[Any], Any],
+    items: Iterable[Any],
+    depth: int,
+    threads: int = DEFAULT_IO_THREADS,
+) -> Iterator[Any]:
+    """
+    Yields `read(item)` for every item in order, while up to `depth` upcoming
+    items are already being read by a pool of threads, so that waiting on
+    slow storage overlaps with processing the items already read.
+    """
+    with ThreadPoolExecutor(
+        max_workers=threads, thread_name_prefix="read-ahead"
+    ) as executor:
+        pending: deque[Future] = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(read, item))
+                if len(pending) > depth:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Reads not consumed yet, e.g. after an error, are not waited for
+            for future in pending:
+                future.cancel()
+
+
+def map_json_files(
+    func: Callable,
+    tasks: Iterable[tuple[AgentFile, Sequence[Any]]],
+    read_json: Callable[[AgentFile], Any] = read_json_file,
+    jobs: int = 1,
+    stats: Optional[ConversionStats] = None,
+    read_ahead_depth: int = 0,
+    io_threads: int = DEFAULT_IO_THREADS,
+    hashed: bool = False,
+    pool: Optional[ProcessPoolExecutor] = None,
+) -> Iterator[Any]:
+    """
+    Applies `func(data, *args)` to the parsed content of every (file path,
+    args) task and yields the results in task order. With `jobs` > 1, files
+    are decoded and converted in a process pool; `func` must then be a
+    module-level function so it can be pickled. Otherwise, with
+    `read_ahead_depth` > 0, up to that many files are read ahead of the
+    conversion by `io_threads` threads.
+    With `hashed`, `read_json` returns the parsed content along with the
+    SHA-256 digest of the file, and each result is yielded with that digest.
+    Files are converted in `pool` when given, or in a pool of `jobs` workers
+    started for this call otherwise.
+    """
+    if jobs <= 1:
+        if read_ahead_depth > 0:
+            payloads = read_ahead(
+                lambda task: (read_json(task[0]), task[1]),
+                tasks,
+                read_ahead_depth,
+                io_threads,
+            )
+        else:
+            payloads = ((read_json(file_path), args) for file_path, args in tasks)
+        for data, args in payloads:
+            if hashed:
+                data, digest = data
+            start = time.perf_counter()
+            result = func(data, *args)
+            if stats is not None:
+                stats.add_time("transform", time.perf_counter() - start)
+            yield (result, digest) if hashed else result
+        return
+
+    work = [(func, file_path, tuple(args), hashed) for file_path, args in tasks]
+    if not work:
+        return
+    chunksize = max(1, len(work) // (jobs * CHUNKS_PER_WORKER))
+    if pool is None:
+        with make_process_pool(jobs) as pool:
+            yield from _map_in_pool(pool, work, chunksize, stats)
+    else:
+        yield from _map_in_pool(pool, work, chunksize, stats)
+
+
+def _map_in_pool(
+    pool: ProcessPoolExecutor,
+    work: list[tuple[Callable, AgentFile, Sequence[Any], bool]],
+    chunksize: int,
+    stats: Optional[ConversionStats],
+) -> Iterator[Any]:
+    # Executor.map returns results in submission order, so the merged output
+    # is identical to a serial run
+    for result, report in pool.map(_read_and_apply, work, chunksize=chunksize):
+        if stats is not None:
+            stats.merge(report)
+        yield result
@@ -0,0 +1,58 @@
+import random
+from typing import Any, Iterable, NamedTuple, Optional
+
+
+class SampledExamples(NamedTuple):
+    """Examples kept from an intent and the numbers of examples dropped."""
+
+    kept: list[Any]
+    duplicates: int
+    sampled_out: int
+
+
+def normalize_text(text: str) -> str:
+    """
+    Returns the key under which two example texts count as duplicates.
+
+    >>> normalize_text("  Book a   FLIGHT ")
+    'book a flight'
+    """
+    return " ".join(text.casefold().split())
+
+
+def sample_examples(
+    examples: Iterable[tuple[str, Any]],
+    max_examples: Optional[int] = None,
+    dedupe: bool = False,
+    seed: str = "0",
+) -> SampledExamples:
+    """
+    Drops duplicated and excess examples in a single pass. Examples are
+    (key, example) pairs, duplicates share the same key, and with
+    `max_examples` a uniform sample of the remaining examples is kept by
+    reservoir sampling, reproducible for a given `seed`. Kept examples
+    retain their original order.
+    """
+    rng = random.Random(seed)
+    keys: set[str] = set()
+    # Kept examples and their positions among the non-duplicated examples
+    reservoir: list[tuple[int, Any]] = []
+    duplicates = 0
+    count = 0
+    for key, example in examples:
+        if dedupe:
+            if key in keys:
+                duplicates += 1
+                continue
+            keys.add(key)
+        if max_examples is None or len(reservoir) < max_examples:
+            reservoir.append((count, example))
+        else:
+            position = rng.randrange(count + 1)
+            if position < max_examples:
+                reservoir[position] = (count, example)
+        count += 1
+
+    reservoir.sort(key=lambda item: item[0])
+    kept = [example for _, example in reservoir]
+    return SampledExamples(kept, duplicates, count - len(kept))
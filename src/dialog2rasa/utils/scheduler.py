@@ -0,0 +1,82 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, NamedTuple, Optional
+
+
+class Task(NamedTuple):
+    name: str
+    func: Callable[[], None]
+    produces: tuple[str, ...]
+    consumes: tuple[str, ...]
+
+
+class DependencyScheduler:
+    """
+    Runs tasks as a DAG: each task declares the outputs it produces and
+    consumes, and starts in a worker thread as soon as every task producing
+    its inputs has finished. Independent tasks therefore run concurrently.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self.max_workers = max_workers
+        self.tasks: dict[str, Task] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[[], None],
+        produces: tuple[str, ...] = (),
+        consumes: tuple[str, ...] = (),
+    ) -> None:
+        """Registers a task with the outputs it produces and consumes."""
+        if name in self.tasks:
+            raise ValueError(f"Task '{name}' is already scheduled.")
+        self.tasks[name] = Task(name, func, tuple(produces), tuple(consumes))
+
+    def dependencies(self) -> dict[str, set[str]]:
+        """Returns, for every task, the names of the tasks it waits for."""
+        producers: dict[str, list[str]] = {}
+        for task in self.tasks.values():
+            for output in task.produces:
+                producers.setdefault(output, []).append(task.name)
+
+        dependencies = {}
+        for task in self.tasks.values():
+            dependencies[task.name] = set()
+            for output in task.consumes:
+                if output not in producers:
+                    raise ValueError(
+                        f"Task '{task.name}' consumes '{output}', "
+                        "which no task produces."
+                    )
+                dependencies[task.name].update(producers[output])
+        return dependencies
+
+    def run(self) -> None:
+        """Runs all tasks, re-raising the first error once running tasks end."""
+        dependencies = self.dependencies()
+        pending = dict(self.tasks)
+        finished: set[str] = set()
+        running: dict[Future, str] = {}
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers or max(1, len(self.tasks))
+        ) as executor:
+            while pending or running:
+                ready = [name for name in pending if dependencies[name] <= finished]
+                for name in ready:
+                    running[executor.submit(pending.pop(name).func)] = name
+
+                if not running:
+                    raise ValueError(
+                        "Cyclic dependencies between tasks: "
+                        f"{', '.join(sorted(pending))}."
+                    )
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.exception() is not None:
+                        for other in running:
+                            other.cancel()
+                        raise future.exception()
+                    finished.add(name)
@@ -0,0 +1,117 @@
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import resource
+
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    Returns the peak resident set size of the current process in bytes, or
+    None where the platform does not report it (e.g. Windows).
+    """
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def peak_traced_bytes() -> Optional[int]:
+    """
+    Returns the peak size of the memory blocks allocated by Python since
+    `tracemalloc` was started, or None when it is not tracing.
+    """
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[1]
+
+
+class ConversionStats:
+    """
+    Collects timings and counters of a conversion run. Timings cover each
+    converter's `convert()` (e.g. 'convert.intent') and the stages shared by
+    all converters: 'scan', 'read', 'transform' and 'write'. Stage timings of
+    worker processes are summed, so they may exceed the wall-clock time.
+    """
+
+    def __init__(self) -> None:
+        self.timings: dict[str, float] = defaultdict(float)
+        self.counters: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Adds the time spent in the context to the named timing."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[name] += seconds
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def merge(self, report: dict) -> None:
+        """Adds the timings and counters of a report, e.g. from a worker."""
+        with self._lock:
+            for name, seconds in report.get("timings", {}).items():
+                self.timings[name] += seconds
+            for name, value in report.get("counters", {}).items():
+                self.counters[name] += value
+
+    def to_dict(self) -> dict:
+        """Returns the collected statistics as a JSON-serializable report."""
+        with self._lock:
+            return {
+                "total_seconds": round(time.perf_counter() - self._start, 6),
+                "timings": {
+                    name: round(seconds, 6)
+                    for name, seconds in sorted(self.timings.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def write_json(self, file_path: Path) -> None:
+        """Writes the report to a JSON file."""
+        with Path(file_path).open("w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def summary_table(self) -> str:
+        """Returns the report as a human-readable table."""
+        report = self.to_dict()
+        width = max(
+            [len(name) for name in report["timings"]]
+            + [len(name) for name in report["counters"]]
+            + [len("total")]
+        )
+        lines = [f"{'stage':<{width}}  {'seconds':>12}"]
+        lines += [
+            f"{name:<{width}}  {seconds:>12.4f}"
+            for name, seconds in report["timings"].items()
+        ]
+        lines.append(f"{'total':<{width}}  {report['total_seconds']:>12.4f}")
+        lines.append("")
+        lines.append(f"{'counter':<{width}}  {'value':>12}")
+        lines += [
+            f"{name:<{width}}  {value:>12}"
+            for name, value in report["counters"].items()
+        ]
+        return "\n".join(lines)
@@ -0,0 +1,258 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from dialog2rasa.cache import CachedAgent
+from dialog2rasa.utils.io import StagedDirectory, write_to_file
+from dialog2rasa.utils.lookup import DEFAULT_SHARD_SIZE
+
+try:
+    import inotify_simple
+
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+# Quiet period after which a burst of changes, e.g. from unzipping an export
+# over the agent, is considered complete and converted at once
+DEFAULT_DEBOUNCE = 0.2
+DEFAULT_POLL_INTERVAL = 0.5
+
+Watcher = Union["PollingWatcher", "InotifyWatcher"]
+
+
+def _is_agent_file(name: str) -> bool:
+    return name.endswith(".json")
+
+
+class PollingWatcher:
+    """
+    Detects changed files in folders by comparing their modification time
+    and size between two scans, for systems without inotify.
+    """
+
+    def __init__(
+        self, folders: list[Path], match: Callable[[str], bool] = _is_agent_file
+    ) -> None:
+        self.folders = folders
+        self.match = match
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for folder in self.folders:
+            try:
+                entries = list(os.scandir(folder))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if not self.match(entry.name):
+                    continue
+                try:
+                    entry_stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[folder / entry.name] = (
+                    entry_stat.st_mtime_ns,
+                    entry_stat.st_size,
+                )
+        return snapshot
+
+    def wait(self, timeout: float) -> set[Path]:
+        """Returns the files changed, added or removed within `timeout` seconds."""
+        time.sleep(timeout)
+        previous, self._snapshot = self._snapshot, self._scan()
+        changed = previous.keys() ^ self._snapshot.keys()
+        changed.update(
+            path
+            for path, signature in self._snapshot.items()
+            if previous.get(path, signature) != signature
+        )
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """
+    Detects changed files in folders from inotify events. Folders that are
+    removed, e.g. by replacing the agent, are watched again once they are
+    created back, and are then reported as changed as a whole.
+    """
+
+    def __init__(
+        self, folders: list[Path], match: Callable[[str], bool] = _is_agent_file
+    ) -> None:
+        flags = inotify_simple.flags
+        self.folders = folders
+        self.match = match
+        self.mask = (
+            flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE
+        )
+        self._inotify = inotify_simple.INotify()
+        self._watches: dict[int, Path] = {}
+        self._watch_missing()
+
+    def _watch_missing(self) -> set[Path]:
+        """Watches the folders not watched yet, returning those now watched."""
+        watched = set(self._watches.values())
+        added = set()
+        for folder in self.folders:
+            if folder in watched or not folder.is_dir():
+                continue
+            try:
+                self._watches[self._inotify.add_watch(folder, self.mask)] = folder
+            except FileNotFoundError:
+                continue
+            added.add(folder)
+        return added
+
+    def wait(self, timeout: float) -> set[Path]:
+        """Returns the files changed, added or removed within `timeout` seconds."""
+        flags = inotify_simple.flags
+        changed = set()
+        for event in self._inotify.read(timeout=int(timeout * 1000)):
+            if event.mask & flags.Q_OVERFLOW:
+                # Events were lost, so every folder may have changed
+                changed.update(self.folders)
+            elif event.mask & flags.IGNORED:
+                self._watches.pop(event.wd, None)
+            elif event.wd in self._watches and self.match(event.name):
+                changed.add(self._watches[event.wd] / event.name)
+        changed.update(self._watch_missing())
+        return changed
+
+    def close(self) -> None:
+        self._inotify.close()
+
+
+def make_watcher(
+    folders: list[Path],
+    match: Callable[[str], bool] = _is_agent_file,
+    use_inotify: bool = True,
+) -> Watcher:
+    """Returns an inotify watcher when available, or a polling one otherwise."""
+    if use_inotify and INOTIFY_AVAILABLE:
+        return InotifyWatcher(folders, match)
+    return PollingWatcher(folders, match)
+
+
+def _commit_changed(
+    output_dir: Path,
+    files: dict[str, str],
+    previous: dict[str, str],
+    fsync: bool = False,
+) -> int:
+    """
+    Stages the output of a language and swaps it into place, like the
+    converters do, so that readers never see a partially updated tree. Only
+    the files whose content changed are written, the others being carried
+    over from the current output, and files no longer rendered, e.g. the
+    lookup table of a deleted entity, are dropped. Returns the number of
+    files written or removed.
+    """
+    staging = StagedDirectory(output_dir, fsync=fsync)
+    staging.prepare("data/nlu/lookup")
+    count = len(previous.keys() - files.keys())
+    try:
+        for relative_path, content in files.items():
+            if previous.get(relative_path) == content and staging.keep(relative_path):
+                continue
+            file_path = staging.path / relative_path
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            write_to_file(file_path, content)
+            count += 1
+    except BaseException:
+        staging.discard()
+        raise
+    staging.commit()
+    return count
+
+
+def watch_agent(
+    agent_dir: Path,
+    languages: list[str],
+    output_root: Path,
+    logger: logging.Logger,
+    lookup_mode: str = "raw",
+    lookup_shard_size: int = DEFAULT_SHARD_SIZE,
+    debounce: float = DEFAULT_DEBOUNCE,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    use_inotify: bool = True,
+    fsync: bool = False,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Converts an agent again whenever its files change, until `stop` is set.
+    The output in `output_root` is expected to be up to date when watching
+    starts. Only the changed files are parsed again, only the items parsed
+    from them are rendered again, and only the output files whose content
+    changed are written, through a staging folder swapped into place.
+    """
+    stop = stop if stop is not None else threading.Event()
+    agent = CachedAgent(agent_dir)
+    is_archive = agent_dir.is_file()
+    if is_archive:
+        folders = [agent_dir.parent]
+        match: Callable[[str], bool] = agent_dir.name.__eq__
+    else:
+        folders = [agent_dir / "intents", agent_dir / "entities"]
+        match = _is_agent_file
+    watcher = make_watcher(folders, match, use_inotify)
+
+    # The cache is warmed up before watching, so the first change is fast
+    rendered = agent.convert(languages, lookup_mode, lookup_shard_size).files
+    failed = False
+    logger.info(
+        f"Watching '{agent_dir}' for changes "
+        f"({type(watcher).__name__.removesuffix('Watcher').lower()})..."
+    )
+    try:
+        while not stop.is_set():
+            changed = watcher.wait(poll_interval)
+            if not changed:
+                continue
+            # Waits for the burst of changes to settle before converting
+            while not stop.is_set():
+                more = watcher.wait(debounce)
+                if not more:
+                    break
+                changed |= more
+
+            start = time.perf_counter()
+            # Archives and replaced folders cannot tell which files changed,
+            # and files that failed to parse are checked until they succeed
+            full_check = is_archive or failed or changed & set(folders)
+            known = None if full_check else changed
+            try:
+                preview = agent.convert(
+                    languages, lookup_mode, lookup_shard_size, changed=known
+                )
+                written = sum(
+                    _commit_changed(
+                        output_root / language,
+                        files,
+                        rendered.get(language, {}),
+                        fsync,
+                    )
+                    for language, files in preview.files.items()
+                )
+            except Exception as error:
+                # E.g. a file saved halfway, which the next change completes
+                logger.error(f"Conversion of '{agent_dir}' failed: {error}")
+                failed = True
+                continue
+            failed = False
+            rendered = preview.files
+            seconds = time.perf_counter() - start
+            logger.info(
+                f"Reconverted {len(changed)} changed file(s) in "
+                f"{seconds * 1000:.1f} ms ({preview.reparsed} reparsed, "
+                f"{written} output file(s) updated)."
+            )
+    finally:
+        watcher.close()
@@ -0,0 +1,111 @@
+import json
+import logging
+from pathlib import Path
+
+import pytest
+
+from src.dialog2rasa.api import parse_agent
+from src.dialog2rasa.converters.core import convert_languages
+from src.dialog2rasa.converters.intent import parse_example
+from src.dialog2rasa.serializers import render_agent, write_agent
+
+AGENT_DIR = Path(__file__).parent / "mockup-agent"
+REFERENCE_DIR = AGENT_DIR / "reference_output" / "en"
+
+
+def load_documents() -> dict:
+    return {
+        path.relative_to(AGENT_DIR).as_posix(): json.loads(path.read_text())
+        for kind in ("intents", "entities")
+        for path in (AGENT_DIR / kind).glob("*.json")
+    }
+
+
+@pytest.mark.parametrize("in_memory", [False, True])
+def test_rendered_agent_matches_reference(in_memory):
+    agent = parse_agent(load_documents() if in_memory else AGENT_DIR, "en")
+
+    files = render_agent(agent)
+
+    assert sorted(files) == sorted(
+        path.relative_to(REFERENCE_DIR).as_posix()
+        for path in REFERENCE_DIR.rglob("*.*")
+    )
+    for relative_path, content in files.items():
+        assert content == (REFERENCE_DIR / relative_path).read_text()
+
+
+def test_written_agent_matches_reference(tmp_path):
+    paths = write_agent(parse_agent(AGENT_DIR, "en"), tmp_path)
+
+    for path in paths:
+        reference_path = REFERENCE_DIR / path.relative_to(tmp_path)
+        assert path.read_text() == reference_path.read_text()
+
+
+def test_example_spans_survive_stripping():
+    example = parse_example(
+        {
+            "data": [
+                {"text": "  call "},
+                {"text": "Ann Lee", "meta": "@sys.person"},
+                {"text": " "},
+            ]
+        }
+    )
+
+    assert example.text == "call Ann Lee"
+    assert example.text[example.entities[0].start : example.entities[0].end] == (
+        "Ann Lee"
+    )
+    assert example.annotated() == "call [Ann Lee](sys_person)"
+
+
+def test_missing_language_is_reported():
+    with pytest.raises(Exception, match="Language code 'xx'"):
+        parse_agent(AGENT_DIR, "xx")
+
+
+def test_converters_and_api_render_the_same_files(tmp_path):
+    agent_dir = tmp_path / "agent"
+    documents = {
+        "intents/book.json": {
+            "responses": [
+                {
+                    "messages": [
+                        {"lang": "en", "speech": "Booked."},
+                        {"lang": "en", "speech": ["Done: \"ok\"", "Sure"]},
+                        {"lang": "fr", "speech": "Réservé."},
+                    ]
+                }
+            ]
+        },
+        "intents/book_usersays_en.json": [
+            {"data": [{"text": " book "}, {"text": " Paris ", "meta": "@city"}]},
+            {"data": [{"text": "book: a #flight"}]},
+        ],
+        "entities/city.json": {},
+        "entities/city_entries_en.json": [
+            {"value": "Paris", "synonyms": ["Paris", "Lutetia"]},
+            {"value": "Rome", "synonyms": ["Rome"]},
+            {"value": "none", "synonyms": []},
+            {"value": "trip", "synonyms": ["@city to @city"]},
+        ],
+    }
+    for relative_path, document in documents.items():
+        path = agent_dir / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(document), encoding="utf-8")
+    output_dir = tmp_path / "output"
+
+    convert_languages(
+        agent_dir, ["en"], logging.getLogger(__name__), output_root=output_dir
+    )
+
+    files = render_agent(parse_agent(agent_dir, "en"))
+    assert sorted(files) == sorted(
+        path.relative_to(output_dir / "en").as_posix()
+        for path in (output_dir / "en").rglob("*.*")
+    )
+    for relative_path, content in files.items():
+        assert content == (output_dir / "en" / relative_path).read_text("utf-8")
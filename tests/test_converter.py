@@ -1,9 +1,18 @@
 import filecmp
+import importlib
+import json
+import logging
+import os
+import shutil
+import zipfile
 from pathlib import Path
 
 import pytest
 
-from src.dialog2rasa.cli import main
+from src.dialog2rasa.cli import batch_main, main
+from src.dialog2rasa.converters.core import convert_languages
+from src.dialog2rasa.utils.decoding import available_json_backends
+from src.dialog2rasa.utils.index import AgentIndex
 
 
 @pytest.fixture
@@ -76,6 +85,13 @@ def compare_directories(dir1, dir2):
     return discrepancies
 
 
+def assert_matches_reference(output_dir, reference_output_dir):
+    discrepancies = compare_directories(output_dir, reference_output_dir)
+    assert not discrepancies, "Detailed discrepancies found:\n" + "\n".join(
+        discrepancies
+    )
+
+
 def test_conversion(mock_args):
     input_dir, language = mock_args
 
@@ -84,7 +100,415 @@ def test_conversion(mock_args):
     output_dir = input_dir / "output" / language
     reference_output_dir = input_dir / "reference_output" / language
 
-    discrepancies = compare_directories(output_dir, reference_output_dir)
-    assert not discrepancies, "Detailed discrepancies found:\n" + "\n".join(
-        discrepancies
+    assert_matches_reference(output_dir, reference_output_dir)
+
+
+def test_parallel_conversion(mock_args, monkeypatch):
+    input_dir, language = mock_args
+    monkeypatch.setattr(
+        "sys.argv",
+        ["dialog2rasa", "--path", str(input_dir), "--l", language, "--jobs", "2"],
+    )
+    # The package imports itself without the 'src.' prefix of the tests
+    parallel = importlib.import_module("dialog2rasa.utils.parallel")
+    original = parallel.make_process_pool
+    pools = []
+
+    def make_process_pool(jobs):
+        pools.append(jobs)
+        return original(jobs)
+
+    for module in ("dialog2rasa.converters.core", "dialog2rasa.utils.parallel"):
+        monkeypatch.setattr(f"{module}.make_process_pool", make_process_pool)
+
+    main()
+
+    # Converters running concurrently share the pool of the run
+    assert pools == [2]
+    assert_matches_reference(
+        input_dir / "output" / language, input_dir / "reference_output" / language
+    )
+
+
+def test_incremental_conversion(mock_args, monkeypatch):
+    input_dir, language = mock_args
+    monkeypatch.setattr(
+        "sys.argv",
+        ["dialog2rasa", "--path", str(input_dir), "--l", language, "--incremental"],
+    )
+    manifest_path = input_dir / "output" / f"{language}.manifest.json"
+    manifest_path.unlink(missing_ok=True)
+
+    main()  # First run converts every file and records the manifest
+    assert manifest_path.exists()
+    main()  # Second run rebuilds the output from cached fragments only
+
+    assert_matches_reference(
+        input_dir / "output" / language, input_dir / "reference_output" / language
+    )
+
+
+def test_staged_conversion_keeps_unchanged_files(mock_args, monkeypatch, tmp_path):
+    input_dir, language = mock_args
+    output_root = tmp_path / "output"
+    monkeypatch.setattr(
+        "sys.argv",
+        ["dialog2rasa", "--path", str(input_dir), "--l", language]
+        + ["--output", str(output_root), "--fsync"],
+    )
+    main()
+    nlu_path = output_root / language / "data" / "nlu" / "nlu.yml"
+    stale_path = output_root / language / "stale.yml"
+    stale_path.write_text("stale")
+    mtime = nlu_path.stat().st_mtime_ns - 10**9
+    os.utime(nlu_path, ns=(mtime, mtime))
+
+    main()
+
+    assert nlu_path.stat().st_mtime_ns == mtime
+    assert not stale_path.exists()
+    assert sorted(path.name for path in output_root.iterdir()) == [
+        f".{language}.digests.json",
+        language,
+    ]
+    assert_matches_reference(
+        output_root / language, input_dir / "reference_output" / language
+    )
+
+
+def test_zip_conversion(mock_args, monkeypatch, tmp_path):
+    input_dir, language = mock_args
+    archive_path = tmp_path / "mockup-agent.zip"
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        for file in sorted(input_dir.glob("*/*.json")):
+            archive.write(file, f"mockup-agent/{file.relative_to(input_dir)}")
+    output_root = tmp_path / "output"
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "dialog2rasa",
+            "--path",
+            str(archive_path),
+            "--l",
+            language,
+            "--output",
+            str(output_root),
+        ],
+    )
+
+    main()
+
+    assert_matches_reference(
+        output_root / language, input_dir / "reference_output" / language
+    )
+
+
+def test_multi_language_conversion(mock_args, monkeypatch, tmp_path):
+    input_dir, language = mock_args
+    agent_dir = tmp_path / "mockup-agent"
+    for subdir in ("intents", "entities"):
+        shutil.copytree(input_dir / subdir, agent_dir / subdir)
+    for file in sorted(agent_dir.glob(f"*/*_{language}.json")):
+        shutil.copy(file, file.with_name(file.name.replace(f"_{language}.", "_de.")))
+    monkeypatch.setattr(
+        "sys.argv",
+        ["dialog2rasa", "--path", str(agent_dir), "--l", "all", "--parallel-languages"],
+    )
+
+    main()
+
+    assert_matches_reference(
+        agent_dir / "output" / language, input_dir / "reference_output" / language
+    )
+    nlu_path = Path("data") / "nlu" / "nlu.yml"
+    assert (agent_dir / "output" / "de" / nlu_path).read_text() == (
+        agent_dir / "output" / language / nlu_path
+    ).read_text()
+
+
+def test_shared_results_are_released(mock_args, tmp_path):
+    input_dir, language = mock_args
+    agent_dir = tmp_path / "mockup-agent"
+    for subdir in ("intents", "entities"):
+        shutil.copytree(input_dir / subdir, agent_dir / subdir)
+    for file in sorted(agent_dir.glob(f"*/*_{language}.json")):
+        shutil.copy(file, file.with_name(file.name.replace(f"_{language}.", "_de.")))
+    index = AgentIndex(agent_dir)
+
+    convert_languages(
+        agent_dir, ["all"], logging.getLogger("test_converter"), index=index
+    )
+
+    assert index.shared_languages == 2
+    assert index.shared_results == {}
+    assert_matches_reference(
+        agent_dir / "output" / language, input_dir / "reference_output" / language
+    )
+
+
+def test_streamed_entries_conversion(mock_args, monkeypatch):
+    input_dir, language = mock_args
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "dialog2rasa",
+            "--path",
+            str(input_dir),
+            "--l",
+            language,
+            "--stream-entries",
+            "--mmap",
+        ],
+    )
+
+    main()
+
+    assert_matches_reference(
+        input_dir / "output" / language, input_dir / "reference_output" / language
+    )
+
+
+@pytest.mark.parametrize("json_backend", available_json_backends())
+def test_json_backend_conversion(mock_args, monkeypatch, json_backend):
+    input_dir, language = mock_args
+    monkeypatch.setenv("DIALOG2RASA_JSON_BACKEND", "auto")
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "dialog2rasa",
+            "--path",
+            str(input_dir),
+            "--l",
+            language,
+            "--json-backend",
+            json_backend,
+        ],
+    )
+
+    main()
+
+    assert_matches_reference(
+        input_dir / "output" / language, input_dir / "reference_output" / language
+    )
+
+
+def test_conversion_stats(mock_args, monkeypatch, tmp_path):
+    input_dir, language = mock_args
+    stats_path = tmp_path / "stats.json"
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "dialog2rasa",
+            "--path",
+            str(input_dir),
+            "--l",
+            language,
+            "--stats-json",
+            str(stats_path),
+        ],
+    )
+
+    main()
+
+    report = json.loads(stats_path.read_text())
+    assert {"scan", "read", "transform", "write", "convert.intent"} <= set(
+        report["timings"]
+    )
+    assert report["counters"]["intents"] == 2
+    assert report["counters"]["examples"] == 4
+    assert report["counters"]["synonyms"] == 1
+    assert report["counters"]["lookup_entries"] == 2
+    assert report["counters"]["compound_entities"] == 1
+
+
+def test_memory_report(mock_args, monkeypatch, tmp_path):
+    input_dir, language = mock_args
+    stats_path = tmp_path / "stats.json"
+    monkeypatch.setattr(
+        "sys.argv",
+        ["dialog2rasa", "--path", str(input_dir), "--l", language]
+        + ["--output", str(tmp_path / "output"), "--memory-budget", "1"]
+        + ["--trace-memory", "--stats-json", str(stats_path)],
+    )
+
+    main()
+
+    counters = json.loads(stats_path.read_text())["counters"]
+    assert counters["peak_traced_bytes"] > counters["sections_peak_bytes"] > 0
+    assert counters["sections_spilled_bytes"] == 0
+
+
+def test_batch_conversion(mock_args, tmp_path):
+    input_dir, language = mock_args
+    agents_dir = tmp_path / "agents"
+    for subdir in ("intents", "entities"):
+        shutil.copytree(input_dir / subdir, agents_dir / "tenant-a" / subdir)
+    with zipfile.ZipFile(agents_dir / "tenant-b.zip", "w") as archive:
+        for file in sorted(input_dir.glob("*/*.json")):
+            archive.write(file, file.relative_to(input_dir))
+    # An agent without files for the language fails without stopping the batch
+    (agents_dir / "tenant-c" / "intents").mkdir(parents=True)
+    output_root = tmp_path / "output"
+    summary_path = tmp_path / "summary.json"
+
+    with pytest.raises(SystemExit) as exit_info:
+        batch_main(
+            [
+                str(agents_dir),
+                "--l",
+                language,
+                "--output",
+                str(output_root),
+                "--workers",
+                "2",
+                "--summary-json",
+                str(summary_path),
+            ]
+        )
+
+    assert exit_info.value.code == 1
+    for agent in ("tenant-a", "tenant-b"):
+        assert_matches_reference(
+            output_root / agent / language, input_dir / "reference_output" / language
+        )
+    summary = json.loads(summary_path.read_text())
+    outcomes = [(agent["agent"], agent["error"] is None) for agent in summary["agents"]]
+    assert outcomes == [("tenant-a", True), ("tenant-b", True), ("tenant-c", False)]
+
+
+@pytest.mark.parametrize("stream_entries", [False, True])
+def test_read_ahead_conversion(mock_args, monkeypatch, tmp_path, stream_entries):
+    input_dir, language = mock_args
+    argv = ["dialog2rasa", "--path", str(input_dir), "--l", language]
+    argv += ["--output", str(tmp_path), "--read-ahead", "2", "--io-threads", "2"]
+    monkeypatch.setattr("sys.argv", argv + ["--stream-entries"] * stream_entries)
+
+    main()
+
+    assert_matches_reference(
+        tmp_path / language, input_dir / "reference_output" / language
     )
+
+
+def test_sharded_conversion(mock_args, monkeypatch, tmp_path):
+    input_dir, language = mock_args
+    argv = ["dialog2rasa", "--path", str(input_dir), "--l", language]
+    argv += ["--output", str(tmp_path), "--output-layout", "sharded"]
+    monkeypatch.setattr("sys.argv", argv)
+
+    main()
+
+    output_dir = tmp_path / language
+    reference_dir = input_dir / "reference_output" / language
+    header = 'version: "3.1"\n\nnlu:\n'
+    nlu_files = ["intents/chitchat.start.yml", "intents/default.cancel.yml"]
+    nlu_files.append("synonyms.yml")
+    nlu = header + "".join(
+        (output_dir / "data" / "nlu" / name).read_text().removeprefix(header)
+        for name in nlu_files
+    )
+    assert nlu == (reference_dir / "data" / "nlu" / "nlu.yml").read_text()
+    domain = (output_dir / "domain" / "responses" / "chitchat.start.yml").read_text()
+    domain += (output_dir / "domain" / "slots.yml").read_text()
+    assert domain == (reference_dir / "domain.yml").read_text()
+    assert not (output_dir / "domain.yml").exists()
+
+
+@pytest.mark.parametrize("stream_entries", [False, True])
+def test_lookup_regex_conversion(mock_args, monkeypatch, tmp_path, stream_entries):
+    input_dir, language = mock_args
+    argv = ["dialog2rasa", "--path", str(input_dir), "--l", language]
+    argv += ["--output", str(tmp_path), "--optimize-lookups", "regex"]
+    monkeypatch.setattr("sys.argv", argv + ["--stream-entries"] * stream_entries)
+
+    main()
+
+    lookup_dir = tmp_path / language / "data" / "nlu" / "lookup"
+    assert [path.name for path in lookup_dir.iterdir()] == ["yes.yml"]
+    assert (lookup_dir / "yes.yml").read_text() == (
+        'version: "3.1"\n\nnlu:\n'
+        "  - regex: yes\n    examples: |\n      - \\b(?:ok|uhum)\\b\n"
+    )
+
+
+def test_entity_report_conversion(mock_args, monkeypatch, tmp_path):
+    input_dir, language = mock_args
+    agent_dir = tmp_path / "agent"
+    for kind in ("intents", "entities"):
+        shutil.copytree(input_dir / kind, agent_dir / kind)
+    phrases_path = agent_dir / "intents" / "chitchat.start_usersays_en.json"
+    phrases = json.loads(phrases_path.read_text())
+    phrases[0]["data"] = [
+        {"text": "I am "},
+        {"text": "Ada", "meta": "@full_name", "alias": "full_name"},
+        {"text": " from "},
+        {"text": "Paris", "meta": "@sys.geo-city", "alias": "geo-city"},
+        {"text": " on "},
+        {"text": "Monday", "meta": "@weekday", "alias": "weekday"},
+    ]
+    phrases_path.write_text(json.dumps(phrases))
+    report_path = tmp_path / "entities.json"
+    argv = ["dialog2rasa", "--path", str(agent_dir), "--l", language]
+    argv += ["--output", str(tmp_path / "output"), "--slots-from", "used"]
+    argv += ["--entity-report", str(report_path)]
+    monkeypatch.setattr("sys.argv", argv)
+
+    main()
+
+    assert json.loads(report_path.read_text()) == {
+        "languages": {
+            language: {
+                "unknown_entities": {"weekday": 1},
+                "unused_entities": ["yes"],
+                "system_entities": {"sys_geo-city": 1},
+                "annotations": {"full_name": 1, "sys_geo-city": 1, "weekday": 1},
+            }
+        }
+    }
+    domain = (tmp_path / "output" / language / "domain.yml").read_text()
+    assert "  - full_name\n  - sys_geo-city\n" in domain
+    assert "yes" not in domain and "weekday" not in domain
+
+
+@pytest.mark.parametrize("jobs", ["0", "-3"])
+def test_jobs_must_be_positive(mock_args, monkeypatch, jobs):
+    input_dir, language = mock_args
+    argv = ["dialog2rasa", "--path", str(input_dir), "--l", language, "-j", jobs]
+    monkeypatch.setattr("sys.argv", argv)
+
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+
+    assert exit_info.value.code == 2
+
+
+@pytest.mark.parametrize(
+    "option",
+    [
+        ["--regex-shard-size", "0"],
+        ["--read-ahead", "-1"],
+        ["--debounce", "0"],
+        ["--debounce", "-0.5"],
+        ["--poll-interval", "-1"],
+        ["--poll-interval", "nan"],
+    ],
+)
+def test_numeric_options_are_validated(mock_args, monkeypatch, option):
+    input_dir, language = mock_args
+    argv = ["dialog2rasa", "--path", str(input_dir), "--l", language, *option]
+    monkeypatch.setattr("sys.argv", argv)
+
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+
+    assert exit_info.value.code == 2
+
+
+@pytest.mark.parametrize("workers", ["0", "-3"])
+def test_batch_workers_must_be_positive(mock_args, workers):
+    input_dir, _ = mock_args
+
+    with pytest.raises(SystemExit) as exit_info:
+        batch_main([str(input_dir), "--workers", workers])
+
+    assert exit_info.value.code == 2
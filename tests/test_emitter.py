@@ -0,0 +1,17 @@
+import pytest
+
+from src.dialog2rasa.utils.emitter import emit_examples_item, emit_responses
+
+yaml = pytest.importorskip("yaml")
+
+TEXTS = ['Say "hi": now', "C:\\temp\\new", "two\nlines", "# not a comment", "@home"]
+
+
+def test_emitted_yaml_round_trips():
+    domain = yaml.safe_load("responses:\n" + emit_responses("utter_odd", TEXTS))
+    nlu = yaml.safe_load("nlu:\n" + emit_examples_item("synonym", "@home: x", TEXTS))
+
+    assert domain["responses"]["utter_odd"] == [{"text": text} for text in TEXTS]
+    assert nlu["nlu"][0]["synonym"] == "@home: x"
+    # Examples are single lines of a literal block
+    assert nlu["nlu"][0]["examples"].count("\n") == len(TEXTS)
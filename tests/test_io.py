@@ -0,0 +1,76 @@
+import os
+
+from src.dialog2rasa.utils.io import (
+    DEFAULT_BUFFER_SIZE,
+    DEFAULT_MEMORY_BUDGET,
+    OutputSections,
+    StagedDirectory,
+    write_to_file,
+)
+
+
+def test_output_sections_spill_largest_sections(tmp_path):
+    sections = OutputSections(memory_budget=10, spill_dir=tmp_path)
+    sections.write("small", ["abc"])
+    sections.write("large", ["012345", "6789"])
+    sections.write("large", ["!"])
+
+    assert (sections.size, sections.peak_size, sections.spilled_size) == (3, 13, 11)
+    assert [path.name for path in tmp_path.iterdir()][0].startswith(".spill-")
+
+    output_path = tmp_path / "out" / "file.yml"
+    sections.assemble(output_path, ["large", "small"], header="# ")
+
+    assert output_path.read_text() == "# 0123456789!abc"
+    assert [path.name for path in tmp_path.iterdir()] == ["out"]
+    assert sections.size == 0
+
+
+def test_output_sections_budget_counts_encoded_bytes(tmp_path):
+    sections = OutputSections(memory_budget=10, spill_dir=tmp_path)
+    sections.write("accents", ["é" * 5])
+
+    assert (sections.size, sections.spilled_size) == (10, 0)
+
+    sections.write("accents", ["!"])
+
+    assert (sections.size, sections.peak_size, sections.spilled_size) == (0, 11, 11)
+
+
+def test_staged_directory_compares_digests_without_reading_files(
+    tmp_path, monkeypatch
+):
+    target = tmp_path / "en"
+
+    def commit(content: str) -> tuple[int, int]:
+        staging = StagedDirectory(target)
+        staging.prepare("data")
+        write_to_file(staging.path / "data" / "nlu.yml", content)
+        return staging.commit()
+
+    assert commit("intents") == (1, 0)
+    mtime = (target / "data" / "nlu.yml").stat().st_mtime_ns - 10**9
+    os.utime(target / "data" / "nlu.yml", ns=(mtime, mtime))
+    # The digest recorded for the file no longer matches it, so it is read
+    assert commit("intents") == (0, 1)
+
+    def read_back(file_path):
+        raise AssertionError(f"'{file_path}' was read back.")
+
+    monkeypatch.setattr("src.dialog2rasa.utils.io._file_digest", read_back)
+    assert commit("intents") == (0, 1)
+    assert (target / "data" / "nlu.yml").stat().st_mtime_ns == mtime
+    assert commit("entries") == (1, 0)
+    assert (target / "data" / "nlu.yml").read_text() == "entries"
+
+
+def test_output_sections_are_bounded_and_assembled_in_chunks(tmp_path):
+    sections = OutputSections(spill_dir=tmp_path)
+    content = "- intent\n" * DEFAULT_BUFFER_SIZE
+    sections.write("intents", [content])
+
+    chunks = list(sections._iter_section("intents"))
+
+    assert sections.memory_budget == DEFAULT_MEMORY_BUDGET
+    assert "".join(chunks) == content
+    assert max(len(chunk) for chunk in chunks) == DEFAULT_BUFFER_SIZE
@@ -0,0 +1,40 @@
+import json
+
+from src.dialog2rasa.utils.io import read_hashed_json_file
+from src.dialog2rasa.utils.manifest import ConversionManifest
+
+
+def test_manifest_streams_results_and_reads_changed_files_once(tmp_path):
+    agent_dir = tmp_path / "agent"
+    (agent_dir / "intents").mkdir(parents=True)
+    paths = [agent_dir / "intents" / f"{name}.json" for name in "abc"]
+    for path in paths:
+        path.write_text(json.dumps([1]))
+    manifest_path = tmp_path / "en.manifest.json"
+
+    manifest = ConversionManifest(manifest_path, agent_dir)
+    tasks = [(path, []) for path in paths]
+    assert list(manifest.map_json_files(len, tasks, read_hashed_json_file)) == [1] * 3
+    manifest.save()
+
+    paths[0].write_text(json.dumps([1, 2]))
+    reads = []
+    pulled = []
+
+    def read(file_path):
+        reads.append(file_path.name)
+        return read_hashed_json_file(file_path)
+
+    def pull_tasks():
+        for path in paths:
+            pulled.append(path.name)
+            yield path, []
+
+    manifest = ConversionManifest(manifest_path, agent_dir)
+    results = manifest.map_json_files(len, pull_tasks(), read)
+    assert next(results) == 2
+    # The changed file was yielded before the other files were even checked
+    assert pulled == ["a.json"]
+    assert list(results) == [1, 1]
+    assert reads == ["a.json"]
+    assert (manifest.converted, manifest.reused) == (1, 2)
@@ -0,0 +1,20 @@
+from src.dialog2rasa.utils.naming import (
+    NameTable,
+    camel_to_snake,
+    entity_reference_to_name,
+)
+
+
+def test_camel_to_snake():
+    assert camel_to_snake("chitchat.start") == "chitchat.start"
+    assert camel_to_snake("fullName") == "full_name"
+    assert camel_to_snake("Small Talk") == "small_talk"
+
+
+def test_entity_names_are_canonical_across_outputs():
+    names = NameTable(intent_names={"orderPizza"}, entity_names={"fullName"})
+
+    # Annotations, lookup tables and slots all refer to the same Rasa name
+    assert entity_reference_to_name("@fullName") == names.entity("fullName")
+    assert entity_reference_to_name("@sys.date") == "sys_date"
+    assert names.intent("orderPizza") == "order_pizza"
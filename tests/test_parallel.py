@@ -0,0 +1,26 @@
+import random
+import threading
+import time
+
+from src.dialog2rasa.utils.parallel import read_ahead
+
+
+def test_read_ahead_keeps_order_and_bounds_reads():
+    lock = threading.Lock()
+    started = []
+    consumed = []
+
+    def read(item: int) -> int:
+        with lock:
+            # Reads may only start once all but `depth` earlier items are used
+            assert item - len(consumed) <= 3
+            started.append(item)
+        time.sleep(random.random() / 1000)
+        return item * 2
+
+    for result in read_ahead(read, range(50), depth=3, threads=4):
+        with lock:
+            consumed.append(result)
+
+    assert consumed == [item * 2 for item in range(50)]
+    assert sorted(started) == list(range(50))
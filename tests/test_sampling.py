@@ -0,0 +1,46 @@
+from src.dialog2rasa.converters.intent import convert_intent_examples
+from src.dialog2rasa.utils.sampling import sample_examples
+
+
+def phrase(*fragments) -> dict:
+    return {
+        "data": [
+            {"text": text, "meta": meta} if meta else {"text": text}
+            for text, meta in fragments
+        ]
+    }
+
+
+def test_sample_examples_is_reproducible_and_keeps_order():
+    examples = [(str(i), i) for i in range(1000)]
+
+    first = sample_examples(examples, max_examples=10, seed="1:greet")
+    second = sample_examples(examples, max_examples=10, seed="1:greet")
+    other = sample_examples(examples, max_examples=10, seed="2:greet")
+
+    assert first == second
+    assert first.kept != other.kept
+    assert first.kept == sorted(first.kept)
+    assert (first.duplicates, first.sampled_out) == (0, 990)
+
+
+def test_convert_intent_examples_drops_normalized_duplicates():
+    data = [
+        phrase(("Book a flight to ", None), ("Paris", "@sys.geo-city")),
+        phrase(("book a  flight to Paris", None)),
+        phrase(("  BOOK A FLIGHT TO PARIS ", None)),
+        phrase(("Book a train", None)),
+    ]
+
+    intent, examples, duplicates, sampled_out, references = convert_intent_examples(
+        data, "book", dedupe=True
+    )
+
+    assert intent == (
+        "  - intent: book\n    examples: |\n"
+        "      - Book a flight to [Paris](sys_geo-city)\n"
+        "      - Book a train\n\n"
+    )
+    assert (examples, duplicates, sampled_out) == (2, 2, 0)
+    assert references == {"@sys.geo-city": 1}
+
@@ -0,0 +1,28 @@
+import pytest
+
+from src.dialog2rasa.utils.scheduler import DependencyScheduler
+
+
+def test_tasks_run_after_their_inputs():
+    order = []
+    scheduler = DependencyScheduler()
+    scheduler.add("assemble", lambda: order.append("assemble"), consumes=("a", "b"))
+    scheduler.add("a", lambda: order.append("a"), produces=("a",))
+    scheduler.add("b", lambda: order.append("b"), produces=("b",))
+    scheduler.run()
+
+    assert sorted(order[:2]) == ["a", "b"]
+    assert order[2] == "assemble"
+
+
+def test_unknown_and_cyclic_dependencies_are_rejected():
+    scheduler = DependencyScheduler()
+    scheduler.add("a", lambda: None, consumes=("missing",))
+    with pytest.raises(ValueError, match="no task produces"):
+        scheduler.run()
+
+    scheduler = DependencyScheduler()
+    scheduler.add("a", lambda: None, produces=("a",), consumes=("b",))
+    scheduler.add("b", lambda: None, produces=("b",), consumes=("a",))
+    with pytest.raises(ValueError, match="Cyclic"):
+        scheduler.run()
@@ -0,0 +1,107 @@
+import gc
+import io
+import json
+import logging
+import shutil
+import threading
+import urllib.error
+import urllib.request
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from src.dialog2rasa.cache import AgentCache
+from src.dialog2rasa.server import make_server
+
+AGENT_DIR = Path(__file__).parent / "mockup-agent"
+REFERENCE_DIR = AGENT_DIR / "reference_output" / "en"
+
+
+def copy_agent(agent_dir: Path) -> Path:
+    for kind in ("intents", "entities"):
+        shutil.copytree(AGENT_DIR / kind, agent_dir / kind)
+    return agent_dir
+
+
+@pytest.fixture
+def server_url(tmp_path):
+    copy_agent(tmp_path / "agent")
+    server = make_server(
+        AgentCache(), tmp_path, logging.getLogger("test_server"), port=0
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url: str) -> bytes:
+    with urllib.request.urlopen(url) as response:
+        return response.read()
+
+
+def test_server_converts_changed_files_only(server_url, tmp_path):
+    url = f"{server_url}/convert?agent=agent&language=en"
+
+    first = json.loads(get(url))
+    phrases_path = tmp_path / "agent" / "intents" / "default.cancel_usersays_en.json"
+    phrases = json.loads(phrases_path.read_text())
+    phrases[0]["data"][0]["text"] = "abort"
+    phrases_path.write_text(json.dumps(phrases))
+    second = json.loads(get(url))
+
+    for relative_path, content in first["languages"]["en"].items():
+        assert content == (REFERENCE_DIR / relative_path).read_text()
+    assert first["reparsed"] == 6
+    assert (second["reparsed"], second["reused"]) == (1, 5)
+    assert "      - abort\n" in second["languages"]["en"]["data/nlu/nlu.yml"]
+
+
+def test_server_returns_zip_archives(server_url):
+    content = get(f"{server_url}/convert?agent=agent&format=zip")
+
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        assert archive.read("en/domain.yml").decode() == (
+            (REFERENCE_DIR / "domain.yml").read_text()
+        )
+
+
+def test_server_rejects_agents_outside_root(server_url):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(f"{server_url}/convert?agent=../../etc")
+
+    assert error.value.code == 400
+
+
+@pytest.mark.parametrize("shard_size", ["0", "-1"])
+def test_server_rejects_non_positive_shard_sizes(server_url, shard_size):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(f"{server_url}/convert?agent=agent&regex_shard_size={shard_size}")
+
+    assert error.value.code == 400
+
+
+def test_cache_evicts_least_recently_converted_agents(tmp_path):
+    cache = AgentCache(max_size=1)
+    first, second = copy_agent(tmp_path / "first"), copy_agent(tmp_path / "second")
+
+    cache.convert(first, ["en"])
+    cache.convert(second, ["en"])
+
+    assert cache.to_dict()["agents"] == [str(second)]
+    assert cache.evictions == 1
+
+
+def test_requests_leave_no_objects_frozen(server_url, tmp_path):
+    url = f"{server_url}/convert?agent=agent&language=en"
+    phrases_path = tmp_path / "agent" / "intents" / "default.cancel_usersays_en.json"
+    phrases = json.loads(phrases_path.read_text())
+    frozen = gc.get_freeze_count()
+
+    for attempt in range(5):
+        phrases[0]["data"][0]["text"] = f"abort {attempt}"
+        phrases_path.write_text(json.dumps(phrases))
+        get(url)
+
+    assert gc.get_freeze_count() == frozen
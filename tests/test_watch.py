@@ -0,0 +1,70 @@
+import json
+import logging
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.dialog2rasa.cli import main
+from src.dialog2rasa.watch import watch_agent
+
+AGENT_DIR = Path(__file__).parent / "mockup-agent"
+
+
+def wait_for(condition, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_watch_rewrites_changed_output_files_only(tmp_path):
+    agent_dir = tmp_path / "agent"
+    for kind in ("intents", "entities"):
+        shutil.copytree(AGENT_DIR / kind, agent_dir / kind)
+    output_root = tmp_path / "output"
+    shutil.copytree(AGENT_DIR / "reference_output", output_root)
+    nlu_path = output_root / "en" / "data" / "nlu" / "nlu.yml"
+    domain_path = output_root / "en" / "domain.yml"
+    domain_mtime = domain_path.stat().st_mtime_ns
+    domain_inode = domain_path.stat().st_ino
+
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=watch_agent,
+        args=(agent_dir, ["en"], output_root, logging.getLogger("test_watch")),
+        kwargs=dict(debounce=0.05, poll_interval=0.05, use_inotify=False, stop=stop),
+    )
+    thread.start()
+    try:
+        time.sleep(0.2)
+        phrases_path = agent_dir / "intents" / "default.cancel_usersays_en.json"
+        phrases = json.loads(phrases_path.read_text())
+        phrases[0]["data"][0]["text"] = "abort"
+        phrases_path.write_text(json.dumps(phrases))
+
+        assert wait_for(lambda: "      - abort\n" in nlu_path.read_text())
+        assert domain_path.stat().st_mtime_ns == domain_mtime
+        assert domain_path.stat().st_ino == domain_inode
+        assert not (output_root / ".en.staging").exists()
+    finally:
+        stop.set()
+        thread.join()
+
+
+@pytest.mark.parametrize(
+    "option", [["--memory-budget", "1"], ["--stats-json", "stats.json"]]
+)
+def test_watch_rejects_options_reconversions_ignore(monkeypatch, capsys, option):
+    monkeypatch.setattr(
+        "sys.argv", ["dialog2rasa", "--path", str(AGENT_DIR), "--watch", *option]
+    )
+
+    with pytest.raises(SystemExit):
+        main()
+
+    assert f"--watch cannot be combined with {option[0]}" in capsys.readouterr().err